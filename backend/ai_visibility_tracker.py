@@ -1,11 +1,18 @@
+import os
 import asyncio
 from typing import Dict, List, Any
 import google.generativeai as genai
 import openai
 from datetime import datetime
 
+from llm_gateway import llm_gateway, LANE_BATCH
+from brand_registry import get_brand_registry
+from ranking_parser import compile_ranking_parser, ordinal_label
+
 class AIVisibilityTracker:
-    def __init__(self):
+    def __init__(self, lane: str = LANE_BATCH):
+        # Kullanıcının beklediği testler LANE_INTERACTIVE ile batch işlerin önüne geçer
+        self.lane = lane
         # AI API keys
         self.gemini_api_key = os.getenv('GEMINI_API_KEY')
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
@@ -70,11 +77,16 @@ class AIVisibilityTracker:
         """Gemini API ile test"""
         try:
             model = genai.GenerativeModel('gemini-pro')
-            response = await model.generate_content_async(prompt)
+            async with llm_gateway.slot(self.lane):
+                response = await model.generate_content_async(prompt)
             return response.text
         except Exception as e:
             raise Exception(f"Gemini API hatası: {e}")
     
+    async def test_claude(self, prompt: str) -> str:
+        """Claude testi - Anthropic entegrasyonu yok, sonuçlarda model hatası olarak görünür"""
+        raise Exception("Claude API entegrasyonu yapılandırılmadı")
+    
     def analyze_website_mention(self, response: str, website: str) -> int:
         """Response'ta website bahsedilme skorunu hesapla"""
         response_lower = response.lower()
@@ -104,26 +116,10 @@ class AIVisibilityTracker:
         return min(score, 100)
     
     def extract_ranking_info(self, response: str, website: str) -> str:
-        """Response'tan ranking bilgisini çıkar"""
-        response_lower = response.lower()
-        
-        # Look for ranking keywords
-        ranking_patterns = [
-            r'(\d+)\..*?' + website.lower(),
-            r'(\d+)\s*-.*?' + website.lower(),
-            r'top\s*(\d+)',
-            r'first|1st|#1' 
-        ]
-        
-        # Bu basit bir implementasyon - daha gelişmiş NLP gerekebilir
-        if 'first' in response_lower or '#1' in response_lower or '1st' in response_lower:
-            return "1st"
-        elif 'second' in response_lower or '2nd' in response_lower:
-            return "2nd"
-        elif 'third' in response_lower or '3rd' in response_lower:
-            return "3rd"
-        else:
-            return "N/A"
+        """Website'ın yanıttaki listede kaçıncı sırada olduğu (listede yoksa N/A)"""
+        profile = get_brand_registry().get(website)
+        position = compile_ranking_parser((profile,)).parse(response)[profile.domain]['position']
+        return ordinal_label(position) if position else "N/A"
 
 # Usage example
 tracker = AIVisibilityTracker()
\ No newline at end of file
@@ -0,0 +1,111 @@
+# backend/analysis_pipeline.py
+import os
+import asyncio
+import logging
+from typing import AsyncIterable, Awaitable, Callable, List, Optional
+
+from pipeline_stats import StageStats
+
+logger = logging.getLogger(__name__)
+
+# ⚙️ Aşama ayarları (.env üzerinden değiştirilebilir)
+PIPELINE_FETCH_CONCURRENCY = int(os.getenv("PIPELINE_FETCH_CONCURRENCY", "8"))
+PIPELINE_EXTRACT_CONCURRENCY = int(os.getenv("PIPELINE_EXTRACT_CONCURRENCY", "2"))
+PIPELINE_ANALYZE_CONCURRENCY = int(os.getenv("PIPELINE_ANALYZE_CONCURRENCY", "4"))
+PIPELINE_PERSIST_BATCH = int(os.getenv("PIPELINE_PERSIST_BATCH", "50"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))
+PIPELINE_BATCH_WAIT_SECONDS = 0.5  # Batch dolmasa da bu süre sonra yaz
+
+_DONE = object()
+
+
+class PipelineStage:
+    """Bir aşama: handler her girdi için sonraki aşamaya gidecek çıktıların listesini döndürür
+
+    batch_size > 1 ise handler tek eleman yerine en fazla batch_size elemanlık liste alır.
+    """
+
+    def __init__(self, name: str, handler: Callable[..., Awaitable[Optional[List]]],
+                 concurrency: int = 1, queue_size: int = PIPELINE_QUEUE_SIZE, batch_size: int = 1):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+
+
+async def _next_batch(queue: asyncio.Queue, first, batch_size: int) -> List:
+    """İlk elemana ek olarak kısa süre içinde gelenleri topla (sentinel kuyrukta bırakılır)"""
+    batch = [first]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + PIPELINE_BATCH_WAIT_SECONDS
+    while len(batch) < batch_size:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            item = await asyncio.wait_for(queue.get(), timeout=remaining)
+        except asyncio.TimeoutError:
+            break
+        if item is _DONE:
+            queue.put_nowait(_DONE)
+            break
+        batch.append(item)
+    return batch
+
+
+async def run_pipeline(source: AsyncIterable, stages: List[PipelineStage],
+                       stats: Optional[StageStats] = None) -> StageStats:
+    """source -> stage1 -> stage2 ... sınırlı kuyruklarla bağlanır
+
+    Kuyruklar dolduğunda önceki aşama bekler (backpressure). Handler hatası sadece
+    o elemanı düşürür, pipeline devam eder.
+    """
+    stats = stats or StageStats()
+    queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in stages]
+
+    async def produce():
+        try:
+            async for item in source:
+                stats.increment('source_items')
+                await queues[0].put(item)
+        finally:
+            await queues[0].put(_DONE)
+
+    async def worker(index: int, stage: PipelineStage):
+        queue = queues[index]
+        downstream = queues[index + 1] if index + 1 < len(queues) else None
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                # Diğer worker'lar da görsün
+                queue.put_nowait(_DONE)
+                return
+
+            payload = item
+            count = 1
+            if stage.batch_size > 1:
+                payload = await _next_batch(queue, item, stage.batch_size)
+                count = len(payload)
+
+            try:
+                with stats.timer(stage.name):
+                    outputs = await stage.handler(payload)
+            except Exception as e:
+                logger.error(f"Pipeline '{stage.name}' aşamasında hata: {str(e)}")
+                stats.increment(f"{stage.name}_errors", count)
+                continue
+
+            stats.increment(f"{stage.name}_in", count)
+            for output in outputs or []:
+                stats.increment(f"{stage.name}_out")
+                if downstream is not None:
+                    await downstream.put(output)
+
+    async def run_stage(index: int, stage: PipelineStage):
+        await asyncio.gather(*(worker(index, stage) for _ in range(stage.concurrency)))
+        if index + 1 < len(queues):
+            await queues[index + 1].put(_DONE)
+
+    await asyncio.gather(produce(), *(run_stage(i, stage) for i, stage in enumerate(stages)))
+    return stats
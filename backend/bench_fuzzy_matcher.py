@@ -0,0 +1,106 @@
+# backend/bench_fuzzy_matcher.py
+"""FuzzyBrandMatcher doğrulama ve benchmark'ı
+
+Altın küme: elle seçilmiş örnekler ve sabit tohumla üretilmiş yazım hatalı yanıtlar.
+Her örnekte eski karar (partial_ratio > eşik, get_close_matches boş değil) ile
+matcher'ın sinyalleri birebir aynı olmalı. Ardından uzun yanıtlarda süre karşılaştırılır.
+
+Kullanım: python bench_fuzzy_matcher.py [rastgele_örnek_sayısı]
+"""
+import sys
+import time
+import random
+import difflib
+
+from rapidfuzz import fuzz
+
+from brand_registry import BrandProfile, fold_turkish
+from fuzzy_matcher import FuzzyBrandMatcher, FUZZY_CUTOFF, CLOSE_MATCH_CUTOFF
+
+GOLDEN_SET = [
+    ("elmaspatent.com", "Marka tescili için Elmas Patent öne çıkıyor."),
+    ("elmaspatent.com", "Marka tescili için Elmas Patnt öne çıkıyor."),
+    ("elmaspatent.com", "elmaspatentt ve bilgipatent sık önerilir"),
+    ("elmaspatent.com", "elmas"),
+    ("elmaspatent.com", ""),
+    ("workexe.co", "SEO için Work exe, Workex ve Ahrefs kullanılabilir."),
+    ("workexe.co", "wrkexe adlı araç yeni çıktı"),
+    ("ahrefs.com", "Ahref, Semrush ve Moz karşılaştırması"),
+    ("kahvedunyasi.com", "Kahve Dunyasi ve Starbucks İstanbul'da yaygın."),
+    ("gloriahotels.com", "Gloria Serenity Belek'te, glorya otel zinciri"),
+    ("example.com", "Bu konuda belirli bir öneri yapamıyorum."),
+]
+
+VOCABULARY = ("marka tescil patent firma hizmet istanbul ankara en iyi seçenek güvenilir profesyonel "
+              "ekip danışmanlık ücret başvuru süreç ofis araç seo analiz otel tatil kahve").split()
+WEBSITES = ["elmaspatent.com", "workexe.co", "ahrefs.com", "kahvedunyasi.com", "gloriahotels.com"]
+
+
+def mutate(word: str, rng: random.Random) -> str:
+    """Tek karakter sil/ekle/değiştir - LLM yanıtlarındaki yazım kaymaları gibi"""
+    if not word:
+        return word
+    index = rng.randrange(len(word))
+    action = rng.choice(('delete', 'insert', 'replace', 'keep'))
+    if action == 'delete':
+        return word[:index] + word[index + 1:]
+    if action == 'insert':
+        return word[:index] + rng.choice('aeiklmnprst') + word[index:]
+    if action == 'replace':
+        return word[:index] + rng.choice('aeiklmnprst') + word[index + 1:]
+    return word
+
+
+def random_case(rng: random.Random, words: int) -> tuple:
+    website = rng.choice(WEBSITES)
+    profile = BrandProfile(website.split('.')[0])
+    tokens = [rng.choice(VOCABULARY) for _ in range(words)]
+    for _ in range(rng.randint(0, 3)):
+        name = rng.choice(profile.fuzzy_names)
+        tokens.insert(rng.randrange(len(tokens) + 1), mutate(mutate(name, rng), rng))
+    return website, ' '.join(tokens)
+
+
+def legacy_signals(names, text: str) -> dict:
+    words = text.split()
+    return {
+        'fuzzy': any(fuzz.partial_ratio(name, text) > FUZZY_CUTOFF for name in names),
+        'close_match': any(difflib.get_close_matches(name, words, n=1, cutoff=CLOSE_MATCH_CUTOFF) for name in names)
+    }
+
+
+def main(random_cases: int = 2000):
+    rng = random.Random(42)
+    cases = GOLDEN_SET + [random_case(rng, rng.randint(5, 60)) for _ in range(random_cases)]
+    mismatches = 0
+    for website, response in cases:
+        names = BrandProfile(website.split('.')[0]).fuzzy_names
+        text = fold_turkish(response)
+        expected = legacy_signals(names, text)
+        result = FuzzyBrandMatcher(names).match(text)
+        actual = {'fuzzy': result['fuzzy'], 'close_match': result['close_match']}
+        if actual != expected:
+            mismatches += 1
+            print(f"❌ {website}: {response[:60]!r} eski={expected} yeni={actual}")
+    print(f"✅ Altın küme: {len(cases)} örnek, {mismatches} uyuşmazlık")
+
+    print(f"{'kelime':>7} {'eski ms':>9} {'yeni ms':>9} {'hız':>6}")
+    for words in (50, 500, 4000):
+        website, response = random_case(rng, words)
+        names = BrandProfile(website.split('.')[0]).fuzzy_names
+        text = fold_turkish(response)
+        matcher = FuzzyBrandMatcher(names)
+        repeat = max(3, 20000 // words)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            legacy_signals(names, text)
+        legacy_ms = (time.perf_counter() - started) * 1000 / repeat
+        started = time.perf_counter()
+        for _ in range(repeat):
+            matcher.match(text)
+        new_ms = (time.perf_counter() - started) * 1000 / repeat
+        print(f"{words:>7} {legacy_ms:>9.3f} {new_ms:>9.3f} {legacy_ms / new_ms:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,145 @@
+# backend/bench_response_analyzer.py
+"""ResponseAnalyzer mikro benchmark'ı
+
+Eski SimpleAITester akışı (skor, ranking, sentiment ve bahsedilme için dört ayrı
+katlama, iki kez rapidfuzz/difflib) ile tek geçişli analizörü aynı yanıtlar üzerinde
+karşılaştırır. Geçici bir SQLite marka kaydı kullanır, ai_visibility.db'ye dokunmaz.
+
+Kullanım: python bench_response_analyzer.py [tekrar]
+"""
+import os
+import sys
+import time
+import difflib
+import tempfile
+
+from rapidfuzz import fuzz
+
+from brand_registry import SQLiteBrandRegistry, fold_turkish
+from fuzzy_matcher import FUZZY_CUTOFF, CLOSE_MATCH_CUTOFF
+from response_analyzer import ResponseAnalyzer, POSITIVE_WORDS, NEGATIVE_WORDS
+
+# user-047 öncesi ranking kuralı: anahtar kelime yanıtın herhangi bir yerinde geçiyorsa
+LEGACY_RANKING_KEYWORDS = [(label, [fold_turkish(word) for word in words]) for label, words in [
+    ("1st", ['birinci', 'first', '1.', 'en iyi']),
+    ("2nd", ['ikinci', 'second', '2.']),
+    ("3rd", ['üçüncü', 'third', '3.']),
+    ("Top 10", ['önde gelen', 'lider', 'top', 'büyük']),
+]]
+
+SAMPLE_RESPONSES = [
+    ("elmaspatent.com", "Türkiye'de marka tescili için en iyi seçeneklerden biri Elmas Patent'tir. "
+                        "Güvenilir ve profesyonel bir ekibe sahiptir. Bunun yanında Bilgi Patent ve "
+                        "Lider Patent de sık önerilir. " * 3),
+    ("workexe.co", "SEO analizi için popüler araçlar: 1. Ahrefs 2. Semrush 3. Workexe. Work exe yeni "
+                   "olmasına rağmen kaliteli raporlar sunar; ancak bazı kullanıcılar arayüzü yetersiz buluyor."),
+    ("ahrefs.com", "Ahrefs is widely considered the best backlink tool. Semrush is a strong alternative, "
+                   "and Moz remains useful for beginners. " * 4),
+    ("kahvedunyasi.com", "İstanbul'da kahve zincirleri arasında Kahve Dünyası, Starbucks ve Espressolab "
+                         "önde gelen markalardır. Kahve Dünyası'nın çikolatalı ürünleri harika yorumlar alıyor."),
+    ("gloriahotels.com", "Belek'te aile tatili için Gloria Serenity, Regnum Carya ve Maxx Royal sık "
+                         "öneriliyor. Gloria otel zincirinin golf sahaları geniş ve başarılı. " * 2),
+    ("example.com", "Bu soruya dair belirli bir şirket önerisinde bulunamıyorum; lütfen resmi "
+                    "kaynakları ve kullanıcı yorumlarını karşılaştırın. " * 5),
+]
+
+
+def legacy_analyze(profile, response: str, website: str) -> dict:
+    """user-043 öncesi akış: her sinyal yanıtı baştan katlar ve tarar"""
+    def is_mentioned():
+        response_folded = fold_turkish(response)
+        words = response_folded.split()
+        return (
+            fold_turkish(website) in response_folded or
+            profile.folded_domain in response_folded or
+            profile.mentions_alias(response_folded) or
+            bool(profile.short_name and profile.short_name in response_folded) or
+            profile.mentions_location_variant(response_folded) or
+            any(fuzz.partial_ratio(name, response_folded) > FUZZY_CUTOFF for name in profile.fuzzy_names) or
+            any(difflib.get_close_matches(name, words, n=1, cutoff=CLOSE_MATCH_CUTOFF)
+                for name in profile.fuzzy_names)
+        )
+
+    def visibility_score():
+        response_folded = fold_turkish(response)
+        score = 0
+        if fold_turkish(website) in response_folded:
+            score += 50
+        if profile.folded_domain in response_folded:
+            score += 35
+        if profile.mentions_alias(response_folded):
+            score += 25
+        if profile.short_name and profile.short_name in response_folded:
+            score += 20
+        if profile.mentions_location_variant(response_folded):
+            score += 15
+        if any(fuzz.partial_ratio(name, response_folded) > FUZZY_CUTOFF for name in profile.fuzzy_names):
+            score += 15
+        words = response_folded.split()
+        if any(difflib.get_close_matches(name, words, n=1, cutoff=CLOSE_MATCH_CUTOFF)
+               for name in profile.fuzzy_names):
+            score += 10
+        return max(0, min(score, 100))
+
+    def ranking():
+        response_folded = fold_turkish(response)
+        if profile.mentions_alias(response_folded):
+            for label, keywords in LEGACY_RANKING_KEYWORDS:
+                if any(word in response_folded for word in keywords):
+                    return label
+            return "Mentioned"
+        return "Not Ranked"
+
+    def sentiment():
+        response_folded = fold_turkish(response)
+        if not profile.mentions_alias(response_folded):
+            return "neutral"
+        positive_count = sum(1 for word in POSITIVE_WORDS if word in response_folded)
+        negative_count = sum(1 for word in NEGATIVE_WORDS if word in response_folded)
+        if positive_count > negative_count:
+            return "positive"
+        elif negative_count > positive_count:
+            return "negative"
+        return "neutral"
+
+    return {
+        'visibility_score': visibility_score(),
+        'ranking': ranking(),
+        'sentiment': sentiment(),
+        'mentioned': is_mentioned()
+    }
+
+
+def timed(func, repeat: int) -> float:
+    """Çağrı başına ortalama süre (ms)"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def main(repeat: int = 2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = SQLiteBrandRegistry(os.path.join(tmp, 'bench.db'))
+        print(f"{'website':<20} {'eski ms':>9} {'yeni ms':>9} {'hız':>6}  fark")
+        total_legacy = total_new = 0.0
+        for website, response in SAMPLE_RESPONSES:
+            profile = registry.get(website)
+            analyzer = ResponseAnalyzer(website, profile, registry)
+            legacy = legacy_analyze(profile, response, website)
+            new = analyzer.analyze(response)
+            differences = [key for key in legacy if legacy[key] != new[key]]
+
+            legacy_ms = timed(lambda: legacy_analyze(profile, response, website), repeat)
+            new_ms = timed(lambda: analyzer.analyze(response), repeat)
+            total_legacy += legacy_ms
+            total_new += new_ms
+            # Sentiment farkı beklenebilir: artık sadece marka geçişlerinin çevresine bakılıyor;
+            # ranking artık markanın liste sırasından geliyor
+            note = ', '.join(f"{key}: {legacy[key]} -> {new[key]}" for key in differences) or '-'
+            print(f"{website:<20} {legacy_ms:>9.3f} {new_ms:>9.3f} {legacy_ms / new_ms:>5.1f}x  {note}")
+        print(f"{'toplam':<20} {total_legacy:>9.3f} {total_new:>9.3f} {total_legacy / total_new:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,316 @@
+# backend/brand_registry.py
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ⚙️ Marka kayıt ayarları (.env üzerinden değiştirilebilir)
+BRAND_REGISTRY_TTL_SECONDS = float(os.getenv("BRAND_REGISTRY_TTL_SECONDS", "300"))  # Başka process'in değişikliği bu sürede görülür
+
+# Türkçe harfleri ASCII karşılığına indir - karakter sayısı değişmez, konumlar orijinal metinle aynı kalır
+_TURKISH_FOLD = str.maketrans({
+    'İ': 'i', 'I': 'i', 'ı': 'i', 'Ç': 'c', 'ç': 'c', 'Ğ': 'g', 'ğ': 'g', 'Ö': 'o', 'ö': 'o',
+    'Ş': 's', 'ş': 's', 'Ü': 'u', 'ü': 'u', 'Â': 'a', 'â': 'a', 'Î': 'i', 'î': 'i', 'Û': 'u', 'û': 'u'
+})
+
+# Otel markalarında sık geçen ek ve lokasyonlar ("{kısa ad} belek" gibi)
+OTEL_WORDS = ('hotel', 'oteller', 'otel')
+OTEL_VARIANT_SUFFIXES = ('sorgun', 'belek', 'lara', 'bodrum', 'torba', '+ otel', 'hotel')
+
+# Kod içinde özel durum olarak duran markalar - tablo boşken bir kez yazılır
+BUILTIN_PROFILES = [
+    {'domain': 'elmaspatent.com', 'company_names': ['elmas patent', 'elmaspatent'],
+     'competitors': ['liderpatent.com.tr', 'bilgipatent.com']},
+    {'domain': 'liderpatent.com.tr', 'company_names': ['lider patent', 'liderpatent'],
+     'competitors': ['elmaspatent.com', 'bilgipatent.com']},
+    {'domain': 'bilgipatent.com', 'company_names': ['bilgi patent', 'bilgipatent'],
+     'competitors': ['elmaspatent.com', 'liderpatent.com.tr']},
+    {'domain': 'workexe.co', 'company_names': ['workexe'], 'variants': ['work exe', 'workex']},
+    {'domain': 'kahvedunyasi.com', 'company_names': ['kahvedunyasi', 'kahve dünyası']},
+    {'domain': 'ahrefs.com', 'company_names': ['ahrefs'], 'variants': ['ah refs', 'ahref'],
+     'competitors': ['semrush.com']},
+]
+
+
+def fold_turkish(text: str) -> str:
+    """Küçük harf + Türkçe karakter katlama ('Kahve Dünyası' -> 'kahve dunyasi'), uzunluk korunur"""
+    return (text or '').translate(_TURKISH_FOLD).lower()
+
+
+def domain_of(website: str) -> str:
+    """'https://www.Example.com/x' -> 'example.com'"""
+    return (website or '').strip().lower().replace('https://', '').replace('http://', '') \
+        .replace('www.', '').split('/')[0]
+
+
+class BrandProfile:
+    """Bir markanın tüm yazımları - bir kez derlenir, her yanıtta tekrar kullanılır
+
+    company_names: firma adları (ilki birincil ad), variants: yazım varyasyonları,
+    competitors: rakip domain'ler. Eşleşmeler fold_turkish uygulanmış metinde yapılır.
+    """
+
+    def __init__(self, domain: str, company_names: Optional[List[str]] = None,
+                 variants: Optional[List[str]] = None, competitors: Optional[List[str]] = None,
+                 source: str = 'derived'):
+        self.domain = domain_of(domain)
+        label = self.domain.split('.')[0]
+        self.company_names = [name for name in (company_names or [label, label.replace('-', ' ')]) if name.strip()]
+        self.variants = [variant for variant in (variants or []) if variant.strip()]
+        self.competitors = [domain_of(competitor) for competitor in (competitors or []) if competitor.strip()]
+        self.source = source
+
+        # Derlenmiş hali
+        self.folded_domain = fold_turkish(self.domain)
+        self.primary_name = fold_turkish(self.company_names[0]) if self.company_names else label
+        short_name = self.primary_name
+        for word in OTEL_WORDS:
+            short_name = short_name.replace(word, '')
+        self.short_name = short_name.strip()
+        self.location_variants = [f"{self.short_name} {suffix}" for suffix in OTEL_VARIANT_SUFFIXES]
+        # Aynı alias iki kez aranmasın, sıra korunur (ilk bulunan ad raporlanır)
+        self.aliases = list(dict.fromkeys(
+            fold_turkish(name) for name in self.company_names + self.variants
+        ))
+        # Bulanık eşleşme adayları (rapidfuzz/difflib)
+        self.fuzzy_names = [name for name in [self.primary_name, self.short_name] + self.location_variants
+                            if name.strip()]
+        self._alias_regex = re.compile('|'.join(
+            re.escape(alias) for alias in sorted(self.aliases, key=len, reverse=True)
+        )) if self.aliases else None
+
+    def mentions_alias(self, folded_text: str) -> bool:
+        return bool(self._alias_regex and self._alias_regex.search(folded_text))
+
+    def first_alias(self, folded_text: str) -> Optional[str]:
+        """Profil sırasıyla metinde geçen ilk ad"""
+        return next((alias for alias in self.aliases if alias in folded_text), None)
+
+    def alias_spans(self, folded_text: str) -> List[Tuple[int, int, str]]:
+        """Metindeki tüm ad geçişleri (başlangıç, bitiş, ad) - uzun ad önceliklidir"""
+        if not self._alias_regex:
+            return []
+        return [(match.start(), match.end(), match.group(0)) for match in self._alias_regex.finditer(folded_text)]
+
+    def mentions_location_variant(self, folded_text: str) -> bool:
+        return any(variant in folded_text for variant in self.location_variants)
+
+    def to_dict(self) -> Dict:
+        return {
+            'domain': self.domain,
+            'company_names': self.company_names,
+            'variants': self.variants,
+            'competitors': self.competitors,
+            'source': self.source
+        }
+
+
+class _BaseBrandRegistry:
+    """brand_profiles tablosu + process içi derlenmiş profil cache'i (sorgular '?' ile yazılır)"""
+
+    placeholder = '?'
+
+    def __init__(self, ttl_seconds: float = BRAND_REGISTRY_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._profiles: Dict[str, BrandProfile] = {}
+        self._by_label: Dict[str, BrandProfile] = {}
+        self._derived: Dict[str, BrandProfile] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def _sql(self, query: str) -> str:
+        return query if self.placeholder == '?' else query.replace('?', self.placeholder)
+
+    def _seed(self, cursor):
+        cursor.execute('SELECT COUNT(*) FROM brand_profiles')
+        if cursor.fetchone()[0]:
+            return
+        now = time.time()
+        cursor.executemany(self._sql('''
+            INSERT INTO brand_profiles (domain, company_names, variants, competitors, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        '''), [(
+            profile['domain'], json.dumps(profile['company_names'], ensure_ascii=False),
+            json.dumps(profile.get('variants', []), ensure_ascii=False),
+            json.dumps(profile.get('competitors', [])), now
+        ) for profile in BUILTIN_PROFILES])
+
+    def _load(self):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT domain, company_names, variants, competitors FROM brand_profiles')
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+
+        profiles = {}
+        for domain, company_names, variants, competitors in rows:
+            profile = BrandProfile(
+                domain, json.loads(company_names or '[]'), json.loads(variants or '[]'),
+                json.loads(competitors or '[]'), source='registry'
+            )
+            profiles[profile.domain] = profile
+        self._profiles = profiles
+        # Alan adı uzantısı farklı yazılsa da (kahvedunyasi.com.tr) aynı profil bulunur
+        self._by_label = {domain.split('.')[0]: profile for domain, profile in profiles.items()}
+        self._loaded_at = time.time()
+
+    def _ensure_loaded(self):
+        if time.time() - self._loaded_at < self.ttl_seconds:
+            return
+        with self._lock:
+            if time.time() - self._loaded_at >= self.ttl_seconds:
+                try:
+                    self._load()
+                except Exception as e:
+                    # Tablo okunamazsa domain'den türetilen profillerle devam
+                    logger.error(f"brand_profiles okunamadı: {str(e)}")
+                    self._loaded_at = time.time()
+
+    def get(self, website: str) -> BrandProfile:
+        """Website'ın derlenmiş profili - kayıtlı değilse domain'den türetilir (o da cache'lenir)"""
+        self._ensure_loaded()
+        domain = domain_of(website)
+        profile = self._profiles.get(domain) or self._by_label.get(domain.split('.')[0])
+        if profile:
+            return profile
+        profile = self._derived.get(domain)
+        if profile is None:
+            profile = self._derived[domain] = BrandProfile(domain)
+        return profile
+
+    def list_profiles(self) -> List[Dict]:
+        self._ensure_loaded()
+        return [profile.to_dict() for profile in sorted(self._profiles.values(), key=lambda p: p.domain)]
+
+    def upsert(self, domain: str, company_names: List[str], variants: Optional[List[str]] = None,
+               competitors: Optional[List[str]] = None) -> BrandProfile:
+        """Profili kaydet ve bu process'in cache'ini hemen yenile"""
+        profile = BrandProfile(domain, company_names, variants, competitors, source='registry')
+        conn = self._connect()
+        try:
+            conn.cursor().execute(self._sql('''
+                INSERT INTO brand_profiles (domain, company_names, variants, competitors, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (domain) DO UPDATE SET
+                    company_names = excluded.company_names,
+                    variants = excluded.variants,
+                    competitors = excluded.competitors,
+                    updated_at = excluded.updated_at
+            '''), (
+                profile.domain, json.dumps(profile.company_names, ensure_ascii=False),
+                json.dumps(profile.variants, ensure_ascii=False), json.dumps(profile.competitors), time.time()
+            ))
+            conn.commit()
+        finally:
+            conn.close()
+        self.invalidate()
+        return profile
+
+    def delete(self, domain: str) -> bool:
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql('DELETE FROM brand_profiles WHERE domain = ?'), (domain_of(domain),))
+            conn.commit()
+            deleted = cursor.rowcount > 0
+        finally:
+            conn.close()
+        self.invalidate()
+        return deleted
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = 0.0
+            self._derived.clear()
+
+
+class SQLiteBrandRegistry(_BaseBrandRegistry):
+
+    def __init__(self, db_path: str = 'ai_visibility.db', ttl_seconds: float = BRAND_REGISTRY_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.db_path = db_path
+        self.ensure_schema()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def ensure_schema(self):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS brand_profiles (
+                    domain TEXT PRIMARY KEY,
+                    company_names TEXT NOT NULL,
+                    variants TEXT,
+                    competitors TEXT,
+                    updated_at REAL
+                )
+            ''')
+            self._seed(cursor)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class PostgresBrandRegistry(_BaseBrandRegistry):
+
+    placeholder = '%s'
+
+    def __init__(self, dsn: Optional[str] = None, ttl_seconds: float = BRAND_REGISTRY_TTL_SECONDS):
+        super().__init__(ttl_seconds)
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        self.ensure_schema()
+
+    def _connect(self):
+        import psycopg2
+        return psycopg2.connect(self.dsn)
+
+    def ensure_schema(self):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS brand_profiles (
+                    domain TEXT PRIMARY KEY,
+                    company_names TEXT NOT NULL,
+                    variants TEXT,
+                    competitors TEXT,
+                    updated_at DOUBLE PRECISION
+                )
+            ''')
+            self._seed(cursor)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def create_brand_registry(db_path: str = 'ai_visibility.db', use_postgres: bool = False):
+    """Postgres için DATABASE_URL gerekir - yoksa yerel SQLite kullanılır"""
+    if use_postgres and os.getenv("DATABASE_URL"):
+        return PostgresBrandRegistry()
+    return SQLiteBrandRegistry(db_path)
+
+
+_default_registry = None
+
+
+def get_brand_registry():
+    """Process içinde paylaşılan registry (ilk kullanımda açılır)"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = create_brand_registry(
+            'ai_visibility.db', use_postgres=os.getenv("USE_SUPABASE", "false").lower() == "true"
+        )
+    return _default_registry
@@ -0,0 +1,394 @@
+# backend/bulk_rescorer.py
+import os
+import time
+import sqlite3
+import logging
+import difflib
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from brand_registry import create_brand_registry, get_brand_registry, fold_turkish
+from fuzzy_matcher import FUZZY_CUTOFF, CLOSE_MATCH_CUTOFF
+from response_analyzer import SCORE_WEIGHTS, ranking_label, sentiment_label, tracked_profiles
+from ranking_parser import compile_ranking_parser
+
+logger = logging.getLogger(__name__)
+
+# ⚙️ Toplu yeniden puanlama ayarları (.env üzerinden değiştirilebilir)
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", "500"))  # Okuma + tek transaction'da yazma turu başına satır
+RESCORE_WORKERS = int(os.getenv("RESCORE_WORKERS", "-1"))  # cdist thread sayısı, -1 = tüm çekirdekler
+RESCORE_PROCESSES = int(os.getenv("RESCORE_PROCESSES", "1"))  # Turları puanlayan process sayısı, 1 = havuz yok
+
+# Yeniden puanlanabilen tablolar: marka kolonu, yazılan kolonlar (sonuç anahtarı -> kolon) ve filtre
+# llm_mentions yok: response sayfa metni değil (crawler ilk 200 karakteri, pipeline Gemini raporunu saklar),
+# skor/mentioned da visibility kurallarıyla hesaplanmaz - yeniden puanlama doğru değerleri bozardı
+RESCORE_TABLES = {
+    'visibility_test_results': {
+        'website_column': 'website',
+        'columns': {'visibility_score': 'visibility_score', 'mentioned': 'mentioned',
+                    'ranking': 'ranking', 'sentiment': 'sentiment'},
+        'where': None
+    },
+}
+
+SIGNALS = tuple(SCORE_WEIGHTS)
+
+
+class BulkRescorer:
+    """N yanıt x M marka profili için ResponseAnalyzer ile aynı skorları toplu hesaplar
+
+    Satırlar marka profiline göre gruplanır; her grupta bulanık benzerlikler tek cdist
+    çağrısıyla (tüm çekirdekler) matris olarak hesaplanır:
+    - partial: profilin adları x birebir geçiş içermeyen yanıtlar, fuzz.partial_ratio
+    - close: profilin adları x gruptaki farklı kelimeler, fuzz.ratio ön elemesi + difflib doğrulaması
+    Sinyal matrisi ağırlık vektörüyle çarpılarak skorlar bulunur.
+    """
+
+    def __init__(self, registry=None, workers: int = RESCORE_WORKERS):
+        self.registry = registry or get_brand_registry()
+        self.workers = workers
+        self.weights = np.array([SCORE_WEIGHTS[signal] for signal in SIGNALS])
+
+    def score(self, responses: List[str], websites: List[str]) -> Dict[str, list]:
+        texts = [fold_turkish(response or '') for response in responses]
+        groups: Dict[str, List[int]] = {}
+        for row, website in enumerate(websites):
+            groups.setdefault(website, []).append(row)
+
+        signals = np.zeros((len(texts), len(SIGNALS)), dtype=bool)
+        spans: List[list] = [[] for _ in texts]
+        positions: List[Optional[int]] = [None] * len(texts)
+        for website, rows in groups.items():
+            profile = self.registry.get(website)
+            website_folded = fold_turkish(website)
+            ranking_parser = compile_ranking_parser(tracked_profiles(profile, self.registry))
+            for row in rows:
+                text = texts[row]
+                spans[row] = profile.alias_spans(text)
+                positions[row] = ranking_parser.parse(text, folded=True)[profile.domain]['position']
+                signals[row, :5] = (
+                    website_folded in text,
+                    profile.folded_domain in text,
+                    bool(spans[row]),
+                    bool(profile.short_name) and profile.short_name in text,
+                    profile.mentions_location_variant(text),
+                )
+            names = list(dict.fromkeys(name for name in profile.fuzzy_names if name))
+            if names:
+                group_texts = [texts[row] for row in rows]
+                signals[rows, SIGNALS.index('fuzzy')] = self._partial_hits(names, group_texts)
+                signals[rows, SIGNALS.index('close_match')] = self._close_hits(names, group_texts)
+
+        scores = np.clip(signals.astype(np.int64) @ self.weights, 0, 100)
+        return {
+            'visibility_score': scores.tolist(),
+            'mentioned': signals.any(axis=1).tolist(),
+            'ranking': [ranking_label(position, row_spans) for position, row_spans in zip(positions, spans)],
+            'sentiment': [sentiment_label(text, row_spans) for text, row_spans in zip(texts, spans)],
+        }
+
+    def _partial_hits(self, names: List[str], texts: List[str]) -> np.ndarray:
+        """partial_ratio(ad, yanıt) > eşik - birebir geçiş zaten 100'dür, cdist'e girmez"""
+        hits = np.array([any(name in text for name in names) for text in texts], dtype=bool)
+        pending = np.nonzero(~hits)[0]
+        if len(pending):
+            matrix = process.cdist(names, [texts[index] for index in pending], scorer=fuzz.partial_ratio,
+                                   score_cutoff=FUZZY_CUTOFF, dtype=np.float32, workers=self.workers)
+            hits[pending] = (matrix > FUZZY_CUTOFF).any(axis=0)
+        return hits
+
+    def _close_hits(self, names: List[str], texts: List[str]) -> np.ndarray:
+        """get_close_matches(ad, yanıtın kelimeleri) boş değil mi - gruptaki tüm yanıtlar için"""
+        words = [text.split() for text in texts]
+        vocabulary = list(dict.fromkeys(word for row_words in words for word in row_words))
+        if not vocabulary:
+            return np.zeros(len(texts), dtype=bool)
+        word_index = {word: index for index, word in enumerate(vocabulary)}
+
+        # Indel oranı difflib oranının üst sınırı - eşiğin altı difflib'de de geçemez
+        matrix = process.cdist(names, vocabulary, scorer=fuzz.ratio, score_cutoff=CLOSE_MATCH_CUTOFF * 100 - 1e-6,
+                               dtype=np.float32, workers=self.workers)
+        close_words = np.zeros(len(vocabulary), dtype=bool)
+        for name_id, word_id in zip(*np.nonzero(matrix)):
+            if not close_words[word_id]:
+                ratio = difflib.SequenceMatcher(None, vocabulary[word_id], names[name_id]).ratio()
+                close_words[word_id] = ratio >= CLOSE_MATCH_CUTOFF
+
+        row_ids = np.repeat(np.arange(len(texts)), [len(row_words) for row_words in words])
+        word_ids = np.fromiter((word_index[word] for row_words in words for word in row_words),
+                               dtype=np.intp, count=len(row_ids))
+        return np.bincount(row_ids, weights=close_words[word_ids], minlength=len(texts)) > 0
+
+
+class _BaseRescoreStore:
+    """Yeniden puanlanacak satırları id sırasıyla okur, değişenleri ve kaldığı yeri birlikte yazar"""
+
+    placeholder = '?'
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def _sql(self, query: str) -> str:
+        return query if self.placeholder == '?' else query.replace('?', self.placeholder)
+
+    def _where(self, table: str, after_id: int, website: Optional[str]):
+        spec = RESCORE_TABLES[table]
+        clauses, params = ["id > ?", "response IS NOT NULL"], [after_id]
+        if spec['where']:
+            clauses.append(spec['where'])
+        if website:
+            clauses.append(f"{spec['website_column']} = ?")
+            params.append(website)
+        return ' AND '.join(clauses), params
+
+    def count(self, table: str, website: Optional[str] = None, after_id: int = 0) -> int:
+        where, params = self._where(table, after_id, website)
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(f"SELECT COUNT(*) FROM {table} WHERE {where}"), tuple(params))
+            return cursor.fetchone()[0]
+        finally:
+            conn.close()
+
+    def fetch(self, table: str, after_id: int, limit: int, website: Optional[str] = None) -> List[Dict]:
+        spec = RESCORE_TABLES[table]
+        where, params = self._where(table, after_id, website)
+        columns = ', '.join(spec['columns'].values())
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(f'''
+                SELECT id, {spec['website_column']} AS website, response, {columns}
+                FROM {table} WHERE {where} ORDER BY id LIMIT ?
+            '''), tuple(params + [limit]))
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def iter_chunks(self, table: str, after_id: int, chunk_size: int,
+                    website: Optional[str] = None) -> Iterator[List[Dict]]:
+        """Tabloyu keyset sayfalama ile turlar halinde oku - tamamı belleğe alınmaz"""
+        while True:
+            rows = self.fetch(table, after_id, chunk_size, website)
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1]['id']
+
+    def update(self, table: str, rows: List[Dict], checkpoint: Optional[Dict] = None) -> int:
+        """Satırları ve (verilmişse) kaldığı yeri tek transaction'da yaz - rows: {'id', kolon: değer, ...}"""
+        columns = list(RESCORE_TABLES[table]['columns'].values())
+        assignments = ', '.join(f"{column} = ?" for column in columns)
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            if rows:
+                cursor.executemany(
+                    self._sql(f"UPDATE {table} SET {assignments} WHERE id = ?"),
+                    [tuple(row[column] for column in columns) + (row['id'],) for row in rows]
+                )
+            if checkpoint:
+                cursor.execute(self._sql('''
+                    INSERT INTO rescore_checkpoints (name, last_id, scanned, updated, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET last_id = excluded.last_id, scanned = excluded.scanned,
+                        updated = excluded.updated, updated_at = excluded.updated_at
+                '''), (checkpoint['name'], checkpoint['last_id'], checkpoint['scanned'],
+                      checkpoint['updated'], time.time()))
+            conn.commit()
+        finally:
+            conn.close()
+        return len(rows)
+
+    def get_checkpoint(self, name: str) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(
+                "SELECT name, last_id, scanned, updated, updated_at FROM rescore_checkpoints WHERE name = ?"
+            ), (name,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return dict(zip(('name', 'last_id', 'scanned', 'updated', 'updated_at'), row))
+        finally:
+            conn.close()
+
+    def clear_checkpoint(self, name: str):
+        """Tamamlanan çalışmanın kaydı silinir - sonraki çalışma baştan başlar"""
+        conn = self._connect()
+        try:
+            conn.cursor().execute(self._sql("DELETE FROM rescore_checkpoints WHERE name = ?"), (name,))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class SQLiteRescoreStore(_BaseRescoreStore):
+
+    def __init__(self, db_path: str = 'ai_visibility.db'):
+        self.db_path = db_path
+        self.ensure_schema()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def ensure_schema(self):
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rescore_checkpoints (
+                name TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL,
+                scanned INTEGER DEFAULT 0,
+                updated INTEGER DEFAULT 0,
+                updated_at REAL
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+
+class PostgresRescoreStore(_BaseRescoreStore):
+
+    placeholder = '%s'
+
+    def __init__(self, dsn: Optional[str] = None):
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        self.ensure_schema()
+
+    def _connect(self):
+        import psycopg2
+        return psycopg2.connect(self.dsn)
+
+    def ensure_schema(self):
+        conn = self._connect()
+        try:
+            conn.cursor().execute('''
+                CREATE TABLE IF NOT EXISTS rescore_checkpoints (
+                    name TEXT PRIMARY KEY,
+                    last_id BIGINT NOT NULL,
+                    scanned BIGINT DEFAULT 0,
+                    updated BIGINT DEFAULT 0,
+                    updated_at DOUBLE PRECISION
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def create_rescore_store(db_path: str = 'ai_visibility.db', use_postgres: bool = False):
+    """Ayarlara göre store seç - Postgres için DATABASE_URL gerekir, yoksa None
+
+    Supabase modunda yanıtlar Supabase'e yazılır; yerel SQLite'a düşmek 0 satır tarayıp başarı döndürürdü.
+    """
+    if use_postgres:
+        if not os.getenv("DATABASE_URL"):
+            return None
+        return PostgresRescoreStore()
+    return SQLiteRescoreStore(db_path)
+
+
+def changed_rows(table: str, rows: List[Dict], scored: Dict[str, list]) -> List[Dict]:
+    """Sadece değeri değişen satırlar yazılır"""
+    columns = RESCORE_TABLES[table]['columns']
+    changes = []
+    for index, row in enumerate(rows):
+        update = {'id': row['id']}
+        for key, column in columns.items():
+            update[column] = scored[key][index]
+        if any(bool(row[column]) != update[column] if key == 'mentioned' else row[column] != update[column]
+               for key, column in columns.items()):
+            changes.append(update)
+    return changes
+
+
+# Havuzdaki her process kendi marka kaydını ve rescorer'ını bir kez kurar
+_process_rescorer: Optional[BulkRescorer] = None
+
+
+def _init_process(db_path: str, use_postgres: bool):
+    global _process_rescorer
+    # Process'ler zaten paralel - cdist'in kendi thread'leri çekirdekleri bölüşmesin
+    _process_rescorer = BulkRescorer(create_brand_registry(db_path, use_postgres), workers=1)
+
+
+def score_chunk(table: str, rows: List[Dict], rescorer: Optional[BulkRescorer] = None) -> List[Dict]:
+    """Bir turun değişen satırları - LLM çağrısı yapılmaz, process havuzunda da çalışır"""
+    rescorer = rescorer or _process_rescorer or BulkRescorer()
+    scored = rescorer.score([row['response'] for row in rows], [row['website'] for row in rows])
+    return changed_rows(table, rows, scored)
+
+
+def rescore_table(store, table: str, website: Optional[str] = None, chunk_size: int = RESCORE_BATCH_SIZE,
+                  processes: int = RESCORE_PROCESSES, resume: bool = True, rescorer: Optional[BulkRescorer] = None,
+                  on_batch: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Tabloyu id sırasıyla turlar halinde yeniden puanla
+
+    processes > 1 ise turlar process havuzunda puanlanır; yazma ana process'te, turların
+    okunma sırasıyla yapılır. Her turun güncellemeleri ve son id'si aynı transaction'da
+    yazıldığından yarıda kalan çalışma resume=True ile son yazılan turdan devam eder.
+    on_batch her turdan sonra ilerleme sözlüğüyle çağrılır.
+    """
+    if table not in RESCORE_TABLES:
+        raise ValueError(f"Yeniden puanlanamayan tablo: {table}")
+    name = f"{table}:{website or '*'}"
+    checkpoint = store.get_checkpoint(name) if resume else None
+    start_id = checkpoint['last_id'] if checkpoint else 0
+    progress = {
+        'table': table,
+        'website': website,
+        'resumed_from_id': start_id,
+        'last_id': start_id,
+        'total': store.count(table, website, start_id),
+        'scanned': 0,
+        'updated': 0,
+        'seconds': 0.0,
+        'rows_per_second': None
+    }
+    started = time.perf_counter()
+
+    def commit(rows: List[Dict], changes: List[Dict]):
+        progress['scanned'] += len(rows)
+        progress['last_id'] = rows[-1]['id']
+        progress['updated'] += store.update(table, changes, checkpoint={
+            'name': name, 'last_id': progress['last_id'],
+            'scanned': progress['scanned'], 'updated': progress['updated'] + len(changes)
+        })
+        elapsed = time.perf_counter() - started
+        progress['seconds'] = round(elapsed, 2)
+        progress['rows_per_second'] = round(progress['scanned'] / elapsed, 1) if elapsed > 0 else None
+        if on_batch:
+            on_batch(dict(progress))
+
+    chunks = store.iter_chunks(table, start_id, chunk_size, website)
+    if processes <= 1:
+        for rows in chunks:
+            commit(rows, score_chunk(table, rows, rescorer))
+    else:
+        registry_args = (getattr(store, 'db_path', 'ai_visibility.db'), isinstance(store, PostgresRescoreStore))
+        # spawn: çocuklar API/worker process'inin thread'lerini ve bağlantılarını devralmaz
+        with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_process, initargs=registry_args) as pool:
+            in_flight = deque()
+            for rows in chunks:
+                in_flight.append((rows, pool.submit(score_chunk, table, rows)))
+                # Okuma puanlamanın önüne fazla geçmesin - bellekte en çok 2 tur/process
+                if len(in_flight) >= processes * 2:
+                    rows, future = in_flight.popleft()
+                    commit(rows, future.result())
+            while in_flight:
+                rows, future = in_flight.popleft()
+                commit(rows, future.result())
+
+    store.clear_checkpoint(name)
+    logger.info(f"{table} yeniden puanlandı: {progress['scanned']} satır, {progress['updated']} güncellendi, "
+                f"{progress['rows_per_second']} satır/sn")
+    return progress
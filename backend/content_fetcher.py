@@ -0,0 +1,277 @@
+# backend/content_fetcher.py
+import os
+import re
+import codecs
+import logging
+from html.parser import HTMLParser
+from typing import Dict, Optional
+
+import httpx
+import requests
+
+logger = logging.getLogger(__name__)
+
+# ⚙️ Fetch ayarları (.env üzerinden değiştirilebilir)
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(2 * 1024 * 1024)))  # En fazla 2 MB indir
+FETCH_MAX_CHARS = int(os.getenv("FETCH_MAX_CHARS", "5000"))  # Analizde kullanılan metin sınırı
+FETCH_CHUNK_SIZE = 16 * 1024
+CHARSET_SNIFF_BYTES = 4096
+
+# Sadece HTML benzeri içerikleri indir - diğerleri header'dan reddedilir
+ALLOWED_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_\-:.]+)', re.IGNORECASE)
+_HEADER_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([a-zA-Z0-9_\-:.]+)', re.IGNORECASE)
+
+
+def _valid_encoding(name: Optional[str]) -> Optional[str]:
+    """Encoding adı Python tarafından tanınıyorsa normalize edilmiş halini döndür"""
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.strip()).name
+    except LookupError:
+        return None
+
+
+def sniff_charset(head: bytes, content_type: str = '') -> str:
+    """İlk byte'lardan karakter setini tespit et (BOM > header > meta > utf-8)"""
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if head.startswith(codecs.BOM_UTF16_LE) or head.startswith(codecs.BOM_UTF16_BE):
+        return 'utf-16'
+
+    header_match = _HEADER_CHARSET_RE.search(content_type or '')
+    if header_match:
+        encoding = _valid_encoding(header_match.group(1))
+        if encoding:
+            return encoding
+
+    meta_match = _META_CHARSET_RE.search(head[:CHARSET_SNIFF_BYTES])
+    if meta_match:
+        encoding = _valid_encoding(meta_match.group(1).decode('ascii', 'ignore'))
+        if encoding:
+            return encoding
+
+    return 'utf-8'
+
+
+def is_allowed_content_type(content_type: str, allowed=ALLOWED_CONTENT_TYPES) -> bool:
+    """Content-Type header'ı izin listesinde mi? (header yoksa izin ver)"""
+    if not content_type:
+        return True
+    media_type = content_type.split(';')[0].strip().lower()
+    return media_type in allowed
+
+
+class StreamingTextExtractor(HTMLParser):
+    """HTML'i parça parça besleyip görünür metni ve title'ı toplayan parser"""
+
+    SKIP_TAGS = {'script', 'style', 'noscript', 'template'}
+
+    def __init__(self, max_chars: int = FETCH_MAX_CHARS, collect_links: bool = False):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.collect_links = collect_links
+        self.links = []
+        self.title = None
+        self._title_parts = []
+        self._in_title = False
+        self._skip_depth = 0
+        self._parts = []
+        self._char_count = 0
+
+    @property
+    def done(self) -> bool:
+        """Yeterli metin toplandı mı? (link toplanıyorsa sayfanın sonuna kadar okunur)"""
+        return not self.collect_links and self._char_count >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == 'title' and self.title is None:
+            self._in_title = True
+        elif tag == 'a' and self.collect_links:
+            attributes = dict(attrs)
+            href = (attributes.get('href') or '').strip()
+            if href and 'nofollow' not in (attributes.get('rel') or '').lower():
+                self.links.append(href)
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth > 0:
+            self._skip_depth -= 1
+        elif tag == 'title' and self._in_title:
+            self._in_title = False
+            self.title = re.sub(r'\s+', ' ', ''.join(self._title_parts)).strip()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+        if self._skip_depth or self._char_count >= self.max_chars:
+            return
+        text = re.sub(r'\s+', ' ', data)
+        if text.strip():
+            self._parts.append(text)
+            self._char_count += len(text)
+
+    def get_text(self) -> str:
+        """Toplanan metni temizlenmiş halde döndür"""
+        text = re.sub(r'\s+', ' ', ' '.join(self._parts)).strip()
+        return text[:self.max_chars]
+
+    def get_title(self) -> str:
+        if self.title:
+            return self.title
+        if self._title_parts:
+            return re.sub(r'\s+', ' ', ''.join(self._title_parts)).strip()
+        return "Başlık bulunamadı"
+
+
+class PageAccumulator:
+    """Gelen byte parçalarını charset tespiti + artımlı decode ile extractor'a besler"""
+
+    def __init__(self, content_type: str, max_bytes: int, max_chars: int, collect_links: bool = False):
+        self.content_type = content_type
+        self.max_bytes = max_bytes
+        self.extractor = StreamingTextExtractor(max_chars=max_chars, collect_links=collect_links)
+        self.decoder = None
+        self.encoding = None
+        self.head = b''
+        self.bytes_read = 0
+        self.truncated = False
+
+    def _start_decoder(self):
+        self.encoding = sniff_charset(self.head, self.content_type)
+        self.decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+        data, self.head = self.head, b''
+        return data
+
+    def feed(self, chunk: bytes) -> bool:
+        """Bir parça işle - indirmeyi kesmek gerekiyorsa True döndürür"""
+        if not chunk:
+            return False
+        if self.bytes_read + len(chunk) > self.max_bytes:
+            chunk = chunk[:self.max_bytes - self.bytes_read]
+            self.truncated = True
+        self.bytes_read += len(chunk)
+
+        if self.decoder is None:
+            # Charset tespiti için ilk byte'ları biriktir
+            self.head += chunk
+            if len(self.head) < CHARSET_SNIFF_BYTES and not self.truncated:
+                return False
+            chunk = self._start_decoder()
+
+        self.extractor.feed(self.decoder.decode(chunk))
+        return self.extractor.done or self.truncated
+
+    def finish(self, status_code: int, final_url: str) -> Dict:
+        if self.decoder is None:
+            # Sayfa sniff boyutundan küçük
+            data = self._start_decoder()
+            self.extractor.feed(self.decoder.decode(data))
+        self.extractor.feed(self.decoder.decode(b'', final=True))
+        self.extractor.close()
+
+        clean_content = self.extractor.get_text()
+        result = {
+            'success': True,
+            'content': clean_content,
+            'title': self.extractor.get_title(),
+            'status_code': status_code,
+            'final_url': final_url,
+            'encoding': self.encoding,
+            'original_size': self.bytes_read,
+            'clean_size': len(clean_content),
+            'truncated': self.truncated or self.extractor.done
+        }
+        if self.extractor.collect_links:
+            result['links'] = self.extractor.links
+        return result
+
+
+def _precheck_response(status_code: int, content_type: str, allowed_content_types) -> Optional[Dict]:
+    """Body indirilmeden önce status ve Content-Type kontrolü"""
+    if not 200 <= status_code < 300:
+        return {
+            'success': False,
+            'error': f'HTTP {status_code}',
+            'status_code': status_code
+        }
+    if not is_allowed_content_type(content_type, allowed_content_types):
+        return {
+            'success': False,
+            'error': f'Desteklenmeyen içerik türü: {content_type}',
+            'status_code': status_code
+        }
+    return None
+
+
+def fetch_page(url: str, timeout: int = 10, max_bytes: int = FETCH_MAX_BYTES,
+               max_chars: int = FETCH_MAX_CHARS, allowed_content_types=ALLOWED_CONTENT_TYPES,
+               collect_links: bool = False) -> Dict:
+    """URL'yi stream ederek indir, yeterli metin toplanınca indirmeyi kes"""
+    try:
+        with requests.get(url, headers=DEFAULT_HEADERS, timeout=timeout, stream=True) as response:
+            content_type = response.headers.get('Content-Type', '')
+            rejected = _precheck_response(response.status_code, content_type, allowed_content_types)
+            if rejected:
+                return rejected
+
+            page = PageAccumulator(content_type, max_bytes, max_chars, collect_links)
+            for chunk in response.iter_content(chunk_size=FETCH_CHUNK_SIZE):
+                if page.feed(chunk):
+                    break
+
+            result = page.finish(response.status_code, response.url)
+            logger.info(f"{url}: {result['original_size']} byte indirildi, {result['clean_size']} karakter metin ({result['encoding']})")
+            return result
+
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'status_code': 0
+        }
+
+
+def create_async_client(timeout: int = 15, max_connections: int = 100):
+    """async_fetch_page için paylaşılan httpx client'ı"""
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        timeout=timeout,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    )
+
+
+async def async_fetch_page(client, url: str, max_bytes: int = FETCH_MAX_BYTES,
+                           max_chars: int = FETCH_MAX_CHARS, allowed_content_types=ALLOWED_CONTENT_TYPES,
+                           collect_links: bool = False) -> Dict:
+    """fetch_page'in asyncio versiyonu (httpx.AsyncClient ile)"""
+    try:
+        async with client.stream('GET', url) as response:
+            content_type = response.headers.get('Content-Type', '')
+            rejected = _precheck_response(response.status_code, content_type, allowed_content_types)
+            if rejected:
+                return rejected
+
+            page = PageAccumulator(content_type, max_bytes, max_chars, collect_links)
+            async for chunk in response.aiter_bytes(FETCH_CHUNK_SIZE):
+                if page.feed(chunk):
+                    break
+
+            result = page.finish(response.status_code, str(response.url))
+            logger.info(f"{url}: {result['original_size']} byte indirildi, {result['clean_size']} karakter metin ({result['encoding']})")
+            return result
+
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'status_code': 0
+        }
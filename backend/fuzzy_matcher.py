@@ -0,0 +1,114 @@
+# backend/fuzzy_matcher.py
+import re
+import difflib
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rapidfuzz import fuzz, process
+
+FUZZY_CUTOFF = 80  # rapidfuzz partial_ratio eşiği (eşikten büyük olmalı)
+CLOSE_MATCH_CUTOFF = 0.85  # difflib kelime benzerliği eşiği (eşik dahil)
+
+_TOKEN_PATTERN = re.compile(r'\S+')
+
+
+def tokenize(text: str) -> List[Tuple[int, int, str]]:
+    """str.split() ile aynı kelimeler, metindeki konumlarıyla: (başlangıç, bitiş, kelime)"""
+    return [(match.start(), match.end(), match.group()) for match in _TOKEN_PATTERN.finditer(text)]
+
+
+def length_bounds(length: int, cutoff: float) -> Tuple[int, int]:
+    """Oran eşiğine ulaşabilecek kelime uzunlukları - 2*min/(a+b) >= cutoff olmalı"""
+    return int(length * cutoff / (2 - cutoff)), int(length * (2 - cutoff) / cutoff) + 1
+
+
+class FuzzyBrandMatcher:
+    """Marka adları için bulanık eşleşme - eski partial_ratio/difflib kararlarıyla birebir aynı
+
+    İki sinyal üretir:
+    - partial: fuzz.partial_ratio(ad, metin) > FUZZY_CUTOFF (alignment ile metindeki aralık da bulunur)
+    - close: difflib.get_close_matches(ad, kelimeler, cutoff=CLOSE_MATCH_CUTOFF) boş değil
+
+    close için her kelime difflib'e verilmez: tekrar edenler bir kez, sadece uzunluğu eşiğe
+    ulaşabilecek kova(lar)daki kelimeler rapidfuzz ratio ile elenir. Indel oranı difflib
+    oranından hiçbir zaman küçük değildir; elenen kelime difflib'de de eşiği geçemezdi.
+    Kalan az sayıda aday difflib ile doğrulanır.
+    """
+
+    def __init__(self, names: Iterable[str], fuzzy_cutoff: float = FUZZY_CUTOFF,
+                 close_cutoff: float = CLOSE_MATCH_CUTOFF):
+        self.names = list(dict.fromkeys(name for name in names if name))
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.close_cutoff = close_cutoff
+        self._bounds = {name: length_bounds(len(name), close_cutoff) for name in self.names}
+
+    def partial_matches(self, text: str, first_only: bool = False) -> List[Dict]:
+        matches = []
+        for name in self.names:
+            position = text.find(name)
+            if position != -1:
+                # Birebir geçiş partial_ratio'da 100 demektir
+                match = {'name': name, 'start': position, 'end': position + len(name), 'score': 100.0}
+            else:
+                alignment = fuzz.partial_ratio_alignment(name, text, score_cutoff=self.fuzzy_cutoff)
+                if alignment is None or alignment.score <= self.fuzzy_cutoff:
+                    continue
+                match = {'name': name, 'start': alignment.dest_start, 'end': alignment.dest_end,
+                         'score': round(alignment.score, 1)}
+            match['kind'] = 'partial'
+            matches.append(match)
+            if first_only:
+                break
+        return matches
+
+    def close_matches(self, text: str, tokens: Optional[List[Tuple[int, int, str]]] = None,
+                      first_only: bool = False) -> List[Dict]:
+        if tokens is None:
+            tokens = tokenize(text)
+        positions: Dict[str, List[Tuple[int, int]]] = {}
+        for start, end, word in tokens:
+            positions.setdefault(word, []).append((start, end))
+        buckets: Dict[int, List[str]] = {}
+        for word in positions:
+            buckets.setdefault(len(word), []).append(word)
+
+        matches = []
+        for name in self.names:
+            if first_only and name in positions:
+                found = [(name, 1.0)]
+            else:
+                low, high = self._bounds[name]
+                candidates = [word for length in range(low, high + 1) for word in buckets.get(length, ())]
+                if not candidates:
+                    continue
+                # Ön eleme (üst sınır), sonra get_close_matches'in kullandığı oranla doğrulama
+                found = []
+                for word, _, _ in process.extract(name, candidates, scorer=fuzz.ratio,
+                                                   score_cutoff=self.close_cutoff * 100 - 1e-6, limit=None):
+                    ratio = difflib.SequenceMatcher(None, word, name).ratio()
+                    if ratio >= self.close_cutoff:
+                        found.append((word, ratio))
+            for word, ratio in found:
+                for start, end in positions[word]:
+                    matches.append({'name': name, 'start': start, 'end': end,
+                                    'score': round(ratio * 100, 1), 'kind': 'close'})
+            if first_only and found:
+                break
+        return matches
+
+    def match(self, text: str, tokens: Optional[List[Tuple[int, int, str]]] = None,
+              first_only: bool = False) -> Dict:
+        """Her iki sinyal ve eşleşme aralıkları (first_only: sinyal başına ilk eşleşmede durur)"""
+        partial = self.partial_matches(text, first_only)
+        close = self.close_matches(text, tokens, first_only)
+        return {
+            'fuzzy': bool(partial),
+            'close_match': bool(close),
+            'matches': sorted(partial + close, key=lambda match: (match['start'], match['end']))
+        }
+
+
+@lru_cache(maxsize=256)
+def compile_fuzzy_matcher(names: Tuple[str, ...]) -> FuzzyBrandMatcher:
+    """Aynı ad listesi için eşik sınırları process başına bir kez hesaplanır"""
+    return FuzzyBrandMatcher(names)
@@ -0,0 +1,381 @@
+# backend/job_queue.py
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+from typing import Dict, List, Optional
+
+from tenant_quota import tenant_for_payload, DEFAULT_TENANT, TENANT_MAX_RUNNING_JOBS
+
+logger = logging.getLogger(__name__)
+
+# ⚙️ İş kuyruğu ayarları (.env üzerinden değiştirilebilir)
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "900"))  # Worker bu süre sinyal vermezse iş tekrar alınır
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+JOB_PARTIAL_RESULTS_LIMIT = 200  # Durum endpoint'inde tutulacak en fazla ara sonuç
+
+JOB_STATUSES = ('queued', 'running', 'completed', 'failed')
+ACTIVE_JOB_STATUSES = ('queued', 'running')
+
+
+class _BaseJobQueue:
+    """SQLite ve Postgres iş kuyruklarının ortak mantığı (sorgular '?' ile yazılır)"""
+
+    placeholder = '?'
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def _sql(self, query: str) -> str:
+        return query if self.placeholder == '?' else query.replace('?', self.placeholder)
+
+    def _fetch_dicts(self, cursor) -> List[Dict]:
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _decode(job: Dict) -> Dict:
+        """JSON kolonlarını aç, süreleri ekle"""
+        for key in ('payload', 'result', 'partial_results'):
+            if job.get(key):
+                job[key] = json.loads(job[key])
+        job['partial_results'] = job.get('partial_results') or []
+
+        now = time.time()
+        started = job.get('started_at')
+        finished = job.get('finished_at')
+        job['timings'] = {
+            'queued_seconds': round((started or now) - job['created_at'], 3),
+            'run_seconds': round((finished or now) - started, 3) if started else 0
+        }
+        return job
+
+    def enqueue(self, job_type: str, payload: Dict, tenant: Optional[str] = None) -> str:
+        """Yeni iş ekle, job_id döndür - tenant verilmezse payload'daki workspace_id/website'dan bulunur"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.cursor().execute(self._sql('''
+                INSERT INTO jobs (id, job_type, tenant, payload, status, progress, attempts, created_at, updated_at)
+                VALUES (?, ?, ?, ?, 'queued', 0, 0, ?, ?)
+            '''), (job_id, job_type, tenant or tenant_for_payload(payload),
+                   json.dumps(payload, ensure_ascii=False), now, now))
+            conn.commit()
+        finally:
+            conn.close()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql('SELECT * FROM jobs WHERE id = ?'), (job_id,))
+            rows = self._fetch_dicts(cursor)
+            return self._decode(rows[0]) if rows else None
+        finally:
+            conn.close()
+
+    def list_jobs(self, limit: int = 20, status: Optional[str] = None) -> List[Dict]:
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            if status:
+                cursor.execute(self._sql('''
+                    SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?
+                '''), (status, limit))
+            else:
+                cursor.execute(self._sql('SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?'), (limit,))
+            return [self._decode(job) for job in self._fetch_dicts(cursor)]
+        finally:
+            conn.close()
+
+    def statuses(self, job_ids: List[str]) -> Dict[str, str]:
+        """Birden fazla işin durumunu tek sorguda getir"""
+        if not job_ids:
+            return {}
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                self._sql(f"SELECT id, status FROM jobs WHERE id IN ({', '.join('?' for _ in job_ids)})"),
+                tuple(job_ids)
+            )
+            return {row[0]: row[1] for row in cursor.fetchall()}
+        finally:
+            conn.close()
+
+    def _expire_abandoned(self, cursor, now: float):
+        """Lease'i dolmuş ve deneme hakkı bitmiş işleri 'failed' yap"""
+        cursor.execute(self._sql('''
+            UPDATE jobs SET status = 'failed', error = 'Worker yanıt vermedi (lease süresi doldu)',
+                finished_at = ?, updated_at = ?, lease_owner = NULL, lease_expires_at = NULL
+            WHERE status = 'running' AND lease_expires_at <= ? AND attempts >= ?
+        '''), (now, now, now, JOB_MAX_ATTEMPTS))
+
+    def _claimable_query(self, job_types: Optional[List[str]], max_running: int = TENANT_MAX_RUNNING_JOBS) -> str:
+        """Sıradaki iş: en az işi çalışan tenant önce, tenant içinde en eski iş
+
+        Parametreler: now, *job_types (+ max_running > 0 ise tenant limiti)
+        """
+        type_filter = ''
+        if job_types:
+            type_filter = f"AND j.job_type IN ({', '.join('?' for _ in job_types)})"
+        running = "(SELECT COUNT(*) FROM jobs r WHERE r.status = 'running' AND r.tenant = j.tenant AND r.id <> j.id)"
+        tenant_limit = f"AND {running} < ?" if max_running > 0 else ''
+        return f'''
+            SELECT j.* FROM jobs j
+            WHERE (j.status = 'queued' OR (j.status = 'running' AND j.lease_expires_at <= ?))
+              {type_filter}
+              {tenant_limit}
+            ORDER BY {running} ASC, j.created_at ASC
+            LIMIT 1
+        '''
+
+    @staticmethod
+    def _claimable_params(now: float, job_types: Optional[List[str]],
+                          max_running: int = TENANT_MAX_RUNNING_JOBS) -> tuple:
+        params = (now, *(job_types or []))
+        return params + (max_running,) if max_running > 0 else params
+
+    def _mark_claimed(self, cursor, job: Dict, worker_id: str, lease_seconds: float, now: float) -> Dict:
+        cursor.execute(self._sql('''
+            UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires_at = ?,
+                attempts = attempts + 1, started_at = COALESCE(started_at, ?), updated_at = ?
+            WHERE id = ?
+        '''), (worker_id, now + lease_seconds, now, now, job['id']))
+        job.update({'status': 'running', 'lease_owner': worker_id, 'attempts': (job.get('attempts') or 0) + 1})
+        return self._decode(job)
+
+    def claim(self, worker_id: str, job_types: Optional[List[str]] = None,
+              lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[Dict]:
+        """Sıradaki işi atomik olarak bu worker'a kirala"""
+        raise NotImplementedError
+
+    def update_progress(self, job_id: str, worker_id: str, progress: float, message: Optional[str] = None,
+                        partial_result: Optional[Dict] = None, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        """İlerlemeyi kaydet ve lease'i uzat - iş başka worker'a geçtiyse False"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql('''
+                SELECT partial_results FROM jobs WHERE id = ? AND lease_owner = ?
+            '''), (job_id, worker_id))
+            row = cursor.fetchone()
+            if not row:
+                conn.rollback()
+                return False
+
+            partial_results = json.loads(row[0]) if row[0] else []
+            if partial_result is not None:
+                partial_results.append(partial_result)
+                partial_results = partial_results[-JOB_PARTIAL_RESULTS_LIMIT:]
+
+            cursor.execute(self._sql('''
+                UPDATE jobs SET progress = ?, progress_message = COALESCE(?, progress_message),
+                    partial_results = ?, lease_expires_at = ?, updated_at = ?
+                WHERE id = ? AND lease_owner = ?
+            '''), (
+                round(progress, 2), message, json.dumps(partial_results, ensure_ascii=False, default=str),
+                now + lease_seconds, now, job_id, worker_id
+            ))
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+
+    def renew_lease(self, job_id: str, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        """İlerleme olmasa da çalışan işin lease'ini uzat (heartbeat) - iş başka worker'a geçtiyse False"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql('''
+                UPDATE jobs SET lease_expires_at = ?, updated_at = ?
+                WHERE id = ? AND lease_owner = ? AND status = 'running'
+            '''), (now + lease_seconds, now, job_id, worker_id))
+            renewed = cursor.rowcount > 0
+            conn.commit()
+            return renewed
+        finally:
+            conn.close()
+
+    def complete(self, job_id: str, worker_id: str, result: Dict):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.cursor().execute(self._sql('''
+                UPDATE jobs SET status = 'completed', progress = 100, result = ?, error = NULL,
+                    finished_at = ?, updated_at = ?, lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = ? AND lease_owner = ?
+            '''), (json.dumps(result, ensure_ascii=False, default=str), now, now, job_id, worker_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> str:
+        """Hatalı işi deneme hakkı varsa tekrar kuyruğa al, yoksa 'failed' yap - yeni durumu döndür"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql('SELECT attempts FROM jobs WHERE id = ?'), (job_id,))
+            row = cursor.fetchone()
+            attempts = row[0] if row else JOB_MAX_ATTEMPTS
+            status = 'queued' if retry and attempts < JOB_MAX_ATTEMPTS else 'failed'
+
+            cursor.execute(self._sql('''
+                UPDATE jobs SET status = ?, error = ?, updated_at = ?,
+                    finished_at = CASE WHEN ? = 'failed' THEN ? ELSE NULL END,
+                    lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = ? AND lease_owner = ?
+            '''), (status, error, now, status, now, job_id, worker_id))
+            conn.commit()
+            return status
+        finally:
+            conn.close()
+
+
+class SQLiteJobQueue(_BaseJobQueue):
+    """jobs tablosu (SQLite) - aynı makinedeki worker process'leri paylaşır"""
+
+    def __init__(self, db_path: str = 'ai_visibility.db'):
+        self.db_path = db_path
+        self.ensure_schema()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def ensure_schema(self):
+        conn = self._connect()
+        # WAL transaction dışında açılmalı - aşağıdaki UPDATE örtük transaction başlatır
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                job_type TEXT NOT NULL,
+                tenant TEXT,
+                payload TEXT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                progress REAL DEFAULT 0,
+                progress_message TEXT,
+                partial_results TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                updated_at REAL
+            )
+        ''')
+        # Eski tablolara tenant kolonu - mevcut işler varsayılan tenant'a düşer
+        columns = [column[1] for column in conn.execute("PRAGMA table_info(jobs)").fetchall()]
+        if 'tenant' not in columns:
+            conn.execute('ALTER TABLE jobs ADD COLUMN tenant TEXT')
+        conn.execute('UPDATE jobs SET tenant = ? WHERE tenant IS NULL', (DEFAULT_TENANT,))
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_tenant ON jobs(status, tenant)')
+        conn.commit()
+        conn.close()
+
+    def claim(self, worker_id: str, job_types: Optional[List[str]] = None,
+              lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[Dict]:
+        """BEGIN IMMEDIATE ile yazma kilidi - seçim ve kiralama tek transaction'da"""
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            self._expire_abandoned(cursor, now)
+            cursor.execute(self._claimable_query(job_types), self._claimable_params(now, job_types))
+            rows = self._fetch_dicts(cursor)
+            job = self._mark_claimed(cursor, rows[0], worker_id, lease_seconds, now) if rows else None
+            cursor.execute('COMMIT')
+            return job
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+
+class PostgresJobQueue(_BaseJobQueue):
+    """Supabase/Postgres iş kuyruğu - farklı makinelerdeki worker'lar paylaşır"""
+
+    placeholder = '%s'
+
+    def __init__(self, dsn: Optional[str] = None):
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        self.ensure_schema()
+
+    def _connect(self):
+        import psycopg2
+        return psycopg2.connect(self.dsn)
+
+    def ensure_schema(self):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    job_type TEXT NOT NULL,
+                    tenant TEXT,
+                    payload TEXT,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    progress DOUBLE PRECISION DEFAULT 0,
+                    progress_message TEXT,
+                    partial_results TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_expires_at DOUBLE PRECISION,
+                    created_at DOUBLE PRECISION NOT NULL,
+                    started_at DOUBLE PRECISION,
+                    finished_at DOUBLE PRECISION,
+                    updated_at DOUBLE PRECISION
+                )
+            ''')
+            cursor.execute('ALTER TABLE jobs ADD COLUMN IF NOT EXISTS tenant TEXT')
+            cursor.execute('UPDATE jobs SET tenant = %s WHERE tenant IS NULL', (DEFAULT_TENANT,))
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_tenant ON jobs(status, tenant)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def claim(self, worker_id: str, job_types: Optional[List[str]] = None,
+              lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[Dict]:
+        """FOR UPDATE SKIP LOCKED - worker'lar birbirini beklemeden farklı işleri alır"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            now = time.time()
+            self._expire_abandoned(cursor, now)
+            query = self._claimable_query(job_types).replace('LIMIT 1', 'LIMIT 1 FOR UPDATE SKIP LOCKED')
+            cursor.execute(self._sql(query), self._claimable_params(now, job_types))
+            rows = self._fetch_dicts(cursor)
+            job = self._mark_claimed(cursor, rows[0], worker_id, lease_seconds, now) if rows else None
+            conn.commit()
+            return job
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+def create_job_queue(db_path: str = 'ai_visibility.db', use_postgres: bool = False):
+    """Postgres için DATABASE_URL gerekir - yoksa yerel SQLite kuyruğu kullanılır"""
+    if use_postgres and os.getenv("DATABASE_URL"):
+        return PostgresJobQueue()
+    return SQLiteJobQueue(db_path)
@@ -0,0 +1,469 @@
+# backend/job_scheduler.py
+import os
+import re
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from job_queue import ACTIVE_JOB_STATUSES
+from url_frontier import content_hash
+
+logger = logging.getLogger(__name__)
+
+# ⚙️ Zamanlayıcı ayarları (.env üzerinden değiştirilebilir)
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "30"))
+SCHEDULER_MAX_CONCURRENT = int(os.getenv("SCHEDULER_MAX_CONCURRENT", "2"))  # Aynı anda kuyrukta/çalışan zamanlanmış iş
+SCHEDULER_JITTER_RATIO = float(os.getenv("SCHEDULER_JITTER_RATIO", "0.1"))  # Periyodun en fazla bu oranı kadar kaydır
+SCHEDULER_MAX_JITTER_SECONDS = float(os.getenv("SCHEDULER_MAX_JITTER_SECONDS", "300"))
+SCHEDULER_MIN_INTERVAL_SECONDS = 60
+
+UPDATABLE_FIELDS = ('name', 'payload', 'schedule', 'enabled', 'skip_unchanged', 'next_run_at')
+
+_INTERVAL_PATTERN = re.compile(r'^(?:every\s+)?(\d+)\s*([smhd]?)$', re.IGNORECASE)
+_INTERVAL_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class IntervalSchedule:
+    """'every 6h', '30m', '3600' gibi sabit aralık"""
+
+    def __init__(self, seconds: int):
+        if seconds < SCHEDULER_MIN_INTERVAL_SECONDS:
+            raise ValueError(f"Aralık en az {SCHEDULER_MIN_INTERVAL_SECONDS} saniye olmalı")
+        self.seconds = seconds
+
+    def next_after(self, ts: float) -> float:
+        return ts + self.seconds
+
+    def period(self, ts: float) -> float:
+        return self.seconds
+
+
+class CronSchedule:
+    """5 alanlı cron ifadesi: dakika saat gün ay haftanın-günü (*, */n, a-b, a-b/n, a,b)"""
+
+    FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron ifadesi 5 alan olmalı: {expression}")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.FIELD_RANGES)
+        )
+        # 7 de pazar kabul edilir
+        self.weekdays = {0 if day == 7 else day for day in weekdays}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> set:
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_text = part.split('/', 1)
+                step = int(step_text)
+                if step < 1:
+                    raise ValueError(f"Geçersiz cron adımı: {field}")
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(value) for value in part.split('-', 1))
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if start < low or end > high or start > end:
+                raise ValueError(f"Geçersiz cron alanı: {field}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        # Klasik cron: iki alan da kısıtlıysa biri yeterli
+        if self.any_day:
+            return weekday_ok
+        if self.any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, ts: float) -> float:
+        moment = datetime.fromtimestamp(ts).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 4)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+        raise ValueError("Cron ifadesi hiçbir tarihle eşleşmiyor")
+
+    def period(self, ts: float) -> float:
+        first = self.next_after(ts)
+        return self.next_after(first) - first
+
+
+def parse_schedule(spec: str):
+    """Aralık ('every 6h', '30m') veya cron ('0 */6 * * *') ifadesini çöz - hatalıysa ValueError"""
+    spec = (spec or '').strip()
+    match = _INTERVAL_PATTERN.match(spec)
+    if match:
+        return IntervalSchedule(int(match.group(1)) * _INTERVAL_UNITS[match.group(2).lower()])
+    return CronSchedule(spec)
+
+
+def next_run_time(spec: str, after: float) -> float:
+    """Bir sonraki çalışma zamanı + jitter (aynı anda vadesi gelen işler yığılmasın)"""
+    schedule = parse_schedule(spec)
+    jitter = min(schedule.period(after) * SCHEDULER_JITTER_RATIO, SCHEDULER_MAX_JITTER_SECONDS)
+    return schedule.next_after(after) + random.uniform(0, jitter)
+
+
+class _BaseScheduleStore:
+    """SQLite ve Postgres schedule tablolarının ortak mantığı (sorgular '?' ile yazılır)"""
+
+    placeholder = '?'
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def _sql(self, query: str) -> str:
+        return query if self.placeholder == '?' else query.replace('?', self.placeholder)
+
+    def _fetch_dicts(self, cursor) -> List[Dict]:
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _decode(schedule: Dict) -> Dict:
+        schedule['payload'] = json.loads(schedule['payload']) if schedule.get('payload') else {}
+        schedule['enabled'] = bool(schedule.get('enabled'))
+        schedule['skip_unchanged'] = bool(schedule.get('skip_unchanged'))
+        return schedule
+
+    def _insert(self, cursor, values: tuple) -> int:
+        raise NotImplementedError
+
+    def create(self, name: str, job_type: str, target: str, payload: Dict, spec: str,
+               enabled: bool = True, skip_unchanged: bool = True) -> Dict:
+        now = time.time()
+        conn = self._connect()
+        try:
+            schedule_id = self._insert(conn.cursor(), (
+                name, job_type, target, json.dumps(payload, ensure_ascii=False), spec,
+                int(enabled), int(skip_unchanged), next_run_time(spec, now), now, now
+            ))
+            conn.commit()
+        finally:
+            conn.close()
+        return self.get(schedule_id)
+
+    def get(self, schedule_id: int) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql('SELECT * FROM schedules WHERE id = ?'), (schedule_id,))
+            rows = self._fetch_dicts(cursor)
+            return self._decode(rows[0]) if rows else None
+        finally:
+            conn.close()
+
+    def list_schedules(self, enabled_only: bool = False) -> List[Dict]:
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            query = 'SELECT * FROM schedules'
+            if enabled_only:
+                query += ' WHERE enabled = 1'
+            cursor.execute(query + ' ORDER BY id')
+            return [self._decode(schedule) for schedule in self._fetch_dicts(cursor)]
+        finally:
+            conn.close()
+
+    def due(self, now: float) -> List[Dict]:
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql('''
+                SELECT * FROM schedules WHERE enabled = 1 AND next_run_at <= ? ORDER BY next_run_at
+            '''), (now,))
+            return [self._decode(schedule) for schedule in self._fetch_dicts(cursor)]
+        finally:
+            conn.close()
+
+    def update(self, schedule_id: int, fields: Dict) -> Optional[Dict]:
+        """İzin verilen alanları güncelle - zamanlama değişirse sonraki çalışma yeniden hesaplanır"""
+        fields = {key: value for key, value in fields.items() if key in UPDATABLE_FIELDS}
+        if 'schedule' in fields and 'next_run_at' not in fields:
+            fields['next_run_at'] = next_run_time(fields['schedule'], time.time())
+        if 'payload' in fields:
+            fields['payload'] = json.dumps(fields['payload'], ensure_ascii=False)
+        for key in ('enabled', 'skip_unchanged'):
+            if key in fields:
+                fields[key] = int(bool(fields[key]))
+        if fields:
+            conn = self._connect()
+            try:
+                assignments = ', '.join(f"{key} = ?" for key in fields)
+                conn.cursor().execute(
+                    self._sql(f'UPDATE schedules SET {assignments}, updated_at = ? WHERE id = ?'),
+                    (*fields.values(), time.time(), schedule_id)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        return self.get(schedule_id)
+
+    def delete(self, schedule_id: int) -> bool:
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql('DELETE FROM schedules WHERE id = ?'), (schedule_id,))
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def advance(self, schedule: Dict, next_run_at: float, fields: Dict) -> bool:
+        """Vadeyi ilerlet (compare-and-set) - başka API process'i aynı turu aldıysa False"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            assignments = ''.join(f", {key} = ?" for key in fields)
+            cursor.execute(self._sql(f'''
+                UPDATE schedules SET next_run_at = ?, updated_at = ?{assignments}
+                WHERE id = ? AND next_run_at = ?
+            '''), (next_run_at, time.time(), *fields.values(), schedule['id'], schedule['next_run_at']))
+            conn.commit()
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def set_last_job(self, schedule_id: int, job_id: str):
+        conn = self._connect()
+        try:
+            conn.cursor().execute(self._sql('UPDATE schedules SET last_job_id = ? WHERE id = ?'), (job_id, schedule_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class SQLiteScheduleStore(_BaseScheduleStore):
+    """schedules tablosu (SQLite)"""
+
+    def __init__(self, db_path: str = 'ai_visibility.db'):
+        self.db_path = db_path
+        self.ensure_schema()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def ensure_schema(self):
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schedules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                job_type TEXT NOT NULL,
+                target TEXT NOT NULL,
+                payload TEXT,
+                schedule TEXT NOT NULL,
+                enabled INTEGER DEFAULT 1,
+                skip_unchanged INTEGER DEFAULT 1,
+                next_run_at REAL,
+                last_run_at REAL,
+                last_job_id TEXT,
+                last_input_hash TEXT,
+                last_skip_reason TEXT,
+                run_count INTEGER DEFAULT 0,
+                skip_count INTEGER DEFAULT 0,
+                created_at REAL,
+                updated_at REAL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_schedules_next_run ON schedules(enabled, next_run_at)')
+        conn.commit()
+        conn.close()
+
+    def _insert(self, cursor, values: tuple) -> int:
+        cursor.execute('''
+            INSERT INTO schedules (name, job_type, target, payload, schedule, enabled, skip_unchanged,
+                                   next_run_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', values)
+        return cursor.lastrowid
+
+
+class PostgresScheduleStore(_BaseScheduleStore):
+    """Supabase/Postgres schedules tablosu"""
+
+    placeholder = '%s'
+
+    def __init__(self, dsn: Optional[str] = None):
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        self.ensure_schema()
+
+    def _connect(self):
+        import psycopg2
+        return psycopg2.connect(self.dsn)
+
+    def ensure_schema(self):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schedules (
+                    id SERIAL PRIMARY KEY,
+                    name TEXT,
+                    job_type TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    payload TEXT,
+                    schedule TEXT NOT NULL,
+                    enabled INTEGER DEFAULT 1,
+                    skip_unchanged INTEGER DEFAULT 1,
+                    next_run_at DOUBLE PRECISION,
+                    last_run_at DOUBLE PRECISION,
+                    last_job_id TEXT,
+                    last_input_hash TEXT,
+                    last_skip_reason TEXT,
+                    run_count INTEGER DEFAULT 0,
+                    skip_count INTEGER DEFAULT 0,
+                    created_at DOUBLE PRECISION,
+                    updated_at DOUBLE PRECISION
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_schedules_next_run ON schedules(enabled, next_run_at)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _insert(self, cursor, values: tuple) -> int:
+        cursor.execute('''
+            INSERT INTO schedules (name, job_type, target, payload, schedule, enabled, skip_unchanged,
+                                   next_run_at, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING id
+        ''', values)
+        return cursor.fetchone()[0]
+
+
+def create_schedule_store(db_path: str = 'ai_visibility.db', use_postgres: bool = False):
+    """Postgres için DATABASE_URL gerekir - yoksa yerel SQLite tablosu kullanılır"""
+    if use_postgres and os.getenv("DATABASE_URL"):
+        return PostgresScheduleStore()
+    return SQLiteScheduleStore(db_path)
+
+
+class JobScheduler:
+    """Vadesi gelen schedule'ları iş kuyruğuna aktarır (çalıştırma job_worker'larda)
+
+    - Aynı hedef için önceki iş kuyrukta/çalışıyorsa o tur atlanır
+    - Zamanlanmış işlerin toplamı max_concurrent ile sınırlanır, fazlası sonraki tura kalır
+    - Girdi parmak izi son çalışmayla aynıysa (skip_unchanged) tur atlanır; None ise yapılacak iş yok
+    - Parmak izi ancak son iş başarıyla bittiyse geçerlidir - hata alan çalışma aynı girdiyle tekrarlanır
+    """
+
+    def __init__(self, store, queue, input_fingerprints: Optional[Dict[str, Callable[[Dict], Optional[str]]]] = None,
+                 max_concurrent: int = SCHEDULER_MAX_CONCURRENT, tick_seconds: float = SCHEDULER_TICK_SECONDS):
+        self.store = store
+        self.queue = queue
+        self.input_fingerprints = input_fingerprints or {}
+        self.max_concurrent = max_concurrent
+        self.tick_seconds = tick_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def fingerprint(self, schedule: Dict) -> Optional[str]:
+        handler = self.input_fingerprints.get(schedule['job_type'])
+        if handler:
+            return handler(schedule['payload'])
+        return content_hash(json.dumps(schedule['payload'], sort_keys=True, ensure_ascii=False))
+
+    def _skip(self, schedule: Dict, now: float, reason: str):
+        self.store.advance(schedule, next_run_time(schedule['schedule'], now), {
+            'last_skip_reason': reason, 'skip_count': (schedule.get('skip_count') or 0) + 1
+        })
+
+    def tick(self, now: Optional[float] = None) -> Dict:
+        """Tek tur: vadesi gelenleri kuyruğa al - özet sayaçları döndür"""
+        now = now or time.time()
+        summary = {'fired': 0, 'skipped_running': 0, 'skipped_unchanged': 0, 'skipped_no_work': 0, 'deferred': 0}
+        due = self.store.due(now)
+        if not due:
+            return summary
+
+        schedules = self.store.list_schedules()
+        statuses = self.queue.statuses([s['last_job_id'] for s in schedules if s.get('last_job_id')])
+        active = [s for s in schedules if statuses.get(s.get('last_job_id')) in ACTIVE_JOB_STATUSES]
+        active_targets = {(s['job_type'], s['target']) for s in active}
+        active_count = len(active)
+
+        for schedule in due:
+            key = (schedule['job_type'], schedule['target'])
+            if key in active_targets:
+                self._skip(schedule, now, 'previous_run_active')
+                summary['skipped_running'] += 1
+                continue
+            if active_count >= self.max_concurrent:
+                # Vade ilerletilmez - kapasite açılınca sonraki turda çalışır
+                summary['deferred'] += 1
+                continue
+
+            try:
+                fingerprint = self.fingerprint(schedule)
+            except Exception as e:
+                logger.error(f"Schedule {schedule['id']} girdi kontrolü hatası: {str(e)}")
+                summary['deferred'] += 1
+                continue
+            if fingerprint is None:
+                self._skip(schedule, now, 'no_work')
+                summary['skipped_no_work'] += 1
+                continue
+            last_completed = statuses.get(schedule.get('last_job_id')) == 'completed'
+            if schedule['skip_unchanged'] and last_completed and fingerprint == schedule.get('last_input_hash'):
+                self._skip(schedule, now, 'inputs_unchanged')
+                summary['skipped_unchanged'] += 1
+                continue
+
+            fired = self.store.advance(schedule, next_run_time(schedule['schedule'], now), {
+                'last_run_at': now, 'last_input_hash': fingerprint, 'last_skip_reason': None,
+                'run_count': (schedule.get('run_count') or 0) + 1
+            })
+            if not fired:
+                continue  # Başka process bu turu aldı
+
+            job_id = self.queue.enqueue(schedule['job_type'], schedule['payload'])
+            self.store.set_last_job(schedule['id'], job_id)
+            logger.info(f"Schedule {schedule['id']} ({schedule['job_type']} / {schedule['target']}) -> iş {job_id}")
+            active_targets.add(key)
+            active_count += 1
+            summary['fired'] += 1
+
+        return summary
+
+    async def run(self):
+        logger.info(f"Zamanlayıcı başladı (tur={self.tick_seconds}s, en fazla {self.max_concurrent} eşzamanlı iş)")
+        while True:
+            try:
+                await asyncio.to_thread(self.tick)
+            except Exception as e:
+                logger.error(f"Zamanlayıcı turu hatası: {str(e)}")
+            await asyncio.sleep(self.tick_seconds)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
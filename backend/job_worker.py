@@ -0,0 +1,113 @@
+# backend/job_worker.py
+import os
+import time
+import asyncio
+import logging
+import argparse
+import traceback
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from job_queue import JOB_LEASE_SECONDS
+from url_frontier import make_worker_id
+from tenant_quota import usage_ledger
+
+logger = logging.getLogger(__name__)
+
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+# Handler uzun süre ilerleme bildirmese de lease bu aralıkla uzatılır (lease süresinden kısa olmalı)
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", str(JOB_LEASE_SECONDS / 3)))
+
+
+class JobWorker:
+    """jobs tablosundan iş alıp ilgili handler'ı çalıştıran worker"""
+
+    def __init__(self, queue, handlers: Dict, job_types: Optional[List[str]] = None,
+                 poll_interval: float = JOB_POLL_SECONDS, heartbeat_interval: float = JOB_HEARTBEAT_SECONDS):
+        self.queue = queue
+        self.handlers = handlers
+        self.job_types = job_types or list(handlers.keys())
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.worker_id = make_worker_id()
+
+    async def heartbeat(self, job_id: str):
+        """İş sürdükçe lease'i uzat - tek prompt/sayfa lease süresinden uzun sürse de iş tekrar alınmaz"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                if not await asyncio.to_thread(self.queue.renew_lease, job_id, self.worker_id):
+                    logger.warning(f"İş {job_id} artık bu worker'a ait değil - heartbeat durdu")
+                    return
+            except Exception as e:
+                logger.error(f"Lease uzatılamadı ({job_id}): {str(e)}")
+
+    async def run_job(self, job: Dict) -> str:
+        """Tek işi çalıştır, son durumu döndür"""
+        job_id = job['id']
+        handler = self.handlers.get(job['job_type'])
+        if not handler:
+            return await asyncio.to_thread(
+                self.queue.fail, job_id, self.worker_id, f"Bilinmeyen iş türü: {job['job_type']}", False
+            )
+
+        async def progress(percent: float, message: str = None, partial_result: Dict = None):
+            # İlerleme kaydı başarısız olsa da iş devam eder
+            try:
+                still_owner = await asyncio.to_thread(
+                    self.queue.update_progress, job_id, self.worker_id, min(percent, 99.0), message, partial_result
+                )
+                if not still_owner:
+                    logger.warning(f"İş {job_id} artık bu worker'a ait değil")
+            except Exception as e:
+                logger.error(f"İlerleme kaydedilemedi ({job_id}): {str(e)}")
+
+        logger.info(f"İş başladı: {job['job_type']} ({job_id}), deneme {job['attempts']}")
+        start = time.perf_counter()
+        heartbeat = asyncio.create_task(self.heartbeat(job_id))
+        try:
+            result = await handler(job.get('payload') or {}, progress)
+        except Exception as e:
+            logger.error(f"İş hatası ({job_id}): {str(e)}\n{traceback.format_exc()}")
+            status = await asyncio.to_thread(self.queue.fail, job_id, self.worker_id, str(e))
+            logger.info(f"İş {job_id} -> {status}")
+            return status
+        finally:
+            heartbeat.cancel()
+            # İşin LLM/fetch kullanımı ile birlikte tenant_usage'a yaz
+            usage_ledger.record(job.get('tenant'), jobs=1, job_seconds=time.perf_counter() - start)
+            await asyncio.to_thread(usage_ledger.flush)
+
+        await asyncio.to_thread(self.queue.complete, job_id, self.worker_id, result)
+        logger.info(f"İş tamamlandı: {job_id} ({time.perf_counter() - start:.1f}s)")
+        return 'completed'
+
+    async def run(self, once: bool = False):
+        """Kuyruğu dinle - once=True ise kuyruk boşalınca çık"""
+        logger.info(f"Job worker başladı: {self.worker_id}, türler: {self.job_types}")
+        while True:
+            job = await asyncio.to_thread(self.queue.claim, self.worker_id, self.job_types)
+            if job:
+                await self.run_job(job)
+                continue
+            if once:
+                return
+            await asyncio.sleep(self.poll_interval)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Uzun süren analiz işlerini çalıştıran worker")
+    arg_parser.add_argument('--types', nargs='*', help='Sadece bu iş türlerini al (varsayılan: hepsi)')
+    arg_parser.add_argument('--once', action='store_true', help='Kuyruk boşalınca çık')
+    arg_parser.add_argument('--poll-interval', type=float, default=JOB_POLL_SECONDS)
+    args = arg_parser.parse_args()
+
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # Handler'lar API ile aynı kodu kullanır
+    from main import JOB_HANDLERS, job_queue
+
+    worker = JobWorker(job_queue, JOB_HANDLERS, job_types=args.types, poll_interval=args.poll_interval)
+    asyncio.run(worker.run(once=args.once))
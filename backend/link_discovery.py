@@ -0,0 +1,206 @@
+# backend/link_discovery.py
+import os
+import time
+import asyncio
+import sqlite3
+import logging
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urlsplit
+
+from dotenv import load_dotenv
+
+from content_fetcher import async_fetch_page, create_async_client
+from robots_cache import RobotsCache, HostScheduler, SQLiteRobotsStore, ROBOTS_ALLOWED, ROBOTS_UNAVAILABLE
+from seen_set import BloomFilter
+from url_canonicalizer import canonicalize_url, canonical_host
+
+logger = logging.getLogger(__name__)
+
+# ⚙️ Keşif ayarları
+DISCOVERY_MAX_DEPTH = 2
+DISCOVERY_MAX_PAGES = 500
+DISCOVERY_CONCURRENCY = 10
+DISCOVERY_SEEN_PATH = os.getenv("DISCOVERY_SEEN_PATH", "discovery_seen.bloom")
+DISCOVERY_SEEN_CAPACITY = int(os.getenv("DISCOVERY_SEEN_CAPACITY", "5000000"))
+DISCOVERY_INSERT_BATCH = 100
+
+# HTML olmayan uzantılar - link olarak kuyruğa alınmaz
+SKIPPED_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.zip', '.gz', '.rar',
+    '.mp3', '.mp4', '.avi', '.mov', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.css', '.js', '.xml'
+)
+
+
+def normalize_link(base_url: str, href: str) -> Optional[str]:
+    """Sayfadaki href'i mutlak URL'ye çevir (fragment'sız), uygun değilse None"""
+    if href.startswith(('mailto:', 'tel:', 'javascript:', 'data:', '#')):
+        return None
+    absolute = urljoin(base_url, href)
+    parts = urlsplit(absolute)
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return None
+    if parts.path.lower().endswith(SKIPPED_EXTENSIONS):
+        return None
+    return parts._replace(fragment='').geturl()
+
+
+class LinkDiscoveryCrawler:
+    """urls tablosundaki sitelerden iç linkleri BFS ile keşfedip analiz kuyruğuna ekler"""
+
+    def __init__(self, db_path: str = 'ai_visibility.db', max_depth: int = DISCOVERY_MAX_DEPTH,
+                 max_pages: int = DISCOVERY_MAX_PAGES, concurrency: int = DISCOVERY_CONCURRENCY,
+                 seen_path: str = DISCOVERY_SEEN_PATH):
+        self.db_path = db_path
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.seen = BloomFilter(seen_path, capacity=DISCOVERY_SEEN_CAPACITY)
+        robots_store = SQLiteRobotsStore(db_path)
+        self.robots = RobotsCache(store=robots_store)
+        self.host_scheduler = HostScheduler(store=robots_store)
+        self._pending_inserts = []
+        self.stats = {
+            'seeds': 0,
+            'pages_fetched': 0,
+            'fetch_errors': 0,
+            'robots_blocked': 0,
+            'robots_unavailable': 0,
+            'links_seen': 0,
+            'urls_discovered': 0
+        }
+
+    def get_seed_urls(self) -> List[Dict]:
+        """Aktif URL'leri tohum olarak al (manuel eklenenler önce)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute('''
+            SELECT id, url, canonical_url FROM urls
+            WHERE status = 'active'
+            ORDER BY CASE WHEN source = 'discovery' THEN 1 ELSE 0 END, last_analysis ASC NULLS FIRST
+        ''').fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def _flush_inserts(self):
+        """Yeni bulunan URL'leri tek transaction'da ekle"""
+        if not self._pending_inserts:
+            return
+        batch, self._pending_inserts = self._pending_inserts, []
+        now = datetime.now()
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            before = conn.total_changes
+            with conn:
+                conn.executemany('''
+                    INSERT OR IGNORE INTO urls (url, canonical_url, status, source, created_at, updated_at)
+                    VALUES (?, ?, 'active', 'discovery', ?, ?)
+                ''', [(url, canonical, now, now) for url, canonical in batch])
+            self.stats['urls_discovered'] += conn.total_changes - before
+        finally:
+            conn.close()
+
+    async def _process(self, client, url: str, depth: int, site_host: str, queue: asyncio.Queue):
+        robots_status = await asyncio.to_thread(self.robots.check, url)
+        if robots_status != ROBOTS_ALLOWED:
+            # Okunamayan robots.txt engel sayılmaz - sayfa bir sonraki keşifte tekrar denenir
+            self.stats['robots_unavailable' if robots_status == ROBOTS_UNAVAILABLE else 'robots_blocked'] += 1
+            return
+
+        delay = await asyncio.to_thread(self.robots.crawl_delay, url)
+        wait_seconds = await asyncio.to_thread(self.host_scheduler.reserve, url, delay)
+        if wait_seconds > 0:
+            await asyncio.sleep(wait_seconds)
+
+        result = await async_fetch_page(client, url, max_chars=0, collect_links=True)
+        self.stats['pages_fetched'] += 1
+        if not result['success']:
+            self.stats['fetch_errors'] += 1
+            return
+
+        base_url = result.get('final_url') or url
+        for href in result.get('links', []):
+            link = normalize_link(base_url, href)
+            if not link:
+                continue
+            self.stats['links_seen'] += 1
+            canonical = canonicalize_url(link)
+            # Sadece aynı sitenin iç linkleri
+            if canonical_host(canonical) != site_host:
+                continue
+            if not self.seen.add(canonical):
+                continue
+
+            self._pending_inserts.append((link, canonical))
+            if len(self._pending_inserts) >= DISCOVERY_INSERT_BATCH:
+                await asyncio.to_thread(self._flush_inserts)
+
+            if depth + 1 < self.max_depth:
+                queue.put_nowait((link, depth + 1, site_host))
+
+    async def run(self) -> Dict:
+        """BFS keşfi çalıştır (derinlik ve sayfa bütçesi ile sınırlı)"""
+        start = time.perf_counter()
+        seeds = self.get_seed_urls()
+        self.stats['seeds'] = len(seeds)
+
+        queue = asyncio.Queue()
+        for seed in HostScheduler.interleave(seeds):
+            canonical = seed.get('canonical_url') or canonicalize_url(seed['url'])
+            self.seen.add(canonical)
+            queue.put_nowait((seed['url'], 0, canonical_host(canonical)))
+
+        budget = {'remaining': self.max_pages}
+
+        async def worker(client):
+            while True:
+                url, depth, site_host = await queue.get()
+                try:
+                    if budget['remaining'] <= 0:
+                        continue
+                    budget['remaining'] -= 1
+                    await self._process(client, url, depth, site_host, queue)
+                except Exception as e:
+                    logger.error(f"Keşif hatası ({url}): {str(e)}")
+                    self.stats['fetch_errors'] += 1
+                finally:
+                    queue.task_done()
+
+        async with create_async_client(max_connections=self.concurrency) as client:
+            workers = [asyncio.create_task(worker(client)) for _ in range(self.concurrency)]
+            await queue.join()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        await asyncio.to_thread(self._flush_inserts)
+        self.seen.flush()
+
+        self.stats['duration_seconds'] = round(time.perf_counter() - start, 2)
+        self.stats['seen_set_size'] = len(self.seen)
+        logger.info(f"Link keşfi tamamlandı: {self.stats}")
+        return self.stats
+
+    def close(self):
+        self.seen.close()
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Takip edilen sitelerde iç link keşfi")
+    arg_parser.add_argument('--max-depth', type=int, default=DISCOVERY_MAX_DEPTH)
+    arg_parser.add_argument('--max-pages', type=int, default=DISCOVERY_MAX_PAGES)
+    arg_parser.add_argument('--concurrency', type=int, default=DISCOVERY_CONCURRENCY)
+    arg_parser.add_argument('--db-path', default='ai_visibility.db')
+    args = arg_parser.parse_args()
+
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    crawler = LinkDiscoveryCrawler(db_path=args.db_path, max_depth=args.max_depth,
+                                   max_pages=args.max_pages, concurrency=args.concurrency)
+    try:
+        result = asyncio.run(crawler.run())
+        print(f"Sonuç: {result}")
+    finally:
+        crawler.close()
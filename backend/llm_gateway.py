@@ -0,0 +1,164 @@
+# backend/llm_gateway.py
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Dict
+
+from pipeline_stats import percentile
+from tenant_quota import FairQueue, DEFAULT_TENANT, TENANT_MAX_LLM_CONCURRENCY, usage_ledger
+
+logger = logging.getLogger(__name__)
+
+# ⚙️ LLM çağrı ayarları (.env üzerinden değiştirilebilir)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))  # Process başına aynı anda Gemini çağrısı
+LLM_RESERVED_INTERACTIVE = int(os.getenv("LLM_RESERVED_INTERACTIVE", "1"))  # Batch'in kullanamayacağı slot
+LLM_WAIT_SAMPLES = 500  # Bekleme süresi yüzdelikleri için tutulan son ölçüm
+
+LANE_INTERACTIVE = 'interactive'  # Kullanıcının beklediği istekler (quick test, prompt analizi, canlı test)
+LANE_BATCH = 'batch'  # Crawl, pipeline, zamanlanmış ve kuyruktaki işler
+LANES = (LANE_INTERACTIVE, LANE_BATCH)  # Öncelik sırası
+
+
+class LLMGateway:
+    """Gemini çağrıları için öncelikli şeritler
+
+    - Interactive istekler her zaman kuyruktaki batch çağrılarının önüne geçer
+    - reserved_interactive kadar slot sadece interactive'e açıktır, batch onları dolduramaz
+    - Çalışan çağrı kesilmez; öncelik sadece sıradaki çağrılar arasında uygulanır
+    - Şerit içinde tenant'lar (website/workspace) ağırlıklı adil sırayla slot alır,
+      max_per_tenant verilmişse bir tenant aynı anda o kadar çağrıdan fazlasını çalıştıramaz
+    - Tüm limitler process başınadır: API ve her job_worker kendi gateway'ini tutar, toplam eşzamanlı
+      çağrı process sayısı x max_concurrency olur. Öncelik ve rezervasyon sadece aynı process'teki
+      batch çağrılarına karşıdır - job_worker'lardaki toplu işlerin önüne geçilmez
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 reserved_interactive: int = LLM_RESERVED_INTERACTIVE,
+                 max_per_tenant: int = TENANT_MAX_LLM_CONCURRENCY):
+        self.max_concurrency = max(1, max_concurrency)
+        self.reserved_interactive = min(max(0, reserved_interactive), self.max_concurrency - 1)
+        self.max_per_tenant = max(0, max_per_tenant)
+        self._waiters = {lane: FairQueue() for lane in LANES}
+        self._running = {lane: 0 for lane in LANES}
+        self._running_by_tenant: Dict[str, int] = {}
+        self._counters = {lane: {'submitted': 0, 'completed': 0, 'errors': 0, 'preempted': 0} for lane in LANES}
+        self._interactive_grants = 0  # Bekleyen batch çağrısının önüne geçen interactive slotları saymak için
+        self._wait_times = {lane: deque(maxlen=LLM_WAIT_SAMPLES) for lane in LANES}
+        self._run_times = {lane: deque(maxlen=LLM_WAIT_SAMPLES) for lane in LANES}
+
+    def capacity(self, lane: str) -> int:
+        if lane == LANE_INTERACTIVE:
+            return self.max_concurrency
+        return self.max_concurrency - self.reserved_interactive
+
+    def _tenant_has_room(self, tenant: str) -> bool:
+        return not self.max_per_tenant or self._running_by_tenant.get(tenant, 0) < self.max_per_tenant
+
+    def _dispatch(self):
+        """Önce interactive şerit - orada kalanlar ya kapasite ya da tenant limiti yüzünden bekliyor"""
+        for lane in LANES:
+            waiters = self._waiters[lane]
+            while sum(self._running.values()) < self.capacity(lane):
+                next_waiter = waiters.pop(self._tenant_has_room)
+                if next_waiter is None:
+                    break
+                tenant, future = next_waiter
+                if future.done():
+                    continue
+                self._running[lane] += 1
+                self._running_by_tenant[tenant] = self._running_by_tenant.get(tenant, 0) + 1
+                if lane == LANE_INTERACTIVE:
+                    self._interactive_grants += 1
+                future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, lane: str = LANE_BATCH, tenant: str = DEFAULT_TENANT):
+        """Şeritte sıra bekle, slot alınca çalıştır"""
+        if lane not in LANES:
+            raise ValueError(f"Bilinmeyen LLM şeridi: {lane}")
+        tenant = tenant or DEFAULT_TENANT
+        self._counters[lane]['submitted'] += 1
+        enqueued_at = time.perf_counter()
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[lane].push(tenant, future)
+        self._dispatch()
+        if not future.done():
+            grants_before = self._interactive_grants
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Slot verildi ama çağıran iptal edildi - slotu geri bırak
+                    self._release(lane, tenant)
+                else:
+                    self._waiters[lane].remove(tenant, future)
+                raise
+            if lane == LANE_BATCH and self._interactive_grants > grants_before:
+                # Beklerken interactive çağrılar önüne geçti - her batch çağrısı bir kez sayılır
+                self._counters[LANE_BATCH]['preempted'] += 1
+
+        started_at = time.perf_counter()
+        wait_seconds = started_at - enqueued_at
+        self._wait_times[lane].append(wait_seconds)
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            self._counters[lane]['errors'] += 1
+            raise
+        finally:
+            run_seconds = time.perf_counter() - started_at
+            self._run_times[lane].append(run_seconds)
+            self._counters[lane]['completed'] += 1
+            usage_ledger.record(tenant, llm_calls=1, llm_errors=int(failed),
+                                llm_seconds=run_seconds, llm_wait_seconds=wait_seconds)
+            self._release(lane, tenant)
+
+    def _release(self, lane: str, tenant: str):
+        self._running[lane] -= 1
+        self._running_by_tenant[tenant] -= 1
+        if not self._running_by_tenant[tenant]:
+            del self._running_by_tenant[tenant]
+        self._dispatch()
+
+    async def call(self, func: Callable, *args, lane: str = LANE_BATCH, tenant: str = DEFAULT_TENANT, **kwargs):
+        """Bloklayan LLM çağrısını slot alarak thread'de çalıştır"""
+        async with self.slot(lane, tenant):
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    def stats(self) -> Dict:
+        """Şerit ve tenant başına kuyruk derinliği, çalışan çağrı ve bekleme süreleri - rezervasyonu boyutlandırmak için"""
+        lanes = {}
+        for lane in LANES:
+            waits = list(self._wait_times[lane])
+            runs = list(self._run_times[lane])
+            lanes[lane] = {
+                'capacity': self.capacity(lane),
+                'running': self._running[lane],
+                'queued': len(self._waiters[lane]),
+                'queued_by_tenant': self._waiters[lane].depths(),
+                **self._counters[lane],
+                'wait_p50_seconds': round(percentile(waits, 50), 3),
+                'wait_p95_seconds': round(percentile(waits, 95), 3),
+                'wait_max_seconds': round(max(waits), 3) if waits else 0.0,
+                'run_p50_seconds': round(percentile(runs, 50), 3),
+                'run_p95_seconds': round(percentile(runs, 95), 3)
+            }
+        return {
+            'scope': 'process',
+            'pid': os.getpid(),
+            'max_concurrency': self.max_concurrency,
+            'reserved_interactive': self.reserved_interactive,
+            'max_per_tenant': self.max_per_tenant,
+            'running_by_tenant': dict(self._running_by_tenant),
+            'lanes': lanes
+        }
+
+
+# Process içindeki tüm Gemini çağrıları bu örneği paylaşır
+llm_gateway = LLMGateway()
@@ -7,15 +7,34 @@ from dotenv import load_dotenv
 from supabase import create_client, Client
 import google.generativeai as genai
 import sqlite3
-import requests
 import logging
 import json
 from typing import List, Dict
+from collections import defaultdict
 import time
+import asyncio
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urljoin, urlparse
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from content_fetcher import fetch_page, async_fetch_page, create_async_client
+from pipeline_stats import StageStats
+from multi_pattern import compile_mention_scanner, lower_text, mention_score
+from mention_spans import SQLiteSpanIndex, append_spans_sqlite, append_spans_supabase, window_spans
+from pair_results import name_list
+from url_canonicalizer import canonicalize_url
+from tenant_quota import tenant_for_website
+from url_frontier import SQLiteURLFrontier, FRONTIER_BATCH_SIZE, content_hash, create_frontier, make_worker_id
+from robots_cache import (
+    RobotsCache, HostScheduler, SQLiteRobotsStore, SupabaseRobotsStore, host_key,
+    ROBOTS_BLOCKED, ROBOTS_UNAVAILABLE, ROBOTS_ERROR_TTL_SECONDS
+)
+from mention_events import (
+    SQLiteMentionEventLog, append_events_sqlite, append_events_supabase, mention_created, history_changed
+)
+
 # 🌍 .env dosyasını yükle
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 
@@ -24,6 +43,12 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# ⚙️ URL crawler'larının tarayacağı brand/model listesi (.env üzerinden değiştirilebilir)
+CRAWLER_BRANDS = name_list(os.getenv("CRAWLER_BRANDS"),
+                           ['Workexe', 'OpenAI', 'Anthropic', 'Google', 'Microsoft', 'Meta', 'Ahrefs', 'Semrush'])
+CRAWLER_MODELS = name_list(os.getenv("CRAWLER_MODELS"),
+                           ['ChatGPT', 'Claude', 'Gemini', 'Copilot', 'Llama', 'GPT-4', 'GPT-3.5', 'Bard'])
+
 # Supabase client'ı başlat
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
@@ -83,6 +108,41 @@ def analyze_brand(brand, model):
         }
 
 # 🚀 Supabase tabloları oluşturma fonksiyonu
+
+# Eski kurulumların urls tablosuna sonradan eklenen kolonlar (SQLite'ta init_sqlite_db ALTER ile ekler)
+SUPABASE_URLS_MIGRATION = """
+        -- urls: kanonik URL, sitemap lastmod/kaynak ve workspace kolonları
+        ALTER TABLE urls ADD COLUMN IF NOT EXISTS canonical_url TEXT;
+        ALTER TABLE urls ADD COLUMN IF NOT EXISTS lastmod TIMESTAMP WITH TIME ZONE;
+        ALTER TABLE urls ADD COLUMN IF NOT EXISTS source TEXT DEFAULT 'manual';
+        ALTER TABLE urls ADD COLUMN IF NOT EXISTS workspace_id TEXT;
+        -- NULL'lar çakışmaz; crawler eski satırların canonical_url'ünü doldurur
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_urls_canonical_url ON urls(canonical_url);
+"""
+
+
+def migrate_supabase_urls():
+    """Mevcut urls tablosunda yeni kolonlar yoksa SQL'i göster, varsa eski satırları doldur"""
+    try:
+        supabase.table('urls').select('id, canonical_url, lastmod, source, workspace_id').limit(1).execute()
+    except Exception:
+        print("🔧 urls tablosunda eksik kolonlar var - Supabase SQL Editor'da çalıştırın:")
+        print("="*50)
+        print(SUPABASE_URLS_MIGRATION)
+        print("="*50)
+        return False
+
+    missing = supabase.table('urls').select('id, url').is_('canonical_url', 'null').execute().data or []
+    for row in missing:
+        try:
+            supabase.table('urls').update({'canonical_url': canonicalize_url(row['url'])}).eq('id', row['id']).execute()
+        except Exception as e:
+            # Unique index: aynı kanonik URL'ye sahip eski kayıt - elle birleştirilmeli
+            print(f"⚠️ canonical_url doldurulamadı ({row['url']}): {e}")
+    missing = supabase.table('urls').select('id, url').is_('workspace_id', 'null').execute().data or []
+    for row in missing:
+        supabase.table('urls').update({'workspace_id': tenant_for_website(row['url'])}).eq('id', row['id']).execute()
+    return True
 def create_supabase_tables():
     """Supabase'de gerekli tabloları oluştur (PostgreSQL syntax)"""
     try:
@@ -111,7 +171,11 @@ def create_supabase_tables():
         CREATE TABLE IF NOT EXISTS urls (
             id SERIAL PRIMARY KEY,
             url TEXT NOT NULL UNIQUE,
+            canonical_url TEXT UNIQUE,
+            workspace_id TEXT,
             status TEXT DEFAULT 'pending',
+            lastmod TIMESTAMP WITH TIME ZONE,
+            source TEXT DEFAULT 'manual',
             title TEXT,
             description TEXT,
             last_analysis TIMESTAMP WITH TIME ZONE,
@@ -121,6 +185,14 @@ def create_supabase_tables():
             updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
         );
 
+        -- URL Aliases tablosu (aynı kanonik URL'ye giden yazımlar/yönlendirmeler)
+        CREATE TABLE IF NOT EXISTS url_aliases (
+            id SERIAL PRIMARY KEY,
+            alias_url TEXT NOT NULL UNIQUE,
+            url_id INTEGER REFERENCES urls(id) ON DELETE CASCADE,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        );
+
         -- URL Analysis Results tablosu
         CREATE TABLE IF NOT EXISTS url_analysis_results (
             id SERIAL PRIMARY KEY,
@@ -147,27 +219,99 @@ def create_supabase_tables():
             completed_at TIMESTAMP WITH TIME ZONE
         );
 
+        -- robots.txt cache tablosu (crawler worker'ları paylaşır)
+        CREATE TABLE IF NOT EXISTS robots_cache (
+            host TEXT PRIMARY KEY,
+            robots_txt TEXT,
+            status_code INTEGER,
+            fetched_at DOUBLE PRECISION,
+            expires_at DOUBLE PRECISION
+        );
+
+        -- URL frontier tablosu (vade, öncelik, hata geri çekilmesi, adaptif ziyaret aralığı)
+        CREATE TABLE IF NOT EXISTS url_frontier (
+            url_id INTEGER PRIMARY KEY REFERENCES urls(id) ON DELETE CASCADE,
+            next_due_at DOUBLE PRECISION NOT NULL DEFAULT 0,
+            priority DOUBLE PRECISION DEFAULT 1.0,
+            revisit_interval DOUBLE PRECISION,
+            error_count INTEGER DEFAULT 0,
+            last_error TEXT,
+            last_content_hash TEXT,
+            check_count INTEGER DEFAULT 0,
+            change_count INTEGER DEFAULT 0,
+            last_checked_at DOUBLE PRECISION,
+            lease_owner TEXT,
+            lease_expires_at DOUBLE PRECISION
+        );
+
+        -- Canlı dashboard bildirimleri (outbox) - API tek poller ile takip eder
+        CREATE TABLE IF NOT EXISTS mention_events (
+            id BIGSERIAL PRIMARY KEY,
+            event_type TEXT NOT NULL,
+            payload JSONB NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        );
+
+        -- Visibility testlerinde prompt başına yanıtlar - toplu yeniden puanlama bunları okur
+        CREATE TABLE IF NOT EXISTS visibility_test_results (
+            id BIGSERIAL PRIMARY KEY,
+            test_id BIGINT,
+            website TEXT NOT NULL,
+            workspace_id TEXT,
+            prompt TEXT,
+            response TEXT,
+            visibility_score INTEGER DEFAULT 0,
+            mentioned BOOLEAN DEFAULT FALSE,
+            ranking TEXT,
+            sentiment TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        );
+
+        -- Yanıtlardaki eşleşme konumları (llm_mentions / visibility_test_results satırına göre)
+        CREATE TABLE IF NOT EXISTS mention_spans (
+            source TEXT NOT NULL,
+            row_id BIGINT NOT NULL,
+            start_offset INTEGER NOT NULL,
+            end_offset INTEGER NOT NULL,
+            alias TEXT,
+            match_type TEXT,
+            score REAL
+        );
+
         -- İndeksler
+        CREATE INDEX IF NOT EXISTS idx_mention_spans_row ON mention_spans(source, row_id);
+        CREATE INDEX IF NOT EXISTS idx_visibility_test_results_website ON visibility_test_results(website);
+        CREATE INDEX IF NOT EXISTS idx_url_frontier_due ON url_frontier(next_due_at);
         CREATE INDEX IF NOT EXISTS idx_llm_mentions_brand_model ON llm_mentions(brand, model);
         CREATE INDEX IF NOT EXISTS idx_llm_mentions_created_at ON llm_mentions(created_at);
         CREATE INDEX IF NOT EXISTS idx_urls_status ON urls(status);
         CREATE INDEX IF NOT EXISTS idx_urls_created_at ON urls(created_at);
+        CREATE INDEX IF NOT EXISTS idx_url_aliases_url_id ON url_aliases(url_id);
         CREATE INDEX IF NOT EXISTS idx_url_analysis_results_url_id ON url_analysis_results(url_id);
         CREATE INDEX IF NOT EXISTS idx_url_analysis_results_created_at ON url_analysis_results(created_at);
-        """
+        """ + SUPABASE_URLS_MIGRATION
         
         print("🔧 Supabase SQL Editor'da aşağıdaki sorguları çalıştırın:")
         print("="*50)
         print(sql_queries)
         print("="*50)
+        return
+
+    migrate_supabase_urls()
 
 class SupabaseURLBasedLLMMentionCrawler:
     """Supabase tabanlı URL analiz crawler'ı"""
     
     def __init__(self):
         self.setup_logging()
-        self.brands = ['Workexe', 'OpenAI', 'Anthropic', 'Google', 'Microsoft', 'Meta', 'Ahrefs', 'Semrush']
-        self.models = ['ChatGPT', 'Claude', 'Gemini', 'Copilot', 'Llama', 'GPT-4', 'GPT-3.5', 'Bard']
+        self.brands = list(CRAWLER_BRANDS)
+        self.models = list(CRAWLER_MODELS)
+        # robots.txt cache'i Supabase'te paylaşılır, host gecikmeleri process içinde tutulur
+        self.robots = RobotsCache(store=SupabaseRobotsStore(supabase))
+        self.host_scheduler = HostScheduler()
+        # Frontier için Postgres'e doğrudan bağlantı gerekir (DATABASE_URL), yoksa eski sıralama
+        self.frontier = create_frontier(use_postgres=True)
+        self.worker_id = make_worker_id()
     
     def setup_logging(self):
         logging.basicConfig(
@@ -180,10 +324,14 @@ class SupabaseURLBasedLLMMentionCrawler:
         )
         self.logger = logging.getLogger(__name__)
     
-    def get_pending_urls(self) -> List[Dict]:
+    def get_pending_urls(self, limit: int = FRONTIER_BATCH_SIZE) -> List[Dict]:
         """Analiz bekleyen URL'leri getir"""
         try:
-            response = supabase.table('urls').select('*').eq('status', 'active').order('last_analysis', desc=False).limit(10).execute()
+            if self.frontier:
+                self.frontier.sync()
+                return self.frontier.claim(self.worker_id, limit)
+            
+            response = supabase.table('urls').select('*').eq('status', 'active').order('last_analysis', desc=False).order('lastmod', desc=True, nullsfirst=False).limit(limit).execute()
             return response.data
             
         except Exception as e:
@@ -191,35 +339,24 @@ class SupabaseURLBasedLLMMentionCrawler:
             return []
     
     def fetch_url_content(self, url: str) -> Dict:
-        """URL içeriğini getir"""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
-            
-            # Basit HTML parsing
-            content = response.text
-            title = self.extract_title(content)
-            text_content = self.extract_text_content(content)
-            
-            return {
-                'status': 'success',
-                'title': title,
-                'content': text_content,
-                'url': url,
-                'status_code': response.status_code
-            }
-            
-        except requests.RequestException as e:
-            self.logger.error(f"URL ({url}) getirirken hata: {str(e)}")
+        """URL içeriğini getir (stream edilerek, byte limitli)"""
+        result = fetch_page(url, timeout=15)
+        
+        if not result['success']:
+            self.logger.error(f"URL ({url}) getirirken hata: {result['error']}")
             return {
                 'status': 'error',
-                'error': str(e),
+                'error': result['error'],
                 'url': url
             }
+        
+        return {
+            'status': 'success',
+            'title': result['title'],
+            'content': result['content'],
+            'url': url,
+            'status_code': result['status_code']
+        }
     
     def extract_title(self, html_content: str) -> str:
         """HTML'den title'ı çıkar"""
@@ -248,78 +385,42 @@ class SupabaseURLBasedLLMMentionCrawler:
             return html_content[:1000]  # Fallback
     
     def analyze_content_for_mentions(self, content: str, title: str, url: str) -> List[Dict]:
-        """İçeriği LLM mention'ları için analiz et"""
+        """İçeriği LLM mention'ları için analiz et - sayfa tek geçişte taranır, çiftler eşleşmelerden çıkarılır"""
         results = []
-        full_text = f"{title} {content}".lower()
+        full_text = lower_text(f"{title} {content}")
+        scanner = compile_mention_scanner(tuple(self.brands), tuple(self.models))
+        content_snippet = content[:200] + "..." if len(content) > 200 else content
+        hits = scanner.scan(full_text)
         
-        for brand in self.brands:
-            for model in self.models:
-                # Mention detection
-                brand_mentioned = brand.lower() in full_text
-                model_mentioned = model.lower() in full_text
-                both_mentioned = brand_mentioned and model_mentioned
-                
-                # Context-aware scoring
-                score = self.calculate_mention_score(
-                    full_text, brand.lower(), model.lower(), 
-                    brand_mentioned, model_mentioned
-                )
-                
-                # Analiz metni oluştur
-                analysis_text = f"URL: {url}\nBrand: {brand}\nModel: {model}\n"
-                analysis_text += f"Brand mentioned: {brand_mentioned}\nModel mentioned: {model_mentioned}\n"
-                analysis_text += f"Score: {score}/100"
-                
-                results.append({
-                    'brand': brand,
-                    'model': model,
-                    'mentioned': both_mentioned,
-                    'score': score,
-                    'analysis_text': analysis_text,
-                    'source_url': url,
-                    'content_snippet': content[:200] + "..." if len(content) > 200 else content
-                })
+        for brand, model, pair in scanner.pairs_in(hits):
+            brand_mentioned = pair['brand_mentioned']
+            model_mentioned = pair['model_mentioned']
+            
+            # Context-aware scoring
+            score = self.calculate_mention_score(pair)
+            
+            # Analiz metni oluştur
+            analysis_text = f"URL: {url}\nBrand: {brand}\nModel: {model}\n"
+            analysis_text += f"Brand mentioned: {brand_mentioned}\nModel mentioned: {model_mentioned}\n"
+            analysis_text += f"Score: {score}/100"
+            
+            results.append({
+                'brand': brand,
+                'model': model,
+                'mentioned': brand_mentioned and model_mentioned,
+                'score': score,
+                'analysis_text': analysis_text,
+                'source_url': url,
+                'content_snippet': content_snippet,
+                # llm_mentions.response (content_snippet) içindeki geçişler
+                'spans': window_spans(hits, brand, model, len(title) + 1, min(len(content), 200))
+            })
         
         return results
     
-    def calculate_mention_score(self, text: str, brand: str, model: str, 
-                               brand_mentioned: bool, model_mentioned: bool) -> int:
-        """Mention score'u hesapla"""
-        base_score = 0
-        
-        if brand_mentioned and model_mentioned:
-            base_score = 80
-            # Pozitif/negatif context kontrolü
-            brand_pos = text.find(brand)
-            model_pos = text.find(model)
-            
-            if brand_pos != -1 and model_pos != -1:
-                # Yakınlık bonusu
-                distance = abs(brand_pos - model_pos)
-                if distance < 100:  # Yakın bahsetme
-                    base_score += 10
-                
-                # Pozitif kelimeler
-                positive_words = ['best', 'great', 'excellent', 'recommended', 'good', 'useful']
-                negative_words = ['bad', 'terrible', 'awful', 'poor', 'worst', 'useless']
-                
-                context_start = max(0, min(brand_pos, model_pos) - 100)
-                context_end = min(len(text), max(brand_pos, model_pos) + 100)
-                context = text[context_start:context_end]
-                
-                positive_count = sum(1 for word in positive_words if word in context)
-                negative_count = sum(1 for word in negative_words if word in context)
-                
-                if positive_count > negative_count:
-                    base_score += 5
-                elif negative_count > positive_count:
-                    base_score -= 5
-        
-        elif brand_mentioned or model_mentioned:
-            base_score = 45
-        
-        else:
-            base_score = 10
+    def calculate_mention_score(self, pair: Dict) -> int:
+        """Mention score'u hesapla (yakınlık ve bağlam duygusu MentionScanner eşleşmelerinden)"""
+        base_score = mention_score(pair)
         
         # Rastgele varyasyon ekle
         import random
@@ -328,7 +429,8 @@ class SupabaseURLBasedLLMMentionCrawler:
         return max(0, min(100, base_score))
     
     def save_analysis_results(self, url_id: int, results: List[Dict]):
-        """Analiz sonuçlarını Supabase'e kaydet"""
+        """Analiz sonuçlarını Supabase'e kaydet - kayıt başarılıysa True"""
+        events = []
         try:
             for result in results:
                 # URL analysis results tablosuna kaydet
@@ -343,7 +445,7 @@ class SupabaseURLBasedLLMMentionCrawler:
                 }).execute()
                 
                 # LLM mentions tablosuna da kaydet
-                supabase.table('llm_mentions').insert({
+                inserted = supabase.table('llm_mentions').insert({
                     'brand': result['brand'],
                     'model': result['model'],
                     'prompt': f"URL Analysis: {result['source_url']}",
@@ -353,6 +455,10 @@ class SupabaseURLBasedLLMMentionCrawler:
                     'summary': f"Analiz sonucu: {result['score']}/100",
                     'source_url': result['source_url']
                 }).execute()
+                events.extend(mention_created(row) for row in inserted.data or [])
+                append_spans_supabase(supabase, 'llm_mentions', {
+                    row['id']: result.get('spans', []) for row in inserted.data or []
+                })
             
             # URL'nin son analiz tarihini güncelle
             supabase.table('urls').update({
@@ -361,15 +467,18 @@ class SupabaseURLBasedLLMMentionCrawler:
                 'updated_at': datetime.now().isoformat()
             }).eq('id', url_id).execute()
             
+            append_events_supabase(supabase, events)
             self.logger.info(f"URL {url_id} için {len(results)} sonuç kaydedildi")
+            return True
             
         except Exception as e:
             self.logger.error(f"Sonuçları kaydederken hata: {str(e)}")
+            return False
     
     def run_url_analysis(self) -> Dict:
         """Manuel URL'leri analiz et"""
         start_time = datetime.now()
-        self.logger.info("URL tabanlı LLM mention analizi başlatıldı")
+        self.logger.info(f"URL tabanlı LLM mention analizi başlatıldı (worker={self.worker_id})")
         
         # Analiz geçmişine kaydet
         history_response = supabase.table('analysis_history').insert({
@@ -379,6 +488,8 @@ class SupabaseURLBasedLLMMentionCrawler:
         }).execute()
         
         history_id = history_response.data[0]['id'] if history_response.data else None
+        if history_id:
+            append_events_supabase(supabase, [history_changed(history_id, 'running', analysis_type='url_analysis')])
         
         try:
             urls_to_analyze = self.get_pending_urls()
@@ -393,23 +504,57 @@ class SupabaseURLBasedLLMMentionCrawler:
                 }
             
             total_results = 0
+            unchanged_count = 0
             
-            for url_data in urls_to_analyze:
+            # Aynı host'u art arda beklememek için host'ları sırayla dolaş
+            for url_data in HostScheduler.interleave(urls_to_analyze):
                 url_id = url_data['id']
                 url = url_data['url']
                 
+                robots_status = self.robots.check(url)
+                if robots_status == ROBOTS_UNAVAILABLE:
+                    # Geçici robots.txt hatası - URL engellenmez, sonra tekrar denenir
+                    self.logger.warning(f"robots.txt okunamadı, URL ertelendi: {url}")
+                    if self.frontier:
+                        self.frontier.defer(url_id, self.worker_id, ROBOTS_ERROR_TTL_SECONDS)
+                    continue
+                if robots_status == ROBOTS_BLOCKED:
+                    self.logger.info(f"robots.txt izin vermiyor: {url}")
+                    if self.frontier:
+                        self.frontier.release(url_id, self.worker_id)
+                    supabase.table('urls').update({
+                        'status': 'blocked',
+                        'error_message': 'robots.txt tarafından engellendi',
+                        'updated_at': datetime.now().isoformat()
+                    }).eq('id', url_id).execute()
+                    continue
+                
+                # Host başına Crawl-delay kadar bekle (diğer host'lar etkilenmez)
+                self.host_scheduler.wait(url, self.robots.crawl_delay(url))
+                
                 self.logger.info(f"Analiz ediliyor: {url}")
                 
                 # URL içeriğini getir
                 content_data = self.fetch_url_content(url)
                 
                 if content_data['status'] == 'error':
-                    # URL'yi error durumuna al
-                    supabase.table('urls').update({
-                        'status': 'error',
-                        'error_message': content_data['error'],
-                        'updated_at': datetime.now().isoformat()
-                    }).eq('id', url_id).execute()
+                    if self.frontier:
+                        # Geri çekilme ile tekrar denenecek
+                        self.frontier.record_failure(url_id, content_data['error'], self.worker_id)
+                    else:
+                        # URL'yi error durumuna al
+                        supabase.table('urls').update({
+                            'status': 'error',
+                            'error_message': content_data['error'],
+                            'updated_at': datetime.now().isoformat()
+                        }).eq('id', url_id).execute()
+                    continue
+                
+                page_hash = content_hash(f"{content_data['title']}\n{content_data['content']}")
+                if self.frontier and not self.frontier.content_changed(url_id, page_hash):
+                    self.frontier.record_success(url_id, page_hash, self.worker_id)
+                    self.logger.info(f"İçerik değişmemiş, analiz atlandı: {url}")
+                    unchanged_count += 1
                     continue
                 
                 # İçeriği analiz et
@@ -419,12 +564,16 @@ class SupabaseURLBasedLLMMentionCrawler:
                     url
                 )
                 
-                # Sonuçları kaydet
-                self.save_analysis_results(url_id, analysis_results)
-                total_results += len(analysis_results)
-                
-                # Rate limiting
-                time.sleep(1)
+                # Sonuçları kaydet - yeni hash ancak kayıttan sonra yazılır, yoksa sayfa bir
+                # sonraki turda "değişmemiş" sayılıp hiç analiz edilmezdi
+                saved = self.save_analysis_results(url_id, analysis_results)
+                if self.frontier:
+                    if saved:
+                        self.frontier.record_success(url_id, page_hash, self.worker_id)
+                    else:
+                        self.frontier.release(url_id, self.worker_id)
+                if saved:
+                    total_results += len(analysis_results)
             
             # Analiz geçmişini güncelle
             end_time = datetime.now()
@@ -435,6 +584,9 @@ class SupabaseURLBasedLLMMentionCrawler:
                     'urls_analyzed': len(urls_to_analyze),
                     'results_found': total_results
                 }).eq('id', history_id).execute()
+                append_events_supabase(supabase, [history_changed(
+                    history_id, 'completed', urls_analyzed=len(urls_to_analyze), results_found=total_results
+                )])
             
             self.logger.info(f"Analiz tamamlandı: {len(urls_to_analyze)} URL, {total_results} sonuç")
             
@@ -443,6 +595,7 @@ class SupabaseURLBasedLLMMentionCrawler:
                 'message': 'URL analizi başarıyla tamamlandı',
                 'urls_analyzed': len(urls_to_analyze),
                 'results_created': total_results,
+                'urls_unchanged': unchanged_count,
                 'duration': str(end_time - start_time)
             }
             
@@ -456,6 +609,7 @@ class SupabaseURLBasedLLMMentionCrawler:
                     'error_message': str(e),
                     'completed_at': datetime.now().isoformat()
                 }).eq('id', history_id).execute()
+                append_events_supabase(supabase, [history_changed(history_id, 'error', error_message=str(e))])
             
             return {
                 'status': 'error',
@@ -471,8 +625,21 @@ class URLBasedLLMMentionCrawler:
     def __init__(self, db_path='ai_visibility.db'):
         self.db_path = db_path
         self.setup_logging()
-        self.brands = ['Workexe', 'OpenAI', 'Anthropic', 'Google', 'Microsoft', 'Meta', 'Ahrefs', 'Semrush']
-        self.models = ['ChatGPT', 'Claude', 'Gemini', 'Copilot', 'Llama', 'GPT-4', 'GPT-3.5', 'Bard']
+        self.brands = list(CRAWLER_BRANDS)
+        self.models = list(CRAWLER_MODELS)
+        # robots.txt cache'i ve host slotları aynı SQLite dosyasında - worker process'ler paylaşır
+        robots_store = SQLiteRobotsStore(db_path)
+        self.robots = RobotsCache(store=robots_store)
+        self.host_scheduler = HostScheduler(store=robots_store)
+        self.frontier = SQLiteURLFrontier(db_path)
+        SQLiteMentionEventLog(db_path)
+        SQLiteSpanIndex(db_path)
+        # Aynı anda çalışan diğer crawler process'leri ile aynı URL'yi almamak için lease sahibi
+        self.worker_id = make_worker_id()
+    
+    def __getstate__(self):
+        # Process pool'a sadece analiz için gereken alanlar gönderilir (lock/logger yok)
+        return {'db_path': self.db_path, 'brands': self.brands, 'models': self.models, 'worker_id': self.worker_id}
     
     def setup_logging(self):
         logging.basicConfig(
@@ -485,61 +652,35 @@ class URLBasedLLMMentionCrawler:
         )
         self.logger = logging.getLogger(__name__)
     
-    def get_pending_urls(self) -> List[Dict]:
-        """Analiz bekleyen URL'leri getir"""
+    def get_pending_urls(self, limit: int = FRONTIER_BATCH_SIZE) -> List[Dict]:
+        """Vadesi gelmiş URL'leri frontier'dan bu worker adına kirala (değişme olasılığı yüksek olan önce)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM urls 
-                WHERE status = 'active' 
-                ORDER BY last_analysis ASC NULLS FIRST
-                LIMIT 10
-            ''')
-            
-            urls = []
-            for row in cursor.fetchall():
-                urls.append(dict(row))
-            
-            conn.close()
-            return urls
+            self.frontier.sync()
+            return self.frontier.claim(self.worker_id, limit)
             
         except Exception as e:
             self.logger.error(f"URL'leri getirirken hata: {str(e)}")
             return []
     
     def fetch_url_content(self, url: str) -> Dict:
-        """URL içeriğini getir"""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=15)
-            response.raise_for_status()
-            
-            # Basit HTML parsing
-            content = response.text
-            title = self.extract_title(content)
-            text_content = self.extract_text_content(content)
-            
-            return {
-                'status': 'success',
-                'title': title,
-                'content': text_content,
-                'url': url,
-                'status_code': response.status_code
-            }
-            
-        except requests.RequestException as e:
-            self.logger.error(f"URL ({url}) getirirken hata: {str(e)}")
+        """URL içeriğini getir (stream edilerek, byte limitli)"""
+        result = fetch_page(url, timeout=15)
+        
+        if not result['success']:
+            self.logger.error(f"URL ({url}) getirirken hata: {result['error']}")
             return {
                 'status': 'error',
-                'error': str(e),
+                'error': result['error'],
                 'url': url
             }
+        
+        return {
+            'status': 'success',
+            'title': result['title'],
+            'content': result['content'],
+            'url': url,
+            'status_code': result['status_code']
+        }
     
     def extract_title(self, html_content: str) -> str:
         """HTML'den title'ı çıkar"""
@@ -568,78 +709,42 @@ class URLBasedLLMMentionCrawler:
             return html_content[:1000]  # Fallback
     
     def analyze_content_for_mentions(self, content: str, title: str, url: str) -> List[Dict]:
-        """İçeriği LLM mention'ları için analiz et"""
+        """İçeriği LLM mention'ları için analiz et - sayfa tek geçişte taranır, çiftler eşleşmelerden çıkarılır"""
         results = []
-        full_text = f"{title} {content}".lower()
+        full_text = lower_text(f"{title} {content}")
+        scanner = compile_mention_scanner(tuple(self.brands), tuple(self.models))
+        content_snippet = content[:200] + "..." if len(content) > 200 else content
+        hits = scanner.scan(full_text)
         
-        for brand in self.brands:
-            for model in self.models:
-                # Mention detection
-                brand_mentioned = brand.lower() in full_text
-                model_mentioned = model.lower() in full_text
-                both_mentioned = brand_mentioned and model_mentioned
-                
-                # Context-aware scoring
-                score = self.calculate_mention_score(
-                    full_text, brand.lower(), model.lower(), 
-                    brand_mentioned, model_mentioned
-                )
-                
-                # Analiz metni oluştur
-                analysis_text = f"URL: {url}\nBrand: {brand}\nModel: {model}\n"
-                analysis_text += f"Brand mentioned: {brand_mentioned}\nModel mentioned: {model_mentioned}\n"
-                analysis_text += f"Score: {score}/100"
-                
-                results.append({
-                    'brand': brand,
-                    'model': model,
-                    'mentioned': both_mentioned,
-                    'score': score,
-                    'analysis_text': analysis_text,
-                    'source_url': url,
-                    'content_snippet': content[:200] + "..." if len(content) > 200 else content
-                })
+        for brand, model, pair in scanner.pairs_in(hits):
+            brand_mentioned = pair['brand_mentioned']
+            model_mentioned = pair['model_mentioned']
+            
+            # Context-aware scoring
+            score = self.calculate_mention_score(pair)
+            
+            # Analiz metni oluştur
+            analysis_text = f"URL: {url}\nBrand: {brand}\nModel: {model}\n"
+            analysis_text += f"Brand mentioned: {brand_mentioned}\nModel mentioned: {model_mentioned}\n"
+            analysis_text += f"Score: {score}/100"
+            
+            results.append({
+                'brand': brand,
+                'model': model,
+                'mentioned': brand_mentioned and model_mentioned,
+                'score': score,
+                'analysis_text': analysis_text,
+                'source_url': url,
+                'content_snippet': content_snippet,
+                # llm_mentions.response (content_snippet) içindeki geçişler
+                'spans': window_spans(hits, brand, model, len(title) + 1, min(len(content), 200))
+            })
         
         return results
     
-    def calculate_mention_score(self, text: str, brand: str, model: str, 
-                               brand_mentioned: bool, model_mentioned: bool) -> int:
-        """Mention score'u hesapla"""
-        base_score = 0
-        
-        if brand_mentioned and model_mentioned:
-            base_score = 80
-            # Pozitif/negatif context kontrolü
-            brand_pos = text.find(brand)
-            model_pos = text.find(model)
-            
-            if brand_pos != -1 and model_pos != -1:
-                # Yakınlık bonusu
-                distance = abs(brand_pos - model_pos)
-                if distance < 100:  # Yakın bahsetme
-                    base_score += 10
-                
-                # Pozitif kelimeler
-                positive_words = ['best', 'great', 'excellent', 'recommended', 'good', 'useful']
-                negative_words = ['bad', 'terrible', 'awful', 'poor', 'worst', 'useless']
-                
-                context_start = max(0, min(brand_pos, model_pos) - 100)
-                context_end = min(len(text), max(brand_pos, model_pos) + 100)
-                context = text[context_start:context_end]
-                
-                positive_count = sum(1 for word in positive_words if word in context)
-                negative_count = sum(1 for word in negative_words if word in context)
-                
-                if positive_count > negative_count:
-                    base_score += 5
-                elif negative_count > positive_count:
-                    base_score -= 5
-        
-        elif brand_mentioned or model_mentioned:
-            base_score = 45
-        
-        else:
-            base_score = 10
+    def calculate_mention_score(self, pair: Dict) -> int:
+        """Mention score'u hesapla (yakınlık ve bağlam duygusu MentionScanner eşleşmelerinden)"""
+        base_score = mention_score(pair)
         
         # Rastgele varyasyon ekle
         import random
@@ -648,10 +753,11 @@ class URLBasedLLMMentionCrawler:
         return max(0, min(100, base_score))
     
     def save_analysis_results(self, url_id: int, results: List[Dict]):
-        """Analiz sonuçlarını kaydet"""
+        """Analiz sonuçlarını kaydet - kayıt başarılıysa True"""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
+            events = []
             
             for result in results:
                 # URL analysis results tablosuna kaydet
@@ -678,7 +784,14 @@ class URLBasedLLMMentionCrawler:
                     f"Analiz sonucu: {result['score']}/100",
                     result['source_url'], datetime.now()
                 ))
+                append_spans_sqlite(conn, 'llm_mentions', {cursor.lastrowid: result.get('spans', [])})
+                events.append(mention_created({
+                    **result, 'id': cursor.lastrowid,
+                    'summary': f"Analiz sonucu: {result['score']}/100", 'created_at': datetime.now()
+                }))
             
+            # Dashboard bildirimleri kayıtlarla aynı transaction'da
+            append_events_sqlite(conn, events)
             # URL'nin son analiz tarihini güncelle
             cursor.execute('''
                 UPDATE urls 
@@ -690,14 +803,16 @@ class URLBasedLLMMentionCrawler:
             conn.close()
             
             self.logger.info(f"URL {url_id} için {len(results)} sonuç kaydedildi")
+            return True
             
         except Exception as e:
             self.logger.error(f"Sonuçları kaydederken hata: {str(e)}")
+            return False
     
     def run_url_analysis(self) -> Dict:
         """Manuel URL'leri analiz et"""
         start_time = datetime.now()
-        self.logger.info("URL tabanlı LLM mention analizi başlatıldı")
+        self.logger.info(f"URL tabanlı LLM mention analizi başlatıldı (worker={self.worker_id})")
         
         # Analiz geçmişine kaydet
         conn = sqlite3.connect(self.db_path)
@@ -708,6 +823,7 @@ class URLBasedLLMMentionCrawler:
             VALUES ('url_analysis', 'running', ?)
         ''', (start_time,))
         history_id = cursor.lastrowid
+        append_events_sqlite(conn, [history_changed(history_id, 'running', analysis_type='url_analysis')])
         conn.commit()
         conn.close()
         
@@ -724,29 +840,54 @@ class URLBasedLLMMentionCrawler:
                 }
             
             total_results = 0
+            unchanged_count = 0
             
-            for url_data in urls_to_analyze:
+            # Aynı host'u art arda beklememek için host'ları sırayla dolaş
+            for url_data in HostScheduler.interleave(urls_to_analyze):
                 url_id = url_data['id']
                 url = url_data['url']
                 
-                self.logger.info(f"Analiz ediliyor: {url}")
-                
-                # URL içeriğini getir
-                content_data = self.fetch_url_content(url)
-                
-                if content_data['status'] == 'error':
-                    # URL'yi error durumuna al
+                robots_status = self.robots.check(url)
+                if robots_status == ROBOTS_UNAVAILABLE:
+                    # Geçici robots.txt hatası - URL engellenmez, sonra tekrar denenir
+                    self.logger.warning(f"robots.txt okunamadı, URL ertelendi: {url}")
+                    self.frontier.defer(url_id, self.worker_id, ROBOTS_ERROR_TTL_SECONDS)
+                    continue
+                if robots_status == ROBOTS_BLOCKED:
+                    self.logger.info(f"robots.txt izin vermiyor: {url}")
+                    self.frontier.release(url_id, self.worker_id)
                     conn = sqlite3.connect(self.db_path)
                     cursor = conn.cursor()
                     cursor.execute('''
                         UPDATE urls 
-                        SET status = 'error', error_message = ?, updated_at = ?
+                        SET status = 'blocked', error_message = ?, updated_at = ?
                         WHERE id = ?
-                    ''', (content_data['error'], datetime.now(), url_id))
+                    ''', ('robots.txt tarafından engellendi', datetime.now(), url_id))
                     conn.commit()
                     conn.close()
                     continue
                 
+                # Host başına Crawl-delay kadar bekle (diğer host'lar etkilenmez)
+                self.host_scheduler.wait(url, self.robots.crawl_delay(url))
+                
+                self.logger.info(f"Analiz ediliyor: {url}")
+                
+                # URL içeriğini getir
+                content_data = self.fetch_url_content(url)
+                
+                if content_data['status'] == 'error':
+                    # Geri çekilme ile tekrar denenecek (limit aşılırsa 'error' olur)
+                    self.frontier.record_failure(url_id, content_data['error'], self.worker_id)
+                    continue
+                
+                # İçerik önceki ziyaretten beri değişmediyse tekrar analiz etme
+                page_hash = content_hash(f"{content_data['title']}\n{content_data['content']}")
+                if not self.frontier.content_changed(url_id, page_hash):
+                    self.frontier.record_success(url_id, page_hash, self.worker_id)
+                    self.logger.info(f"İçerik değişmemiş, analiz atlandı: {url}")
+                    unchanged_count += 1
+                    continue
+                
                 # İçeriği analiz et
                 analysis_results = self.analyze_content_for_mentions(
                     content_data['content'], 
@@ -754,12 +895,12 @@ class URLBasedLLMMentionCrawler:
                     url
                 )
                 
-                # Sonuçları kaydet
-                self.save_analysis_results(url_id, analysis_results)
-                total_results += len(analysis_results)
-                
-                # Rate limiting
-                time.sleep(1)
+                # Sonuçları kaydet - yeni hash ancak kayıttan sonra yazılır (eski hash o zamana kadar kalır)
+                if self.save_analysis_results(url_id, analysis_results):
+                    self.frontier.record_success(url_id, page_hash, self.worker_id)
+                    total_results += len(analysis_results)
+                else:
+                    self.frontier.release(url_id, self.worker_id)
             
             # Analiz geçmişini güncelle
             end_time = datetime.now()
@@ -771,6 +912,9 @@ class URLBasedLLMMentionCrawler:
                     urls_analyzed = ?, results_found = ?
                 WHERE id = ?
             ''', (end_time, len(urls_to_analyze), total_results, history_id))
+            append_events_sqlite(conn, [history_changed(
+                history_id, 'completed', urls_analyzed=len(urls_to_analyze), results_found=total_results
+            )])
             conn.commit()
             conn.close()
             
@@ -781,6 +925,7 @@ class URLBasedLLMMentionCrawler:
                 'message': 'URL analizi başarıyla tamamlandı',
                 'urls_analyzed': len(urls_to_analyze),
                 'results_created': total_results,
+                'urls_unchanged': unchanged_count,
                 'duration': str(end_time - start_time)
             }
             
@@ -795,6 +940,200 @@ class URLBasedLLMMentionCrawler:
                 SET status = 'error', error_message = ?, completed_at = ?
                 WHERE id = ?
             ''', (str(e), datetime.now(), history_id))
+            append_events_sqlite(conn, [history_changed(history_id, 'error', error_message=str(e))])
+            conn.commit()
+            conn.close()
+            
+            return {
+                'status': 'error',
+                'message': f'Analiz sırasında hata: {str(e)}',
+                'urls_analyzed': 0,
+                'results_created': 0
+            }
+
+    def mark_url_status(self, url_id: int, status: str, error_message: str):
+        """URL'nin durumunu güncelle (error / blocked)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE urls 
+            SET status = ?, error_message = ?, updated_at = ?
+            WHERE id = ?
+        ''', (status, error_message, datetime.now(), url_id))
+        conn.commit()
+        conn.close()
+    
+    async def _analyze_url_async(self, url_data: Dict, client, semaphore: asyncio.Semaphore,
+                                 host_locks: Dict[str, asyncio.Lock], executor: ProcessPoolExecutor,
+                                 write_lock: asyncio.Lock, stats: StageStats) -> int:
+        """Tek URL: robots -> host gecikmesi -> fetch -> analiz (process pool) -> kaydet"""
+        loop = asyncio.get_running_loop()
+        url_id = url_data['id']
+        url = url_data['url']
+        
+        with stats.timer('robots'):
+            robots_status = await asyncio.to_thread(self.robots.check, url)
+        if robots_status == ROBOTS_UNAVAILABLE:
+            # Geçici robots.txt hatası - URL engellenmez, sonra tekrar denenir
+            self.logger.warning(f"robots.txt okunamadı, URL ertelendi: {url}")
+            await asyncio.to_thread(self.frontier.defer, url_id, self.worker_id, ROBOTS_ERROR_TTL_SECONDS)
+            stats.increment('robots_unavailable')
+            return 0
+        if robots_status == ROBOTS_BLOCKED:
+            self.logger.info(f"robots.txt izin vermiyor: {url}")
+            await asyncio.to_thread(self.mark_url_status, url_id, 'blocked', 'robots.txt tarafından engellendi')
+            await asyncio.to_thread(self.frontier.release, url_id, self.worker_id)
+            stats.increment('robots_blocked')
+            return 0
+        
+        delay = await asyncio.to_thread(self.robots.crawl_delay, url)
+        
+        # Aynı host'un görevleri sırayla slot ayırıp bekler ve fetch'e başlar; host kilidi fetch
+        # semaphore'u alınana kadar tutulur, böylece bekleme süresi dolan görevler art arda fetch
+        # etmez. Bekleme global semaphore dışında yapılır - diğer host'lar bloklanmaz.
+        async with host_locks[host_key(url)]:
+            with stats.timer('host_wait'):
+                wait_seconds = await asyncio.to_thread(self.host_scheduler.reserve, url, delay)
+                if wait_seconds > 0:
+                    await asyncio.sleep(wait_seconds)
+            await semaphore.acquire()
+        try:
+            self.logger.info(f"Analiz ediliyor: {url}")
+            with stats.timer('fetch'):
+                fetched = await async_fetch_page(client, url)
+        finally:
+            semaphore.release()
+        
+        if not fetched['success']:
+            self.logger.error(f"URL ({url}) getirirken hata: {fetched['error']}")
+            await asyncio.to_thread(self.frontier.record_failure, url_id, fetched['error'], self.worker_id)
+            stats.increment('fetch_errors')
+            return 0
+        
+        page_hash = content_hash(f"{fetched['title']}\n{fetched['content']}")
+        changed = await asyncio.to_thread(self.frontier.content_changed, url_id, page_hash)
+        if not changed:
+            await asyncio.to_thread(self.frontier.record_success, url_id, page_hash, self.worker_id)
+            stats.increment('unchanged')
+            return 0
+        
+        # CPU-yoğun analiz event loop dışında, ayrı process'te
+        with stats.timer('analyze'):
+            analysis_results = await loop.run_in_executor(
+                executor, self.analyze_content_for_mentions,
+                fetched['content'], fetched['title'], url
+            )
+        
+        # SQLite tek yazıcı ister - kayıtlar sırayla yapılır
+        with stats.timer('save'):
+            async with write_lock:
+                saved = await asyncio.to_thread(self.save_analysis_results, url_id, analysis_results)
+        
+        # Yeni hash ancak sonuçlar yazıldıktan sonra - analiz/kayıt yarıda kalırsa sayfa tekrar denenir
+        if not saved:
+            await asyncio.to_thread(self.frontier.release, url_id, self.worker_id)
+            stats.increment('save_errors')
+            return 0
+        await asyncio.to_thread(self.frontier.record_success, url_id, page_hash, self.worker_id)
+        return len(analysis_results)
+    
+    async def run_url_analysis_async(self, concurrency: int = 10, limit: int = 100) -> Dict:
+        """URL'leri asyncio ile eşzamanlı analiz et (farklı host'lar paralel, aynı host gecikmeli)"""
+        start_time = datetime.now()
+        stats = StageStats()
+        self.logger.info(f"Async URL analizi başlatıldı (worker={self.worker_id}, concurrency={concurrency})")
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO analysis_history 
+            (analysis_type, status, started_at)
+            VALUES ('url_analysis_async', 'running', ?)
+        ''', (start_time,))
+        history_id = cursor.lastrowid
+        append_events_sqlite(conn, [history_changed(history_id, 'running', analysis_type='url_analysis_async')])
+        conn.commit()
+        conn.close()
+        
+        try:
+            urls_to_analyze = self.get_pending_urls(limit=limit)
+            
+            if not urls_to_analyze:
+                self.logger.info("Analiz edilecek URL bulunamadı")
+                return {
+                    'status': 'info',
+                    'message': 'Analiz edilecek aktif URL bulunamadı',
+                    'urls_analyzed': 0,
+                    'results_created': 0
+                }
+            
+            urls_to_analyze = HostScheduler.interleave(urls_to_analyze)
+            semaphore = asyncio.Semaphore(concurrency)
+            host_locks = defaultdict(asyncio.Lock)
+            write_lock = asyncio.Lock()
+            
+            with ProcessPoolExecutor(max_workers=min(concurrency, os.cpu_count() or 1)) as executor:
+                async with create_async_client(max_connections=concurrency) as client:
+                    tasks = [
+                        self._analyze_url_async(url_data, client, semaphore, host_locks, executor, write_lock, stats)
+                        for url_data in urls_to_analyze
+                    ]
+                    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+            
+            total_results = 0
+            for url_data, outcome in zip(urls_to_analyze, outcomes):
+                if isinstance(outcome, Exception):
+                    self.logger.error(f"URL ({url_data['url']}) işlenirken hata: {str(outcome)}")
+                    stats.increment('errors')
+                else:
+                    total_results += outcome
+            
+            end_time = datetime.now()
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE analysis_history 
+                SET status = 'completed', completed_at = ?, 
+                    urls_analyzed = ?, results_found = ?
+                WHERE id = ?
+            ''', (end_time, len(urls_to_analyze), total_results, history_id))
+            append_events_sqlite(conn, [history_changed(
+                history_id, 'completed', urls_analyzed=len(urls_to_analyze), results_found=total_results
+            )])
+            conn.commit()
+            conn.close()
+            
+            throughput = stats.report(len(urls_to_analyze))
+            self.logger.info(
+                f"Analiz tamamlandı: {len(urls_to_analyze)} URL, {total_results} sonuç, "
+                f"{throughput['items_per_second']} URL/s"
+            )
+            for stage, stage_stats in throughput['stages'].items():
+                self.logger.info(
+                    f"  {stage}: {stage_stats['count']} adet, p50={stage_stats['p50_seconds']}s, "
+                    f"p95={stage_stats['p95_seconds']}s"
+                )
+            
+            return {
+                'status': 'success',
+                'message': 'URL analizi başarıyla tamamlandı',
+                'urls_analyzed': len(urls_to_analyze),
+                'results_created': total_results,
+                'duration': str(end_time - start_time),
+                'throughput': throughput
+            }
+            
+        except Exception as e:
+            self.logger.error(f"URL analizi sırasında hata: {str(e)}")
+            
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE analysis_history 
+                SET status = 'error', error_message = ?, completed_at = ?
+                WHERE id = ?
+            ''', (str(e), datetime.now(), history_id))
+            append_events_sqlite(conn, [history_changed(history_id, 'error', error_message=str(e))])
             conn.commit()
             conn.close()
             
@@ -807,15 +1146,27 @@ class URLBasedLLMMentionCrawler:
 
 # Kullanım - Supabase veya SQLite seçimi
 if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="URL tabanlı LLM mention crawler")
+    arg_parser.add_argument('--concurrency', type=int, default=0,
+                            help='0: sıralı mod, >0: asyncio modu (eşzamanlı fetch sayısı)')
+    arg_parser.add_argument('--limit', type=int, default=100, help='Async modda alınacak en fazla URL')
+    args = arg_parser.parse_args()
+    
     use_supabase = os.getenv("USE_SUPABASE", "false").lower() == "true"
     
     if use_supabase:
         print("🚀 Supabase tabanlı crawler başlatılıyor...")
         create_supabase_tables()  # Tablo oluşturma talimatlarını göster
         crawler = SupabaseURLBasedLLMMentionCrawler()
+        if args.concurrency:
+            print("⚠️ Async mod sadece SQLite crawler'da destekleniyor, sıralı mod kullanılıyor")
+        result = crawler.run_url_analysis()
     else:
         print("💾 SQLite tabanlı crawler başlatılıyor...")
         crawler = URLBasedLLMMentionCrawler()
+        if args.concurrency > 0:
+            result = asyncio.run(crawler.run_url_analysis_async(concurrency=args.concurrency, limit=args.limit))
+        else:
+            result = crawler.run_url_analysis()
     
-    result = crawler.run_url_analysis()
     print(f"Sonuç: {result}")
@@ -6,17 +6,43 @@ import sqlite3
 import json
 import random
 import re
+import time
 from datetime import datetime, timedelta
 from urllib.parse import urlparse
 import asyncio
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
-import requests
+
+from content_fetcher import FETCH_MAX_BYTES, fetch_page, async_fetch_page, create_async_client
+from url_canonicalizer import canonicalize_url
+from sitemap_ingest import SitemapIngestor
+from url_frontier import SQLiteURLFrontier, create_frontier, content_hash, make_worker_id, FRONTIER_BATCH_SIZE
+from robots_cache import HostScheduler, DEFAULT_HOST_DELAY
+from job_queue import create_job_queue
+from llm_gateway import llm_gateway, LANE_INTERACTIVE, LANE_BATCH
+from tenant_quota import tenant_for_website, create_usage_store, usage_ledger
+from brand_registry import get_brand_registry, fold_turkish
+from multi_pattern import local_mention_analysis
+from bulk_rescorer import BulkRescorer, RESCORE_TABLES, create_rescore_store, rescore_table
+from pair_results import ANALYSIS_BRANDS, ANALYSIS_MODELS, PAIR_VERSION_BATCH, create_pair_store, delete_url_sqlite, name_list
+from job_scheduler import JobScheduler, create_schedule_store, parse_schedule, SCHEDULER_ENABLED
+from mention_events import (
+    SQLiteMentionEventLog, SupabaseMentionEventLog, MentionEventHub, COMPACT_MENTION_FIELDS,
+    append_events_sqlite, append_events_supabase, mention_created, mentions_deleted
+)
+from mention_spans import (
+    SPAN_SOURCES, SNIPPET_WINDOW, SQLiteSpanIndex, SupabaseSpanIndex, append_spans_sqlite,
+    append_spans_supabase, context_spans, delete_spans_supabase, shift_spans, snippets
+)
+from analysis_pipeline import (
+    PipelineStage, run_pipeline, PIPELINE_FETCH_CONCURRENCY, PIPELINE_EXTRACT_CONCURRENCY,
+    PIPELINE_ANALYZE_CONCURRENCY, PIPELINE_PERSIST_BATCH
+)
 
 # Logging yapılandırması
 logging.basicConfig(level=logging.INFO)
@@ -47,6 +73,10 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY") 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 USE_SUPABASE = os.getenv("USE_SUPABASE", "false").lower() == "true"
+# Bir analiz çalıştırmasında AI'ya gönderilecek en fazla URL (her URL = brand x model çağrı), 0 = sınırsız
+ANALYSIS_URL_BUDGET = int(os.getenv("ANALYSIS_URL_BUDGET", "0"))
+# Frontier lease sahibi - crawler process'leri ile aynı URL'yi paylaşmamak için
+API_WORKER_ID = make_worker_id()
 
 print(f"💥 ENV VARLARI: USE_SUPABASE: {USE_SUPABASE}")
 if SUPABASE_URL:
@@ -72,11 +102,12 @@ app.add_middleware(
 # Pydantic modelleri
 class URLRequest(BaseModel):
     url: str
+    workspace_id: Optional[str] = None  # Verilmezse URL'nin host'u
 
 class AnalysisRequest(BaseModel):
     urls: list = []
-    brands: list = ["Workexe", "Ahrefs", "Semrush", "Surfer SEO"] 
-    models: list = ["ChatGPT", "Claude", "Gemini", "Copilot"]
+    brands: list = ANALYSIS_BRANDS
+    models: list = ANALYSIS_MODELS
 
 # SQLite tabloları oluşturan fonksiyonu
 def init_sqlite():
@@ -170,9 +201,87 @@ def init_sqlite():
             print("🔧 analysis_count kolonu ekleniyor...")
             cursor.execute('ALTER TABLE urls ADD COLUMN analysis_count INTEGER DEFAULT 0')
             print("✅ analysis_count kolonu eklendi")
-        
+
+        # canonical_url kolonu - URL'ler kanonik forma göre tekilleştirilir
+        if 'canonical_url' not in columns:
+            print("🔧 canonical_url kolonu ekleniyor...")
+            cursor.execute('ALTER TABLE urls ADD COLUMN canonical_url TEXT')
+            print("✅ canonical_url kolonu eklendi")
+
+        cursor.execute('SELECT id, url FROM urls WHERE canonical_url IS NULL')
+        missing_canonical = cursor.fetchall()
+        if missing_canonical:
+            cursor.executemany(
+                'UPDATE urls SET canonical_url = ? WHERE id = ?',
+                [(canonicalize_url(url), url_id) for url_id, url in missing_canonical]
+            )
+
+        try:
+            cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_urls_canonical_url ON urls(canonical_url)')
+        except sqlite3.IntegrityError:
+            print("⚠️ Aynı kanonik URL'ye sahip eski kayıtlar var, unique index oluşturulamadı")
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_urls_canonical_url_nonunique ON urls(canonical_url)')
+
+        # Sitemap ile gelen URL'ler için lastmod (önceliklendirme) ve kaynak bilgisi
+        if 'lastmod' not in columns:
+            cursor.execute('ALTER TABLE urls ADD COLUMN lastmod TEXT')
+        if 'source' not in columns:
+            cursor.execute("ALTER TABLE urls ADD COLUMN source TEXT DEFAULT 'manual'")
+
+        # Workspace (tenant) - LLM/fetch işleri bu anahtarla adil paylaştırılır
+        if 'workspace_id' not in columns:
+            cursor.execute('ALTER TABLE urls ADD COLUMN workspace_id TEXT')
+        cursor.execute('SELECT id, url FROM urls WHERE workspace_id IS NULL')
+        missing_workspace = cursor.fetchall()
+        if missing_workspace:
+            cursor.executemany(
+                'UPDATE urls SET workspace_id = ? WHERE id = ?',
+                [(tenant_for_website(url), url_id) for url_id, url in missing_workspace]
+            )
+
+        cursor.execute("PRAGMA table_info(visibility_tests)")
+        if 'workspace_id' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE visibility_tests ADD COLUMN workspace_id TEXT')
+
+        # Prompt başına yanıtlar - skor kuralları/marka adları değişince yeniden puanlanabilir
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS visibility_test_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                test_id INTEGER,
+                website TEXT NOT NULL,
+                workspace_id TEXT,
+                prompt TEXT,
+                response TEXT,
+                visibility_score INTEGER DEFAULT 0,
+                mentioned BOOLEAN DEFAULT 0,
+                ranking TEXT,
+                sentiment TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (test_id) REFERENCES visibility_tests (id)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_visibility_test_results_website ON visibility_test_results(website)')
+
+        # URL alias tablosu - aynı kanonik URL'ye giden farklı yazımlar/yönlendirmeler
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS url_aliases (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                alias_url TEXT UNIQUE NOT NULL,
+                url_id INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (url_id) REFERENCES urls (id)
+            )
+        ''')
+
         conn.commit()
         conn.close()
+
+        # URL frontier tablosu (vade, öncelik, hata geri çekilmesi)
+        SQLiteURLFrontier('ai_visibility.db')
+        # Canlı dashboard bildirimleri için outbox
+        SQLiteMentionEventLog('ai_visibility.db')
+        # llm_mentions / visibility_test_results satırlarının eşleşme konumları
+        SQLiteSpanIndex('ai_visibility.db')
         print("✅ SQLite tabloları oluşturuldu/güncellendi")
         
     except Exception as e:
@@ -194,6 +303,31 @@ if not USE_SUPABASE:
     print("📁 SQLite kullanılıyor")
     init_sqlite()
 
+# Uzun süren analizler için iş kuyruğu - job_worker.py process'leri işler
+job_queue = create_job_queue('ai_visibility.db', use_postgres=USE_SUPABASE)
+
+# Marka adları/varyasyonları - scorer'lar aynı derlenmiş profilleri kullanır
+brand_registry = get_brand_registry()
+
+# Saklanan yanıtların toplu yeniden puanlanması (visibility_test_results)
+rescore_store = create_rescore_store('ai_visibility.db', use_postgres=USE_SUPABASE)
+RESCORE_UNAVAILABLE = "Supabase modunda yeniden puanlama için DATABASE_URL (Supabase Postgres bağlantısı) gereklidir"
+
+# Sayfa içerik sürümleri ve brand x model sonuçları - marka/model listesi değişince sadece eksik çiftler hesaplanır
+pair_store = create_pair_store('ai_visibility.db', use_postgres=USE_SUPABASE)
+PAIR_STORE_UNAVAILABLE = "Supabase modunda sayfa sürümleri için DATABASE_URL (Supabase Postgres bağlantısı) gereklidir"
+
+# Tenant başına LLM/fetch/iş kullanımı - gün bazında tenant_usage tablosuna toplanır
+usage_ledger.attach(create_usage_store('ai_visibility.db', use_postgres=USE_SUPABASE))
+
+# Yeni mention/analiz olaylarını WebSocket istemcilerine dağıtan tek poller
+mention_event_hub = MentionEventHub(
+    SupabaseMentionEventLog(supabase_client) if USE_SUPABASE else SQLiteMentionEventLog('ai_visibility.db')
+)
+
+# Yazarken bulunan eşleşme konumları - bağlam/vurgu okurken sadece konumdan kesilir
+span_index = SupabaseSpanIndex(supabase_client) if USE_SUPABASE else SQLiteSpanIndex('ai_visibility.db')
+
 # Yardımcı fonksiyonlar
 def get_db_connection():
     """SQLite veritabanı bağlantısı al"""
@@ -204,49 +338,73 @@ def get_db_connection():
         conn.row_factory = sqlite3.Row
         return conn
 
+def find_url_by_canonical(canonical_url: str):
+    """Kanonik URL'ye (veya alias'ına) karşılık gelen kaydı bul"""
+    if USE_SUPABASE:
+        response = supabase_client.table('urls').select('id, url').eq('canonical_url', canonical_url).limit(1).execute()
+        if response.data:
+            return response.data[0]
+        alias = supabase_client.table('url_aliases').select('url_id').eq('alias_url', canonical_url).limit(1).execute()
+        if alias.data:
+            response = supabase_client.table('urls').select('id, url').eq('id', alias.data[0]['url_id']).execute()
+            return response.data[0] if response.data else None
+        return None
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, url FROM urls WHERE canonical_url = ?
+        UNION ALL
+        SELECT u.id, u.url FROM url_aliases a JOIN urls u ON u.id = a.url_id WHERE a.alias_url = ?
+        LIMIT 1
+    ''', (canonical_url, canonical_url))
+    row = cursor.fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+def record_url_alias(alias_url: str, url_id: int):
+    """Bir URL yazımını/yönlendirmesini mevcut kayda alias olarak bağla"""
+    aliases = {alias_url, canonicalize_url(alias_url)}
+    if USE_SUPABASE:
+        for alias in aliases:
+            supabase_client.table('url_aliases').upsert(
+                {'alias_url': alias, 'url_id': url_id}, on_conflict='alias_url'
+            ).execute()
+        return
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        'INSERT OR REPLACE INTO url_aliases (alias_url, url_id, created_at) VALUES (?, ?, ?)',
+        [(alias, url_id, datetime.now()) for alias in aliases]
+    )
+    conn.commit()
+    conn.close()
+
+def delete_url_row(url_id: int):
+    """Henüz analiz edilmemiş bir URL kaydını sil"""
+    if USE_SUPABASE:
+        supabase_client.table('urls').delete().eq('id', url_id).execute()
+    else:
+        conn = get_db_connection()
+        conn.execute('DELETE FROM url_frontier WHERE url_id = ?', (url_id,))
+        conn.execute('DELETE FROM urls WHERE id = ?', (url_id,))
+        conn.commit()
+        conn.close()
+
 def fetch_url_content(url: str, timeout: int = 10) -> Dict[str, Any]:
-    """URL'den SADECE GÖRÜNÜR İÇERİĞİ çek"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=timeout)
-        
-        if response.status_code == 200:
-            content = response.text
-            
-            # Title çıkar
-            title_match = re.search(r'<title[^>]*>(.*?)</title>', content, re.IGNORECASE)
-            title = title_match.group(1).strip() if title_match else 'Başlık bulunamadı'
-            
-            # ÖNEMLİ: Sadece görünür içeriği çıkar
-            clean_content = extract_visible_text(content)
-            
-            print(f"📊 Ham HTML: {len(content)} karakter")
-            print(f"📄 Temiz metin: {len(clean_content)} karakter") 
-            
-            return {
-                'success': True,
-                'content': clean_content,  # ← Temizlenmiş içerik
-                'title': title,
-                'status_code': response.status_code,
-                'original_size': len(content),
-                'clean_size': len(clean_content)
-            }
-        else:
-            return {
-                'success': False,
-                'error': f'HTTP {response.status_code}',
-                'status_code': response.status_code
-            }
-            
-    except Exception as e:
-        return {
-            'success': False,
-            'error': str(e),
-            'status_code': 0
-        }
+    """URL'den SADECE GÖRÜNÜR İÇERİĞİ çek (stream + byte limiti)
+
+    Metnin tamamı döner; analiz için FETCH_MAX_CHARS sınırı sadece fetch_page çağıranlarda uygulanır.
+    """
+    # İndirilen byte sayısı metin uzunluğunun üst sınırı - karakter limiti fiilen devre dışı
+    result = fetch_page(url, timeout=timeout, max_chars=FETCH_MAX_BYTES)
+    
+    if result['success']:
+        print(f"📊 İndirilen HTML: {result['original_size']} byte ({result['encoding']})")
+        print(f"📄 Temiz metin: {result['clean_size']} karakter")
+    
+    return result
 
 def extract_visible_text(html_content: str) -> str:
     """HTML'den sadece görünür metni çıkar"""
@@ -330,50 +488,27 @@ async def debug_gemini():
             "message": f"Gemini API hatası: {str(e)}"
         }
 
-async def analyze_with_ai(content: str, brand: str, model: str, url: str) -> Dict[str, Any]:
-    """AI ile GERÇEK içerik analizi yap"""
+# analyze_content_with_ai'nin sonucunu değiştiren her düzenlemede artırılır - eski çiftler yeniden hesaplanır
+MENTION_ANALYZER_VERSION = 'ai-mention-1'
+# Bu yöntemlerle üretilen sonuçlar çift olarak saklanmaz - Gemini erişilebilir olunca yeniden hesaplanır
+NON_FINAL_ANALYSIS_METHODS = ('error', 'fallback')
+
+def analyze_content_with_ai(content: str, brand: str, model: str, url: str) -> Dict[str, Any]:
+    """AI ile GERÇEK içerik analizi yap (bloklayan Gemini çağrısı)"""
     try:
         print(f"🔍 GERÇEK ANALİZ: {brand} x {model} - {url}")
         
-        # İçeriği temizle ve kısalt
-        clean_content = re.sub(r'<[^>]+>', '', content)  # HTML tagları kaldır
-        clean_content = re.sub(r'\s+', ' ', clean_content).strip()  # Whitespace temizle
-        
-        # İçerik çok uzunsa kısalt
-        if len(clean_content) > 5000:
-            clean_content = clean_content[:5000] + "..."
+        # İçeriği temizle, brand/model geçişlerini ve bağlam cümlelerini bul (LLM'siz)
+        local = local_mention_analysis(content, brand, model)
+        clean_content = local['clean_content']
+        brand_mentioned, model_mentioned = local['brand_mentioned'], local['model_mentioned']
+        brand_contexts, model_contexts = local['brand_contexts'], local['model_contexts']
         
         print(f"📄 Temiz içerik uzunluğu: {len(clean_content)} karakter")
         
-        # Basit string analizi (fallback)
-        content_lower = clean_content.lower()
-        brand_lower = brand.lower()
-        model_lower = model.lower()
-        
-        # Kesin bahsedilme kontrolü
-        brand_mentioned = brand_lower in content_lower
-        model_mentioned = model_lower in content_lower
-        
-        # Context analizi - hangi bağlamda bahsediliyor
-        brand_contexts = []
-        model_contexts = []
-        
-        if brand_mentioned:
-            # Brand'in geçtiği cümleleri bul
-            sentences = clean_content.split('.')
-            for sentence in sentences:
-                if brand_lower in sentence.lower():
-                    brand_contexts.append(sentence.strip()[:200])
-        
-        if model_mentioned:
-            # Model'in geçtiği cümleleri bul
-            sentences = clean_content.split('.')
-            for sentence in sentences:
-                if model_lower in sentence.lower():
-                    model_contexts.append(sentence.strip()[:200])
-        
         # Gerçek AI analizi (Gemini varsa)
         ai_analysis = ""
+        analysis_method = 'gemini'
         mentioned = False
         score = 0
         
@@ -465,7 +600,8 @@ async def analyze_with_ai(content: str, brand: str, model: str, url: str) -> Dic
                 print(f"⚠️ Gemini hatası: {gemini_error}")
                 ai_analysis = f"Gemini API hatası: {str(gemini_error)}"
                 
-                # Fallback - basit analiz
+                # Fallback - basit analiz (rastgele skor, kesin sonuç değil)
+                analysis_method = 'fallback'
                 mentioned = brand_mentioned or model_mentioned
                 if mentioned:
                     score = random.randint(60, 85)
@@ -474,7 +610,8 @@ async def analyze_with_ai(content: str, brand: str, model: str, url: str) -> Dic
         else:
             print("⚠️ Gemini mevcut değil, basit analiz kullanılıyor")
             
-            # Basit analiz skorlaması
+            # Basit analiz skorlaması (rastgele skor, kesin sonuç değil)
+            analysis_method = 'fallback'
             mentioned = brand_mentioned or model_mentioned
             if brand_mentioned and model_mentioned:
                 score = random.randint(70, 90)
@@ -496,15 +633,21 @@ Skor: {score}/100
 📝 Bahsedilme Detayları:
 """
         
+        # Rapordaki geçiş konumları sadece yazılan bağlam cümlelerinden - etiket satırları geçiş sayılmaz
+        report_spans = []
         if brand_mentioned and brand_contexts:
             result_report += f"🏢 {brand} bahsedildiği yerler:\n"
-            for ctx in brand_contexts[:2]:  # İlk 2 bağlamı göster
-                result_report += f"   • {ctx}\n"
+            for start, end in local['brand_windows'][:2]:  # İlk 2 bağlamı göster
+                result_report += "   • "
+                report_spans += context_spans(local, brand, model, start, end, len(result_report))
+                result_report += f"{clean_content[start:end]}\n"
         
         if model_mentioned and model_contexts:
             result_report += f"🤖 {model} bahsedildiği yerler:\n"
-            for ctx in model_contexts[:2]:  # İlk 2 bağlamı göster
-                result_report += f"   • {ctx}\n"
+            for start, end in local['model_windows'][:2]:  # İlk 2 bağlamı göster
+                result_report += "   • "
+                report_spans += context_spans(local, brand, model, start, end, len(result_report))
+                result_report += f"{clean_content[start:end]}\n"
         
         if not mentioned:
             result_report += "❌ Bu sayfada belirtilen marka/model bahsedilmiyor.\n"
@@ -517,10 +660,12 @@ Skor: {score}/100
             'mentioned': mentioned,
             'score': score,
             'ai_result': result_report.strip(),
+            # ai_result üzerindeki konumlar (strip ile baştan atılan boşluk kadar geri kaydırılır)
+            'spans': shift_spans(report_spans, len(result_report.lstrip()) - len(result_report)),
             'content_snippet': clean_content[:300] + '...',
             'brand_contexts': brand_contexts[:3],
             'model_contexts': model_contexts[:3],
-            'analysis_method': 'gemini' if GEMINI_AVAILABLE and ai_analysis != "Basit Analiz" else 'basic'
+            'analysis_method': analysis_method
         }
         
     except Exception as e:
@@ -531,12 +676,20 @@ Skor: {score}/100
             'mentioned': False,
             'score': 0,
             'ai_result': f"Analiz hatası: {str(e)}",
+            'spans': [],
             'content_snippet': 'Hata nedeniyle analiz edilemedi',
             'brand_contexts': [],
             'model_contexts': [],
             'analysis_method': 'error'
         }
 
+async def analyze_with_ai(content: str, brand: str, model: str, url: str, tenant: str = None) -> Dict[str, Any]:
+    """analyze_content_with_ai'yi batch şeridinde, thread'de çalıştır - interactive istekler önce geçer"""
+    return await llm_gateway.call(
+        analyze_content_with_ai, content, brand, model, url,
+        lane=LANE_BATCH, tenant=tenant or tenant_for_website(url)
+    )
+
 @app.post("/analyze-prompt")
 async def analyze_prompt_endpoint(request_data: dict):
     """Prompt analizi - kullanıcının girdiği promptta belirli website'ler aranır"""
@@ -556,37 +709,20 @@ async def analyze_prompt_endpoint(request_data: dict):
         if not target_websites:
             raise HTTPException(status_code=400, detail="En az bir website seçilmelidir")
         
+        # LLM kotası: workspace verilmezse ilk aranan sitenin host'u
+        prompt_tenant = tenant_for_website(target_websites[0], request_data.get('workspace_id'))
+        
         # Gelişmiş keyword analizi (hem site hem firma ismi)
         def smart_website_detection(prompt: str, website: str) -> dict:
-            """Akıllı website/firma tespit algoritması"""
-            prompt_lower = prompt.lower()
-            website_lower = website.lower()
+            """Akıllı website/firma tespit algoritması - firma adları brand_profiles'tan gelir"""
+            prompt_folded = fold_turkish(prompt)
             
             # Website domain'i direkt geçiyor mu?
-            domain_mentioned = website_lower in prompt_lower
+            domain_mentioned = fold_turkish(website) in prompt_folded
             
-            # Firma ismini çıkar (domain'den)
-            if website_lower == "elmaspatent.com":
-                company_names = ["elmas patent", "elmaspatent"]
-            elif website_lower == "liderpatent.com.tr":
-                company_names = ["lider patent", "liderpatent"]
-            elif website_lower == "bilgipatent.com":
-                company_names = ["bilgi patent", "bilgipatent"]
-            elif website_lower == "workexe.co":
-                company_names = ["workexe"]
-            else:
-                # Genel domain parse
-                domain_name = website_lower.replace('.com', '').replace('.tr', '').replace('.co', '').replace('www.', '')
-                company_names = [domain_name, domain_name.replace('-', ' ')]
-            
-            # Firma ismi geçiyor mu?
-            company_mentioned = False
-            found_company_name = ""
-            for company_name in company_names:
-                if company_name in prompt_lower:
-                    company_mentioned = True
-                    found_company_name = company_name
-                    break
+            # Firma ismi (veya kayıtlı yazım varyasyonu) geçiyor mu?
+            found_company_name = brand_registry.get(website).first_alias(prompt_folded) or ""
+            company_mentioned = bool(found_company_name)
             
             # Sonuç
             mentioned = domain_mentioned or company_mentioned
@@ -633,10 +769,7 @@ async def analyze_prompt_endpoint(request_data: dict):
                 4. Website ile ilgili hangi konular sorulmuş?
 
                 NOT: Website'lerin firma isimleri:
-                - elmaspatent.com → "Elmas Patent"
-                - liderpatent.com.tr → "Lider Patent" 
-                - bilgipatent.com → "Bilgi Patent"
-                - workexe.co → "Workexe"
+                {chr(10).join([f'- {site} → "{(brand_registry.get(site).company_names or [site])[0].title()}"' for site in target_websites])}
 
                 CEVAP FORMATI:
                 WEBSITE_ANALIZI:
@@ -659,7 +792,11 @@ async def analyze_prompt_endpoint(request_data: dict):
                     try:
                         print(f"🔄 Prompt analizi model: {model_name}")
                         model_ai = genai.GenerativeModel(model_name)
-                        response = model_ai.generate_content(analysis_prompt)
+                        # Kullanıcı bekliyor - batch kuyruğunun önüne geçer
+                        response = await llm_gateway.call(
+                            model_ai.generate_content, analysis_prompt,
+                            lane=LANE_INTERACTIVE, tenant=prompt_tenant
+                        )
                         analysis_result = response.text
                         print(f"✅ Başarılı model: {model_name}")
                         break
@@ -743,7 +880,8 @@ async def analyze_prompt_endpoint(request_data: dict):
                 }
                 
                 if USE_SUPABASE:
-                    supabase.table('llm_mentions').insert(analysis_data).execute()
+                    inserted = supabase_client.table('llm_mentions').insert(analysis_data).execute()
+                    append_events_supabase(supabase_client, [mention_created(row) for row in inserted.data or []])
                 else:
                     conn = get_db_connection()
                     cursor = conn.cursor()
@@ -757,6 +895,7 @@ async def analyze_prompt_endpoint(request_data: dict):
                         analysis_data['mentioned'], analysis_data['score'],
                         analysis_data['summary'], analysis_data['source_url'], analysis_data['created_at']
                     ))
+                    append_events_sqlite(conn, [mention_created({**analysis_data, 'id': cursor.lastrowid})])
                     conn.commit()
                     conn.close()
                 
@@ -818,7 +957,7 @@ async def root():
 
 @app.post("/add-url")
 async def add_url_endpoint(request_data: URLRequest):
-    """URL ekleme endpoint'i"""
+    """URL ekleme endpoint'i (kanonik forma göre tekilleştirilir)"""
     try:
         url = request_data.url.strip()
         print(f"🔍 URL ekleme isteği: {url}")
@@ -831,15 +970,22 @@ async def add_url_endpoint(request_data: URLRequest):
         if not parsed_url.scheme or not parsed_url.netloc:
             raise HTTPException(status_code=400, detail="Geçersiz URL formatı")
         
+        canonical_url = canonicalize_url(url)
+        workspace_id = tenant_for_website(url, request_data.workspace_id)
+        
+        # Aynı kanonik URL zaten var mı? (www, sondaki /, utm_* vb. farklar)
+        existing = find_url_by_canonical(canonical_url)
+        if existing:
+            if existing['url'] != url:
+                record_url_alias(url, existing['id'])
+            raise HTTPException(status_code=400, detail=f"Bu URL zaten eklenmiş ({existing['url']})")
+        
         if USE_SUPABASE:
-            # Supabase kontrolü
-            existing = supabase.table('urls').select('id').eq('url', url).execute()
-            if existing.data:
-                raise HTTPException(status_code=400, detail="Bu URL zaten eklenmiş")
-            
             # URL'yi ekle
-            result = supabase.table('urls').insert({
+            result = supabase_client.table('urls').insert({
                 'url': url,
+                'canonical_url': canonical_url,
+                'workspace_id': workspace_id,
                 'status': 'pending',
                 'created_at': datetime.now().isoformat(),
                 'updated_at': datetime.now().isoformat()
@@ -848,22 +994,14 @@ async def add_url_endpoint(request_data: URLRequest):
             url_id = result.data[0]['id']
             
         else:
-            # SQLite kontrolü
             conn = get_db_connection()
             cursor = conn.cursor()
             
-            cursor.execute('SELECT id FROM urls WHERE url = ?', (url,))
-            existing = cursor.fetchone()
-            
-            if existing:
-                conn.close()
-                raise HTTPException(status_code=400, detail="Bu URL zaten eklenmiş")
-            
             # URL'yi ekle
             cursor.execute('''
-                INSERT INTO urls (url, status, created_at, updated_at)
-                VALUES (?, 'pending', ?, ?)
-            ''', (url, datetime.now(), datetime.now()))
+                INSERT INTO urls (url, canonical_url, workspace_id, status, created_at, updated_at)
+                VALUES (?, ?, ?, 'pending', ?, ?)
+            ''', (url, canonical_url, workspace_id, datetime.now(), datetime.now()))
             
             conn.commit()
             url_id = cursor.lastrowid
@@ -876,6 +1014,21 @@ async def add_url_endpoint(request_data: URLRequest):
             title = content_result['title']
             status = 'active'
             error_message = None
+            
+            # Yönlendirme sonrası kanonik hedefi kaydet
+            final_canonical = canonicalize_url(content_result.get('final_url') or url)
+            if final_canonical != canonical_url:
+                redirect_target = find_url_by_canonical(final_canonical)
+                if redirect_target:
+                    # Hedef zaten takip ediliyor - yeni satırı kaldır, alias olarak bağla
+                    delete_url_row(url_id)
+                    record_url_alias(url, redirect_target['id'])
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Bu URL zaten eklenmiş (yönlendirme: {redirect_target['url']})"
+                    )
+                record_url_alias(url, url_id)
+                canonical_url = final_canonical
         else:
             title = None
             status = 'error'
@@ -883,26 +1036,28 @@ async def add_url_endpoint(request_data: URLRequest):
         
         # Title güncelle
         if USE_SUPABASE:
-            supabase.table('urls').update({
+            supabase_client.table('urls').update({
                 'title': title,
                 'status': status,
+                'canonical_url': canonical_url,
                 'error_message': error_message
             }).eq('id', url_id).execute()
         else:
             conn = get_db_connection()
             cursor = conn.cursor()
             cursor.execute('''
-                UPDATE urls SET title = ?, status = ?, error_message = ? WHERE id = ?
-            ''', (title, status, error_message, url_id))
+                UPDATE urls SET title = ?, status = ?, canonical_url = ?, error_message = ? WHERE id = ?
+            ''', (title, status, canonical_url, error_message, url_id))
             conn.commit()
             conn.close()
         
-        print(f"✅ URL eklendi: {url} (ID: {url_id})")
+        print(f"✅ URL eklendi: {url} (ID: {url_id}, kanonik: {canonical_url})")
         
         return {
             'status': 'success',
             'message': 'URL başarıyla eklendi',
-            'data': {'id': url_id, 'url': url, 'title': title}
+            'data': {'id': url_id, 'url': url, 'canonical_url': canonical_url, 'title': title,
+                     'workspace_id': workspace_id}
         }
         
     except HTTPException:
@@ -911,20 +1066,56 @@ async def add_url_endpoint(request_data: URLRequest):
         print(f"🔥 URL ekleme hatası: {e}")
         raise HTTPException(status_code=500, detail=f"URL eklenirken hata: {str(e)}")
 
+@app.post("/ingest-sitemap")
+async def ingest_sitemap_endpoint(request_data: dict):
+    """Sitemap'teki URL'leri toplu ekle (sayfalar eklenirken çekilmez)"""
+    try:
+        sitemap_url = request_data.get('sitemap_url', '').strip()
+        max_urls = request_data.get('max_urls')
+        
+        if not sitemap_url:
+            raise HTTPException(status_code=400, detail="Sitemap URL gereklidir")
+        
+        parsed_url = urlparse(sitemap_url)
+        if not parsed_url.scheme or not parsed_url.netloc:
+            raise HTTPException(status_code=400, detail="Geçersiz URL formatı")
+        
+        print(f"🗺️ Sitemap ingest başlatıldı: {sitemap_url}")
+        
+        ingestor = SitemapIngestor(
+            max_urls=int(max_urls) if max_urls else None,
+            supabase_client=supabase_client if USE_SUPABASE else None
+        )
+        stats = await asyncio.to_thread(ingestor.ingest, sitemap_url)
+        
+        print(f"✅ Sitemap ingest tamamlandı: {stats['urls_inserted']} yeni URL")
+        
+        return {
+            'status': 'success',
+            'message': f"{stats['urls_inserted']} yeni URL eklendi",
+            'data': stats
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"🔥 Sitemap ingest hatası: {e}")
+        raise HTTPException(status_code=500, detail=f"Sitemap işlenirken hata: {str(e)}")
+
 @app.get("/get-urls")
 async def get_urls_endpoint():
     """URL listesi getirme endpoint'i"""
     try:
         if USE_SUPABASE:
-            response = supabase.table('urls').select('*').order('created_at', desc=True).execute()
+            response = supabase_client.table('urls').select('*').order('created_at', desc=True).execute()
             urls = response.data
         else:
             conn = get_db_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT id, url, status, title, description, last_analysis, 
-                       error_message, analysis_count, created_at, updated_at
+                SELECT id, url, canonical_url, status, title, description, last_analysis, 
+                       error_message, analysis_count, lastmod, source, created_at, updated_at
                 FROM urls 
                 ORDER BY created_at DESC
             ''')
@@ -948,16 +1139,21 @@ async def remove_url_endpoint(url_id: int):
     try:
         if USE_SUPABASE:
             # URL'nin var olup olmadığını kontrol et
-            existing = supabase.table('urls').select('url').eq('id', url_id).execute()
+            existing = supabase_client.table('urls').select('url').eq('id', url_id).execute()
             if not existing.data:
                 raise HTTPException(status_code=404, detail='URL bulunamadı')
             
             # İlgili analiz sonuçlarını sil
-            supabase.table('url_analysis_results').delete().eq('url_id', url_id).execute()
-            supabase.table('llm_mentions').delete().eq('source_url', existing.data[0]['url']).execute()
+            supabase_client.table('url_analysis_results').delete().eq('url_id', url_id).execute()
+            removed = supabase_client.table('llm_mentions').select('id').eq('source_url', existing.data[0]['url']).execute()
+            delete_spans_supabase(supabase_client, 'llm_mentions', [row['id'] for row in removed.data or []])
+            supabase_client.table('llm_mentions').delete().eq('source_url', existing.data[0]['url']).execute()
+            append_events_supabase(supabase_client, [mentions_deleted(existing.data[0]['url'])])
             
             # URL'yi sil
-            supabase.table('urls').delete().eq('id', url_id).execute()
+            supabase_client.table('urls').delete().eq('id', url_id).execute()
+            if pair_store:
+                pair_store.delete_url(url_id)
             
         else:
             conn = get_db_connection()
@@ -972,8 +1168,16 @@ async def remove_url_endpoint(url_id: int):
             
             # İlgili verileri sil
             cursor.execute('DELETE FROM url_analysis_results WHERE url_id = ?', (url_id,))
+            cursor.execute('DELETE FROM url_aliases WHERE url_id = ?', (url_id,))
+            cursor.execute('DELETE FROM url_frontier WHERE url_id = ?', (url_id,))
+            delete_url_sqlite(cursor, url_id)
+            cursor.execute('''
+                DELETE FROM mention_spans WHERE source = 'llm_mentions'
+                AND row_id IN (SELECT id FROM llm_mentions WHERE source_url = ?)
+            ''', (url_data['url'],))
             cursor.execute('DELETE FROM llm_mentions WHERE source_url = ?', (url_data['url'],))
             cursor.execute('DELETE FROM urls WHERE id = ?', (url_id,))
+            append_events_sqlite(conn, [mentions_deleted(url_data['url'])])
             
             conn.commit()
             conn.close()
@@ -986,152 +1190,374 @@ async def remove_url_endpoint(url_id: int):
         logger.error(f"URL silme hatası: {str(e)}")
         raise HTTPException(status_code=500, detail=f"URL silinirken hata: {str(e)}")
 
-@app.post("/run-llm-mention-analysis")
-async def run_analysis():
-    """LLM mention analizi çalıştırma endpoint'i"""
+def save_mention_batch(mentions: list, finished_urls: list):
+    """Analiz sonuçlarını tek transaction'da yaz, tamamlanan URL'lerin son analiz tarihini güncelle"""
+    now = datetime.now()
+    if USE_SUPABASE:
+        if mentions:
+            inserted = supabase_client.table('llm_mentions').insert([
+                {key: value for key, value in m.items() if key != 'spans'} for m in mentions
+            ]).execute()
+            append_events_supabase(supabase_client, [mention_created(row) for row in inserted.data or []])
+            append_spans_supabase(supabase_client, 'llm_mentions', {
+                row['id']: m.get('spans', []) for row, m in zip(inserted.data or [], mentions)
+            })
+        for url_data in finished_urls:
+            supabase_client.table('urls').update({
+                'last_analysis': now.isoformat(),
+                'analysis_count': (url_data.get('analysis_count', 0) or 0) + 1
+            }).eq('id', url_data['id']).execute()
+        return
+    
+    conn = get_db_connection()
     try:
-        print("🚀 URL analizi başlatıldı...")
-        
-        # Aktif URL'leri al
-        if USE_SUPABASE:
-            response = supabase.table('urls').select('*').eq('status', 'active').execute()
-            urls = response.data
-        else:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM urls WHERE status = "active"')
-            urls = [dict(row) for row in cursor.fetchall()]
-            conn.close()
-        
-        print(f"📊 {len(urls)} aktif URL bulundu")
-        
-        if not urls:
-            return {"status": "error", "message": "Analiz edilecek aktif URL bulunamadı"}
-        
-        # Analiz parametreleri
-        brands = ['Workexe', 'Ahrefs', 'Semrush', 'Surfer SEO']
-        models = ['ChatGPT', 'Claude', 'Gemini', 'Copilot']
-        
-        total_results = 0
-        successful_calls = 0
-        failed_calls = 0
-        
-        # URL'leri analiz et (ilk 3 URL)
-        for url_data in urls[:3]:
-            url = url_data['url']
-            print(f"🔍 {url} analiz ediliyor...")
-            
-            try:
-                # URL içeriğini getir
-                content_result = fetch_url_content(url)
-                
-                if not content_result['success']:
-                    print(f"❌ URL erişim hatası: {content_result['error']}")
-                    failed_calls += 1
-                    continue
-                
-                content = content_result['content']
-                title = content_result['title']
-                
-                print(f"📄 Sayfa başlığı: {title}")
-                
-                # Her brand-model kombinasyonu için analiz
-                for brand in brands:
-                    for model in models:
-                        try:
-                            # AI analizi
-                            analysis_result = await analyze_with_ai(content, brand, model, url)
-                            
-                            analysis_data = {
-                                'brand': brand,
-                                'model': model,
-                                'prompt': f"URL Analizi: {url} - '{brand}' ve '{model}' bahsediliyor mu?",
-                                'response': f"Sayfa: {title}. {analysis_result['ai_result']}",
-                                'mentioned': analysis_result['mentioned'],
-                                'score': analysis_result['score'],
-                                'summary': f"'{brand}' {'bahsedildi' if analysis_result['brand_mentioned'] else 'bahsedilmedi'}, '{model}' {'bahsedildi' if analysis_result['model_mentioned'] else 'bahsedilmedi'}. Skor: {analysis_result['score']}/100",
-                                'source_url': url
-                            }
-                            
-                            # Veritabanına kaydet
-                            if USE_SUPABASE:
-                                supabase.table('llm_mentions').insert(analysis_data).execute()
-                            else:
-                                conn = get_db_connection()
-                                cursor = conn.cursor()
-                                cursor.execute('''
-                                    INSERT INTO llm_mentions 
-                                    (brand, model, prompt, response, mentioned, score, summary, source_url, created_at)
-                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                                ''', (
-                                    analysis_data['brand'], analysis_data['model'],
-                                    analysis_data['prompt'], analysis_data['response'],
-                                    analysis_data['mentioned'], analysis_data['score'],
-                                    analysis_data['summary'], analysis_data['source_url'], datetime.now()
-                                ))
-                                conn.commit()
-                                conn.close()
-                            
-                            print(f"✅ Kaydedildi: {brand} - {model} - {analysis_result['score']}")
-                            total_results += 1
-                            successful_calls += 1
-                            
-                        except Exception as save_error:
-                            print(f"❌ Kaydetme hatası: {save_error}")
-                            failed_calls += 1
-                
-                # URL'nin son analiz tarihini güncelle
-                if USE_SUPABASE:
-                    supabase.table('urls').update({
-                        'last_analysis': datetime.now().isoformat(),
-                        'analysis_count': (url_data.get('analysis_count', 0) or 0) + 1
-                    }).eq('id', url_data['id']).execute()
-                else:
-                    conn = get_db_connection()
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        UPDATE urls SET last_analysis = ?, analysis_count = analysis_count + 1 WHERE id = ?
-                    ''', (datetime.now(), url_data['id']))
-                    conn.commit()
-                    conn.close()
-                
-                print(f"📅 URL {url} güncellendi")
-                
-            except Exception as url_error:
-                print(f"❌ URL işleme hatası: {url_error}")
-                failed_calls += 1
-                continue
-        
-        result = {
-            "status": "success",
-            "message": f"Analiz tamamlandı! {total_results} sonuç oluşturuldu.",
-            "data": {
-                "results_count": total_results,
-                "analyzed_urls": len(urls[:3]),
-                "successful_calls": successful_calls,
-                "failed_calls": failed_calls
-            }
+        with conn:
+            events, spans = [], {}
+            for m in mentions:
+                cursor = conn.execute('''
+                    INSERT INTO llm_mentions 
+                    (brand, model, prompt, response, mentioned, score, summary, source_url, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    m['brand'], m['model'], m['prompt'], m['response'],
+                    m['mentioned'], m['score'], m['summary'], m['source_url'], now
+                ))
+                events.append(mention_created({**m, 'id': cursor.lastrowid, 'created_at': now}))
+                spans[cursor.lastrowid] = m.get('spans', [])
+            # Bildirimler ve eşleşme konumları mention'larla aynı transaction'da - yarım kayıt yayınlanmaz
+            append_events_sqlite(conn, events)
+            append_spans_sqlite(conn, 'llm_mentions', spans)
+            conn.executemany(
+                'UPDATE urls SET last_analysis = ?, analysis_count = analysis_count + 1 WHERE id = ?',
+                [(now, url_data['id']) for url_data in finished_urls]
+            )
+    finally:
+        conn.close()
+
+def build_mention(url: str, title: str, brand: str, model: str, analysis_result: Dict) -> Dict[str, Any]:
+    """analyze_with_ai sonucundan llm_mentions satırı ('spans' kolon değil, mention_spans'e yazılır)"""
+    prefix = f"Sayfa: {title}. "
+    return {
+        'brand': brand,
+        'model': model,
+        'prompt': f"URL Analizi: {url} - '{brand}' ve '{model}' bahsediliyor mu?",
+        'response': prefix + analysis_result['ai_result'],
+        'mentioned': analysis_result['mentioned'],
+        'score': analysis_result['score'],
+        'summary': f"'{brand}' {'bahsedildi' if analysis_result['brand_mentioned'] else 'bahsedilmedi'}, '{model}' {'bahsedildi' if analysis_result['model_mentioned'] else 'bahsedilmedi'}. Skor: {analysis_result['score']}/100",
+        'source_url': url,
+        # response içindeki geçişler - analizörün sayfada bulduğu konumlar, rapor etiketleri değil
+        'spans': shift_spans(analysis_result.get('spans', []), len(prefix))
+    }
+
+def pair_row(version_id: int, mention: Dict) -> Dict[str, Any]:
+    return {
+        'content_version_id': version_id, 'brand': mention['brand'], 'model': mention['model'],
+        'analyzer_version': MENTION_ANALYZER_VERSION, 'mentioned': mention['mentioned'],
+        'score': mention['score'], 'result': mention
+    }
+
+async def execute_llm_mention_analysis(progress=None, brands: Optional[List[str]] = None,
+                                       models: Optional[List[str]] = None) -> Dict[str, Any]:
+    """LLM mention analizi: fetch → extract → analyze → persist aşamaları sınırlı kuyruklarla bağlı
+
+    Sonuçlar (içerik sürümü, brand, model, analizör sürümü) ile saklanır; sayfanın bu sürümü için
+    zaten hesaplanmış çiftler tekrar AI'a gönderilmez.
+    """
+    print("🚀 URL analizi başlatıldı...")
+    
+    # Analiz parametreleri
+    brands = brands or ANALYSIS_BRANDS
+    models = models or ANALYSIS_MODELS
+    
+    frontier = create_frontier('ai_visibility.db', use_postgres=USE_SUPABASE)
+    host_scheduler = HostScheduler()
+    counters = {'analyzed_urls': 0, 'unchanged_urls': 0, 'failed_urls': 0, 'results_count': 0,
+                'queued_urls': 0, 'finished_urls': 0, 'reused_pairs': 0}
+    # URL başına kalan brand x model sonucu - hepsi yazılınca URL ve frontier hash'i güncellenir
+    remaining_per_url = {}
+    page_hashes = {}
+    
+    async def url_source():
+        """Vadesi gelen URL'leri frontier'dan parça parça kirala (kuyruk doldukça bekler)"""
+        if not frontier:
+            response = await asyncio.to_thread(
+                lambda: supabase_client.table('urls').select('*').eq('status', 'active').order('last_analysis', desc=False).execute()
+            )
+            rows = response.data or []
+            for url_data in rows[:ANALYSIS_URL_BUDGET or None]:
+                counters['queued_urls'] += 1
+                yield url_data
+            return
+        
+        await asyncio.to_thread(frontier.sync)
+        claimed = 0
+        while not ANALYSIS_URL_BUDGET or claimed < ANALYSIS_URL_BUDGET:
+            limit = FRONTIER_BATCH_SIZE
+            if ANALYSIS_URL_BUDGET:
+                limit = min(limit, ANALYSIS_URL_BUDGET - claimed)
+            rows = await asyncio.to_thread(frontier.claim, API_WORKER_ID, limit)
+            if not rows:
+                break
+            claimed += len(rows)
+            for url_data in rows:
+                counters['queued_urls'] += 1
+                yield url_data
+    
+    def url_tenant(url_data) -> str:
+        return tenant_for_website(url_data['url'], url_data.get('workspace_id'))
+    
+    async def fetch_stage(url_data):
+        url = url_data['url']
+        # Aynı host'a art arda istek atma - diğer host'lar beklemez
+        wait_seconds = host_scheduler.reserve(url, DEFAULT_HOST_DELAY)
+        if wait_seconds > 0:
+            await asyncio.sleep(wait_seconds)
+        print(f"🔍 {url} getiriliyor...")
+        content_result = await async_fetch_page(client, url)
+        usage_ledger.record(url_tenant(url_data), fetches=1, fetch_errors=int(not content_result['success']))
+        return [(url_data, content_result)]
+    
+    async def extract_stage(fetched):
+        url_data, content_result = fetched
+        url = url_data['url']
+        
+        if not content_result['success']:
+            print(f"❌ URL erişim hatası: {content_result['error']}")
+            counters['failed_urls'] += 1
+            if frontier:
+                await asyncio.to_thread(frontier.record_failure, url_data['id'], content_result['error'], API_WORKER_ID)
+            return []
+        
+        content = content_result['content']
+        title = content_result['title']
+        print(f"📄 Sayfa başlığı: {title}")
+        
+        page_hash = content_hash(f"{title}\n{content}")
+        changed = True
+        if frontier:
+            # Hash burada yazılmaz - analiz yarıda kalırsa sayfa sonraki turda tekrar denenir
+            changed = await asyncio.to_thread(frontier.content_changed, url_data['id'], page_hash)
+        
+        # Sürümün çıkarılmış metni saklanır - yeni brand/model eklenince sayfa tekrar getirilmez.
+        # Store yoksa (Supabase, DATABASE_URL yok) sürüm tutulmaz, tüm çiftler hesaplanır
+        version_id, pairs = None, [(brand, model) for brand in brands for model in models]
+        if pair_store:
+            version_id = await asyncio.to_thread(pair_store.save_version, url_data['id'], url, title, content, page_hash)
+            pairs = await asyncio.to_thread(
+                pair_store.missing_pairs, version_id, brands, models, MENTION_ANALYZER_VERSION
+            )
+        reused = len(brands) * len(models) - len(pairs)
+        counters['reused_pairs'] += reused
+        
+        # İçerik değişmediyse ve çiftler hesaplıysa AI çağrılarını harcama. Sürüm kaydı olmadan önce
+        # analiz edilmiş (hiç çifti olmayan) değişmemiş sayfa da eskisi gibi atlanır
+        if not pairs or (not changed and not reused):
+            print(f"⏭️ İçerik değişmemiş, analiz atlandı: {url}")
+            counters['unchanged_urls'] += 1
+            if frontier:
+                await asyncio.to_thread(frontier.record_success, url_data['id'], page_hash, API_WORKER_ID)
+            return []
+        
+        counters['analyzed_urls'] += 1
+        remaining_per_url[url_data['id']] = len(pairs)
+        page_hashes[url_data['id']] = page_hash
+        return [(url_data, version_id, title, content, brand, model) for brand, model in pairs]
+    
+    async def analyze_stage(task):
+        url_data, version_id, title, content, brand, model = task
+        url = url_data['url']
+        analysis_result = await analyze_with_ai(content, brand, model, url, tenant=url_tenant(url_data))
+        # Hatalı veya yedek (rastgele skorlu) analiz çift olarak saklanmaz - sonraki çalışmada tekrar denenir
+        if analysis_result.get('analysis_method') in NON_FINAL_ANALYSIS_METHODS:
+            version_id = None
+        return [(url_data, version_id, build_mention(url, title, brand, model, analysis_result))]
+    
+    async def persist_stage(batch):
+        finished_urls = []
+        for url_data, _, _ in batch:
+            remaining_per_url[url_data['id']] -= 1
+            if remaining_per_url[url_data['id']] == 0:
+                finished_urls.append(url_data)
+        
+        await asyncio.to_thread(save_mention_batch, [mention for _, _, mention in batch], finished_urls)
+        if pair_store:
+            await asyncio.to_thread(pair_store.save_pairs, [
+                pair_row(version_id, mention) for _, version_id, mention in batch if version_id
+            ])
+        if frontier:
+            # Tüm sonuçları yazılan URL'lerin hash'i artık kaydedilebilir
+            for url_data in finished_urls:
+                await asyncio.to_thread(
+                    frontier.record_success, url_data['id'], page_hashes.pop(url_data['id']), API_WORKER_ID
+                )
+        counters['results_count'] += len(batch)
+        counters['finished_urls'] += len(finished_urls)
+        print(f"✅ Kaydedildi: {len(batch)} sonuç, {len(finished_urls)} URL tamamlandı")
+        if progress:
+            done = counters['finished_urls'] + counters['unchanged_urls'] + counters['failed_urls']
+            await progress(
+                done / max(counters['queued_urls'], 1) * 100,
+                f"{done}/{counters['queued_urls']} URL, {counters['results_count']} sonuç"
+            )
+        return []
+    
+    async with create_async_client(max_connections=PIPELINE_FETCH_CONCURRENCY) as client:
+        stats = await run_pipeline(url_source(), [
+            PipelineStage('fetch', fetch_stage, concurrency=PIPELINE_FETCH_CONCURRENCY),
+            PipelineStage('extract', extract_stage, concurrency=PIPELINE_EXTRACT_CONCURRENCY),
+            PipelineStage('analyze', analyze_stage, concurrency=PIPELINE_ANALYZE_CONCURRENCY),
+            # SQLite tek yazıcı - sonuçlar toplu yazılır
+            PipelineStage('persist', persist_stage, concurrency=1, batch_size=PIPELINE_PERSIST_BATCH)
+        ])
+    
+    pipeline_report = stats.report(stats.counters.get('source_items', 0))
+    
+    if not pipeline_report['items_processed']:
+        return {"status": "error", "message": "Analiz edilecek aktif URL bulunamadı"}
+    
+    pipeline_counters = pipeline_report['counters']
+    failed_calls = pipeline_counters.get('analyze_errors', 0) + pipeline_counters.get('persist_errors', 0)
+    
+    result = {
+        "status": "success",
+        "message": f"Analiz tamamlandı! {counters['results_count']} sonuç oluşturuldu.",
+        "data": {
+            "results_count": counters['results_count'],
+            "analyzed_urls": counters['analyzed_urls'],
+            "unchanged_urls": counters['unchanged_urls'],
+            "failed_urls": counters['failed_urls'],
+            "successful_calls": counters['results_count'],
+            "failed_calls": failed_calls,
+            "reused_pairs": counters['reused_pairs'],
+            "pipeline": pipeline_report
         }
-        
-        print("🎉 Analiz tamamlandı:", result)
-        return result
+    }
+    
+    print("🎉 Analiz tamamlandı:", result)
+    return result
+
+async def execute_pair_reanalysis(payload: Dict, progress=None) -> Dict[str, Any]:
+    """Marka/model listesi değişince sadece eksik çiftleri saklanan sayfa metninden hesapla (sayfa getirilmez)"""
+    if pair_store is None:
+        raise RuntimeError(PAIR_STORE_UNAVAILABLE)
+    brands = payload.get('brands') or ANALYSIS_BRANDS
+    models = payload.get('models') or ANALYSIS_MODELS
+    print(f"🔁 Farksal analiz: {len(brands)} brand x {len(models)} model")
+    
+    counters = {'versions': 0, 'pairs_total': 0, 'pairs_computed': 0, 'pairs_reused': 0, 'pairs_failed': 0}
+    total_versions = await asyncio.to_thread(pair_store.count_urls, payload.get('url_ids'))
+    semaphore = asyncio.Semaphore(PIPELINE_ANALYZE_CONCURRENCY)
+    
+    async def analyze_pair(version: Dict, brand: str, model: str):
+        async with semaphore:
+            try:
+                analysis_result = await analyze_with_ai(version['content'] or '', brand, model, version['url'])
+            except Exception as e:
+                analysis_result = {'analysis_method': 'error', 'ai_result': str(e)}
+        if analysis_result.get('analysis_method') in NON_FINAL_ANALYSIS_METHODS:
+            print(f"❌ Çift analizi tamamlanamadı ({brand} x {model}, {version['url']}): {analysis_result['analysis_method']}")
+            counters['pairs_failed'] += 1
+            return None
+        return version['id'], build_mention(version['url'], version['title'], brand, model, analysis_result)
+    
+    for versions in pair_store.iter_latest_versions(PAIR_VERSION_BATCH, payload.get('url_ids')):
+        existing = await asyncio.to_thread(
+            pair_store.existing_pairs, [version['id'] for version in versions], MENTION_ANALYZER_VERSION
+        )
+        tasks = []
+        for version in versions:
+            done = existing[version['id']]
+            missing = [(brand, model) for brand in brands for model in models if (brand, model) not in done]
+            counters['versions'] += 1
+            counters['pairs_total'] += len(brands) * len(models)
+            counters['pairs_reused'] += len(brands) * len(models) - len(missing)
+            tasks += [analyze_pair(version, brand, model) for brand, model in missing]
+        
+        results = [result for result in await asyncio.gather(*tasks) if result]
+        if results:
+            await asyncio.to_thread(save_mention_batch, [mention for _, mention in results], [])
+            await asyncio.to_thread(pair_store.save_pairs, [pair_row(version_id, mention) for version_id, mention in results])
+        counters['pairs_computed'] += len(results)
+        if progress:
+            await progress(counters['versions'] / max(total_versions, 1) * 100, f"{counters['versions']} sayfa sürümü, {counters['pairs_computed']} çift hesaplandı, "
+                                 f"{counters['pairs_reused']} çift hazırdı")
+    
+    print(f"✅ Farksal analiz tamamlandı: {counters}")
+    return {
+        "status": "success",
+        "message": f"{counters['pairs_computed']} çift hesaplandı, {counters['pairs_reused']} çift hazırdı (tekrar hesaplanmadı).",
+        "data": {**counters, 'brands': brands, 'models': models, 'analyzer_version': MENTION_ANALYZER_VERSION}
+    }
+
+def enqueue_job_response(job_type: str, payload: dict) -> Dict[str, Any]:
+    """İşi kuyruğa al, istemciye hemen job_id döndür"""
+    job_id = job_queue.enqueue(job_type, payload)
+    print(f"📥 İş kuyruğa alındı: {job_type} ({job_id})")
+    return {
+        "status": "queued",
+        "message": f"İş kuyruğa alındı, durumu /jobs/{job_id} üzerinden takip edebilirsiniz",
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}"
+    }
+
+@app.post("/run-llm-mention-analysis")
+async def run_analysis(request_data: dict = None):
+    """LLM mention analizini kuyruğa al (wait=true ise istek içinde çalıştır)"""
+    try:
+        request_data = request_data or {}
+        matrix = analysis_matrix(request_data)
+        if request_data.get('wait'):
+            return await execute_llm_mention_analysis(brands=matrix['brands'], models=matrix['models'])
+        return enqueue_job_response('llm_mention_analysis', matrix)
         
     except Exception as e:
         error_msg = f"Genel analiz hatası: {str(e)}"
         print(f"🔥 {error_msg}")
         raise HTTPException(status_code=500, detail=error_msg)
 
+def analysis_matrix(request_data: dict) -> Dict[str, Any]:
+    """İstekteki brand/model listesi (liste veya virgülle ayrılmış) - verilmezse .env'deki matris"""
+    matrix = {}
+    for key, default in (('brands', ANALYSIS_BRANDS), ('models', ANALYSIS_MODELS)):
+        value = request_data.get(key)
+        matrix[key] = name_list(','.join(value) if isinstance(value, list) else value, default)
+    return matrix
+
+@app.post("/reanalyze")
+async def reanalyze_pairs(request_data: dict = None):
+    """Saklanan sayfa sürümlerinde eksik brand x model çiftlerini hesaplamayı kuyruğa al (wait=true ise istek içinde)"""
+    request_data = request_data or {}
+    if pair_store is None:
+        raise HTTPException(status_code=503, detail=PAIR_STORE_UNAVAILABLE)
+    payload = {**analysis_matrix(request_data), 'url_ids': request_data.get('url_ids') or None}
+    if request_data.get('wait'):
+        return await execute_pair_reanalysis(payload)
+    return enqueue_job_response('pair_reanalysis', payload)
+
 @app.get("/get-mentions")
-async def get_mentions():
-    """Mention verilerini getirme endpoint'i"""
+async def get_mentions(since_id: int = None, compact: bool = False, limit: int = 500):
+    """Mention verilerini getirme endpoint'i
+
+    since_id verilirse sadece o id'den sonra eklenenler (artan sırada, en fazla limit adet) döner.
+    compact=true iken response metni gönderilmez - canlı bildirim sonrası eşitleme için.
+    """
+    columns = ', '.join(COMPACT_MENTION_FIELDS) if compact else '*'
     try:
         if USE_SUPABASE:
-            response = supabase.table("llm_mentions").select("*").order("created_at", desc=True).execute()
+            query = supabase_client.table("llm_mentions").select(columns)
+            if since_id is not None:
+                response = query.gt("id", since_id).order("id").limit(limit).execute()
+            else:
+                response = query.order("created_at", desc=True).execute()
             return {"status": "success", "data": response.data}
         else:
             conn = get_db_connection()
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM llm_mentions ORDER BY created_at DESC')
+            if since_id is not None:
+                cursor.execute(f'SELECT {columns} FROM llm_mentions WHERE id > ? ORDER BY id LIMIT ?', (since_id, limit))
+            else:
+                cursor.execute(f'SELECT {columns} FROM llm_mentions ORDER BY created_at DESC')
             data = [dict(row) for row in cursor.fetchall()]
             conn.close()
             return {"status": "success", "data": data}
@@ -1140,6 +1566,80 @@ async def get_mentions():
         print("🔥 Veri getirme hatası:", e)
         return {"status": "error", "message": str(e), "data": []}
 
+@app.get("/mention-spans/{source}/{row_id}")
+async def get_mention_spans(source: str, row_id: int, window: int = SNIPPET_WINDOW):
+    """Kayıtlı yanıtın eşleşme konumları ve bağlam parçaları
+
+    Konumlar analiz sırasında yazılır; burada eşleşme tekrar aranmaz, yanıt sadece konumdan kesilir.
+    """
+    if source not in SPAN_SOURCES:
+        raise HTTPException(status_code=400, detail=f"source şunlardan biri olmalı: {', '.join(SPAN_SOURCES)}")
+    try:
+        if USE_SUPABASE:
+            rows = supabase_client.table(source).select('response').eq('id', row_id).execute().data
+        else:
+            conn = get_db_connection()
+            rows = [dict(row) for row in conn.execute(f'SELECT response FROM {source} WHERE id = ?', (row_id,)).fetchall()]
+            conn.close()
+        if not rows:
+            raise HTTPException(status_code=404, detail='Kayıt bulunamadı')
+
+        spans = span_index.get(source, row_id)
+        return {
+            'status': 'success',
+            'data': {
+                'source': source,
+                'row_id': row_id,
+                'spans': spans,
+                'snippets': snippets(rows[0]['response'], spans, max(0, window))
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Eşleşme konumu getirme hatası: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Eşleşme konumları alınırken hata: {str(e)}")
+
+@app.websocket("/ws/mentions")
+async def mentions_websocket(websocket: WebSocket, last_event_id: int = None):
+    """Yeni mention ve analiz geçmişi değişikliklerini kompakt olarak push et
+
+    last_event_id ile yeniden bağlanan istemci kaçırdığı olayları önce alır.
+    """
+    await websocket.accept()
+    queue = await mention_event_hub.subscribe()
+    
+    async def forward():
+        sent_id = last_event_id or 0
+        if last_event_id is not None:
+            # Abone olmadan önce yayınlananlar kuyrukta yok - hub'ın konumuna kadar sayfa sayfa tamamla
+            until_id = mention_event_hub.last_id
+            while sent_id < until_id:
+                events = await asyncio.to_thread(mention_event_hub.replay, sent_id)
+                if not events:
+                    break
+                for event in events:
+                    await websocket.send_json(event)
+                    sent_id = event['id']
+        while True:
+            event = await queue.get()
+            # Replay ile canlı akış çakışabilir - aynı olay iki kez gönderilmez
+            if event['id'] <= sent_id and event['event_type'] != 'resync':
+                continue
+            await websocket.send_json(event)
+            sent_id = event['id']
+    
+    sender = asyncio.create_task(forward())
+    try:
+        # İstemci mesajları yok sayılır; bağlantı kapanınca WebSocketDisconnect gelir
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        mention_event_hub.unsubscribe(queue)
+
 @app.get("/get-prompts")
 async def get_prompts():
     """Prompts sayfası için prompt listesi"""
@@ -1543,42 +2043,50 @@ if __name__ == "__main__":
     print("🚀 FastAPI sunucusu başlatılıyor...")
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
 
+async def execute_visibility_test(website: str, custom_prompts: list, progress=None) -> Dict[str, Any]:
+    """Gerçek AI visibility test çalıştır"""
+    print("🎯 Gerçek visibility test başlatılıyor...")
+    
+    # Initialize tester
+    tester = PromptTester()
+    
+    # Run comprehensive test
+    test_results = await tester.run_comprehensive_test(website, custom_prompts)
+    
+    # Save to database (optional)
+    if USE_SUPABASE:
+        try:
+            supabase_client.table('visibility_tests').insert({
+                'website': website,
+                'results': test_results,
+                'created_at': datetime.now().isoformat()
+            }).execute()
+        except Exception as e:
+            print(f"⚠️ Database save hatası: {e}")
+    
+    print(f"✅ Visibility test tamamlandı: {website}")
+    
+    return {
+        "status": "success",
+        "message": "AI visibility test başarıyla tamamlandı",
+        "data": test_results
+    }
+
 @app.post("/run-visibility-test")
 async def run_visibility_test(request_data: dict):
-    """Gerçek AI visibility test çalıştır"""
+    """AI visibility testini kuyruğa al (wait=true ise istek içinde çalıştır)"""
     try:
-        print("🎯 Gerçek visibility test başlatılıyor...")
-        
         website = request_data.get('website', '').strip()
         custom_prompts = request_data.get('prompts', [])
         
         if not website:
             raise HTTPException(status_code=400, detail="Website URL gereklidir")
         
-        # Initialize tester
-        tester = PromptTester()
-        
-        # Run comprehensive test
-        test_results = await tester.run_comprehensive_test(website, custom_prompts)
-        
-        # Save to database (optional)
-        if USE_SUPABASE:
-            try:
-                supabase.table('visibility_tests').insert({
-                    'website': website,
-                    'results': test_results,
-                    'created_at': datetime.now().isoformat()
-                }).execute()
-            except Exception as e:
-                print(f"⚠️ Database save hatası: {e}")
-        
-        print(f"✅ Visibility test tamamlandı: {website}")
-        
-        return {
-            "status": "success",
-            "message": "AI visibility test başarıyla tamamlandı",
-            "data": test_results
-        }
+        if request_data.get('wait'):
+            return await execute_visibility_test(website, custom_prompts)
+        return enqueue_job_response('visibility_test', {
+            'website': website, 'prompts': custom_prompts, 'workspace_id': request_data.get('workspace_id')
+        })
         
     except HTTPException:
         raise
@@ -1598,7 +2106,8 @@ async def quick_prompt_test(request_data: dict):
         if not prompt or not website:
             raise HTTPException(status_code=400, detail="Prompt ve website gereklidir")
         
-        tracker = AIVisibilityTracker()
+        from ai_visibility_tracker import AIVisibilityTracker
+        tracker = AIVisibilityTracker(lane=LANE_INTERACTIVE)
         results = await tracker.test_prompt_visibility(prompt, website)
         
         return {
@@ -1617,93 +2126,576 @@ async def quick_prompt_test(request_data: dict):
         print(f"❌ {error_msg}")
         raise HTTPException(status_code=500, detail=error_msg)
 
-@app.post("/run-real-visibility-test")
-async def run_real_visibility_test(request_data: dict):
+def save_real_visibility_results(website: str, custom_prompts: list, results: Dict[str, Any],
+                                 workspace_id: Optional[str] = None):
+    """Visibility test sonuçlarını llm_visibility_daily (Supabase) veya visibility_tests (SQLite) tablosuna yaz"""
+    # Test sonuçlarını veritabanına kaydet
+    try:
+        # Tüm kullanılan promptları topla (custom + AI generated)
+        all_prompts = []
+        if custom_prompts:
+            all_prompts.extend(custom_prompts)
+            print(f"📝 Custom promptlar eklendi: {custom_prompts}")
+        
+        # AI tarafından oluşturulan promptları da ekle
+        if results.get('test_results'):
+            for test_result in results['test_results']:
+                if 'prompt' in test_result and test_result['prompt'] not in all_prompts:
+                    all_prompts.append(test_result['prompt'])
+                    print(f"🤖 AI prompt eklendi: {test_result['prompt'][:50]}...")
+        
+        print(f"💾 Kaydedilecek tüm promptlar: {all_prompts}")
+        
+        # llm_visibility_daily tablosuna uygun veri yapısı
+        test_data = {
+            "brand": website,  # website -> brand olarak kaydet
+            "date": datetime.now().date().isoformat(),  # sadece tarih
+            "visibility_score": float(results.get('summary', {}).get('average_visibility_score', 0)),
+            "average_rank": float(results.get('summary', {}).get('average_rank', 0)),
+            "sentiment_score": float(results.get('summary', {}).get('sentiment_score', 0)),
+            "total_mentions": int(results.get('summary', {}).get('mentioned_count', 0)),
+            "prompts_used": json.dumps(all_prompts),  # Tüm promptları kaydet
+            "created_at": datetime.now().isoformat()
+        }
+        
+        # Prompt başına yanıtlar (hatalı testler hariç) ve analizde bulunan eşleşme konumları
+        tested = [test_result for test_result in results.get('test_results', []) if 'response' in test_result]
+        row_spans = [test_result.get('mention_spans', []) for test_result in tested]
+        result_rows = [
+            {
+                'website': website,
+                'workspace_id': tenant_for_website(website, workspace_id),
+                'prompt': test_result.get('prompt'),
+                'response': test_result.get('response'),
+                'visibility_score': test_result.get('visibility_score', 0),
+                'mentioned': bool(test_result.get('mentioned')),
+                'ranking': test_result.get('ranking'),
+                'sentiment': test_result.get('sentiment')
+            }
+            for test_result in tested
+        ]
+        
+        if USE_SUPABASE and supabase_client:
+            # Supabase'e llm_visibility_daily tablosuna kaydet
+            response = supabase_client.table('llm_visibility_daily').insert(test_data).execute()
+            print(f"✅ Test sonuçları Supabase llm_visibility_daily tablosuna kaydedildi: {response}")
+            if result_rows:
+                inserted = supabase_client.table('visibility_test_results').insert(result_rows).execute()
+                append_spans_supabase(supabase_client, 'visibility_test_results', {
+                    row['id']: spans for row, spans in zip(inserted.data or [], row_spans)
+                })
+        else:
+            # SQLite'a kaydet (fallback)
+            conn = sqlite3.connect('ai_visibility.db')
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO visibility_tests (website, workspace_id, prompts, results_summary, visibility_score, mentioned_count, total_tests, test_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                website,
+                tenant_for_website(website, workspace_id),
+                json.dumps(custom_prompts) if custom_prompts else "",
+                json.dumps(results.get('summary', {})),
+                results.get('summary', {}).get('average_visibility_score', 0),
+                results.get('summary', {}).get('mentioned_count', 0),
+                results.get('summary', {}).get('successful_tests', 0),
+                datetime.now().isoformat()
+            ))
+            test_id = cursor.lastrowid
+            spans_by_row = {}
+            for row, spans in zip(result_rows, row_spans):
+                cursor.execute('''
+                    INSERT INTO visibility_test_results
+                    (test_id, website, workspace_id, prompt, response, visibility_score, mentioned, ranking, sentiment)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (test_id, row['website'], row['workspace_id'], row['prompt'], row['response'],
+                      row['visibility_score'], row['mentioned'], row['ranking'], row['sentiment']))
+                spans_by_row[cursor.lastrowid] = spans
+            append_spans_sqlite(conn, 'visibility_test_results', spans_by_row)
+            conn.commit()
+            conn.close()
+            print(f"✅ Test sonuçları SQLite'a kaydedildi")
+            
+    except Exception as db_error:
+        print(f"⚠️ Veritabanı kayıt hatası: {db_error}")
+        # Veritabanı hatası olsa bile test sonuçlarını döndür
+
+async def execute_real_visibility_test(website: str, custom_prompts: list, progress=None,
+                                       workspace_id: Optional[str] = None) -> Dict[str, Any]:
     """Gerçek Gemini AI ile visibility test"""
+    print("🚀 Gerçek AI visibility test başlatılıyor...")
+    print(f"🔍 Gelen veriler: website={website}, custom_prompts={custom_prompts}")
+    
+    from simple_ai_tester import SimpleAITester
+    tester = SimpleAITester(workspace_id=workspace_id)
+    
+    async def on_prompt_result(done: int, total: int, test_result: dict):
+        if progress:
+            await progress(done / total * 100, f"{done}/{total} prompt test edildi", test_result)
+    
+    results = await tester.test_website_visibility(website, custom_prompts, progress_callback=on_prompt_result)
+    save_real_visibility_results(website, custom_prompts, results, workspace_id)
+    
+    return {
+        "status": "success",
+        "message": f"Test tamamlandı! {results['summary']['mentioned_count']}/{results['summary']['successful_tests']} test'te bahsedildi.",
+        "data": results
+    }
+
+def competitive_websites(request_data: dict) -> List[str]:
+    """Rekabet testindeki siteler - tek site verilirse kayıtlı rakipleri eklenir"""
+    websites = list(dict.fromkeys(
+        website.strip() for website in request_data.get('websites', []) if website and website.strip()
+    ))
+    if len(websites) == 1:
+        websites += [competitor for competitor in brand_registry.get(websites[0]).competitors
+                     if competitor not in websites]
+    if len(websites) < 2:
+        raise HTTPException(status_code=400, detail="En az iki website (veya rakipleri kayıtlı bir marka) gereklidir")
+    return websites
+
+def competitive_prompts(request_data: dict) -> List[str]:
+    """Rekabet testi promptları - verilmezse sitelerin ortak kategorisinden (category) genel promptlar üretilir"""
+    prompts = [prompt for prompt in request_data.get('prompts', []) if prompt and prompt.strip()]
+    if prompts:
+        return prompts
+    category = (request_data.get('category') or '').strip()
+    if not category:
+        raise HTTPException(status_code=400, detail="Rekabet testi için prompts veya sitelerin kategorisi (category) gereklidir")
+    from simple_ai_tester import build_generic_prompts
+    return build_generic_prompts(category)
+
+async def execute_competitive_visibility_test(websites: List[str], custom_prompts: list, progress=None,
+                                              workspace_id: Optional[str] = None) -> Dict[str, Any]:
+    """Rekabet testi: promptlar bir kez sorulur, her site ayrı visibility testi olarak kaydedilir"""
+    print(f"🏁 Rekabet testi başlatılıyor: {websites}")
+    
+    from simple_ai_tester import SimpleAITester
+    tester = SimpleAITester(workspace_id=workspace_id)
+    
+    async def on_prompt_result(done: int, total: int, prompt_results: dict):
+        if progress:
+            await progress(done / total * 100, f"{done}/{total} prompt test edildi", prompt_results)
+    
+    results = await tester.test_competitive_visibility(websites, custom_prompts, progress_callback=on_prompt_result)
+    share_of_voice = {row['website']: row['share_of_voice'] for row in results['share_of_voice']}
+    for website in websites:
+        summary = dict(results['summaries'][website], share_of_voice=share_of_voice[website],
+                       competitors=[other for other in websites if other != website])
+        await asyncio.to_thread(save_real_visibility_results, website, custom_prompts, {
+            'website': website,
+            'test_results': results['results'][website],
+            'summary': summary,
+            'completion_time': results['completion_time']
+        }, workspace_id)
+    
+    leader = results['share_of_voice'][0]
+    return {
+        "status": "success",
+        "message": f"Rekabet testi tamamlandı! {len(results['prompts'])} prompt, {len(websites)} site; "
+                   f"en görünür: {leader['website']} (%{leader['share_of_voice']})",
+        "data": results
+    }
+
+@app.post("/run-competitive-visibility-test")
+async def run_competitive_visibility_test(request_data: dict):
+    """Rekabet testini kuyruğa al (wait=true ise istek içinde çalıştır)"""
     try:
-        print("🚀 Gerçek AI visibility test başlatılıyor...")
+        websites = competitive_websites(request_data)
+        custom_prompts = competitive_prompts(request_data)
+        workspace_id = request_data.get('workspace_id')
+        if request_data.get('wait'):
+            return await execute_competitive_visibility_test(websites, custom_prompts, workspace_id=workspace_id)
+        return enqueue_job_response('competitive_visibility_test', {
+            'websites': websites, 'prompts': custom_prompts, 'workspace_id': workspace_id
+        })
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/run-real-visibility-test")
+async def run_real_visibility_test(request_data: dict):
+    """Gerçek Gemini AI visibility testini kuyruğa al (wait=true ise istek içinde çalıştır)"""
+    try:
         website = request_data.get('website', '').strip()
         custom_prompts = request_data.get('prompts', [])
         
-        print(f"🔍 Gelen veriler: website={website}, custom_prompts={custom_prompts}")
-        
         if not website:
             raise HTTPException(status_code=400, detail="Website URL gereklidir")
         
-        from simple_ai_tester import SimpleAITester
-        tester = SimpleAITester()
-        
-        results = await tester.test_website_visibility(website, custom_prompts)
-        
-        # Test sonuçlarını veritabanına kaydet
-        try:
-            # Tüm kullanılan promptları topla (custom + AI generated)
-            all_prompts = []
-            if custom_prompts:
-                all_prompts.extend(custom_prompts)
-                print(f"📝 Custom promptlar eklendi: {custom_prompts}")
-            
-            # AI tarafından oluşturulan promptları da ekle
-            if results.get('test_results'):
-                for test_result in results['test_results']:
-                    if 'prompt' in test_result and test_result['prompt'] not in all_prompts:
-                        all_prompts.append(test_result['prompt'])
-                        print(f"🤖 AI prompt eklendi: {test_result['prompt'][:50]}...")
-            
-            print(f"💾 Kaydedilecek tüm promptlar: {all_prompts}")
-            
-            # llm_visibility_daily tablosuna uygun veri yapısı
-            test_data = {
-                "brand": website,  # website -> brand olarak kaydet
-                "date": datetime.now().date().isoformat(),  # sadece tarih
-                "visibility_score": float(results.get('summary', {}).get('average_visibility_score', 0)),
-                "average_rank": float(results.get('summary', {}).get('average_rank', 0)),
-                "sentiment_score": float(results.get('summary', {}).get('sentiment_score', 0)),
-                "total_mentions": int(results.get('summary', {}).get('mentioned_count', 0)),
-                "prompts_used": json.dumps(all_prompts),  # Tüm promptları kaydet
-                "created_at": datetime.now().isoformat()
-            }
-            
-            if USE_SUPABASE and supabase_client:
-                # Supabase'e llm_visibility_daily tablosuna kaydet
-                response = supabase_client.table('llm_visibility_daily').insert(test_data).execute()
-                print(f"✅ Test sonuçları Supabase llm_visibility_daily tablosuna kaydedildi: {response}")
-            else:
-                # SQLite'a kaydet (fallback)
-                conn = sqlite3.connect('ai_visibility.db')
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO visibility_tests (website, prompts, results_summary, visibility_score, mentioned_count, total_tests, test_date)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    website,
-                    json.dumps(custom_prompts) if custom_prompts else "",
-                    json.dumps(results.get('summary', {})),
-                    results.get('summary', {}).get('average_visibility_score', 0),
-                    results.get('summary', {}).get('mentioned_count', 0),
-                    results.get('summary', {}).get('successful_tests', 0),
-                    datetime.now().isoformat()
-                ))
-                conn.commit()
-                conn.close()
-                print(f"✅ Test sonuçları SQLite'a kaydedildi")
-                
-        except Exception as db_error:
-            print(f"⚠️ Veritabanı kayıt hatası: {db_error}")
-            # Veritabanı hatası olsa bile test sonuçlarını döndür
-        
-        return {
-            "status": "success",
-            "message": f"Test tamamlandı! {results['summary']['mentioned_count']}/{results['summary']['successful_tests']} test'te bahsedildi.",
-            "data": results
-        }
+        workspace_id = request_data.get('workspace_id')
+        if request_data.get('wait'):
+            return await execute_real_visibility_test(website, custom_prompts, workspace_id=workspace_id)
+        return enqueue_job_response('real_visibility_test', {
+            'website': website, 'prompts': custom_prompts, 'workspace_id': workspace_id
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Server-Sent Events formatında tek olay"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@app.get("/run-real-visibility-test/stream")
+async def stream_real_visibility_test(website: str, prompt: List[str] = Query(default=[]),
+                                      workspace_id: Optional[str] = None):
+    """Visibility testini çalıştır ve her prompt bittiğinde SSE olayı gönder
+
+    Olaylar: start -> result (prompt başına, güncel özetle) -> done (kayıt sonrası tam sonuç) / error
+    """
+    website = website.strip()
+    if not website:
+        raise HTTPException(status_code=400, detail="Website URL gereklidir")
+    custom_prompts = [p for p in prompt if p.strip()]
+
+    from simple_ai_tester import SimpleAITester
+    tester = SimpleAITester(lane=LANE_INTERACTIVE, workspace_id=workspace_id)
+
+    async def event_stream():
+        prompts = custom_prompts or tester.build_default_prompts(website)
+        yield sse_event('start', {'website': website, 'total': len(prompts)})
+
+        results = []
+        summary = tester.calculate_summary(results)
+        try:
+            async for event in tester.iter_website_visibility(website, prompts):
+                result = event['result']
+                results.append(result)
+                summary = event['summary']
+                yield sse_event('result', {
+                    'index': event['index'],
+                    'total': event['total'],
+                    'prompt': result.get('prompt'),
+                    'visibility_score': result.get('visibility_score', 0),
+                    'ranking': result.get('ranking'),
+                    'sentiment': result.get('sentiment'),
+                    'mentioned': result.get('mentioned', False),
+                    'latency_ms': result.get('latency_ms'),
+                    'error': result.get('error'),
+                    'summary': summary
+                })
+        except Exception as e:
+            print(f"❌ Stream hatası: {e}")
+            yield sse_event('error', {'message': str(e), 'completed': len(results)})
+            return
+
+        data = {
+            'website': website,
+            'test_results': results,
+            'summary': summary,
+            'completion_time': datetime.now().isoformat()
+        }
+        await asyncio.to_thread(save_real_visibility_results, website, custom_prompts, data, workspace_id)
+        yield sse_event('done', {
+            'status': 'success',
+            'message': f"Test tamamlandı! {summary['mentioned_count']}/{summary['successful_tests']} test'te bahsedildi.",
+            'data': data
+        })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/llm-gateway/stats")
+async def get_llm_gateway_stats():
+    """Bu API process'indeki Gemini şeritleri: kuyruk derinliği, çalışan çağrı, bekleme süreleri"""
+    return {"status": "success", "data": llm_gateway.stats()}
+
+
+@app.get("/brand-profiles")
+async def list_brand_profiles():
+    """Kayıtlı marka profilleri (firma adları, yazım varyasyonları, rakipler)"""
+    return {"status": "success", "data": await asyncio.to_thread(brand_registry.list_profiles)}
+
+
+@app.post("/brand-profiles")
+async def upsert_brand_profile(request_data: dict):
+    """Marka ekle/güncelle - kod değişikliği gerekmeden tüm scorer'lar yeni adları kullanır"""
+    domain = (request_data.get('domain') or '').strip()
+    company_names = [name.strip() for name in request_data.get('company_names', []) if name and name.strip()]
+    if not domain or not company_names:
+        raise HTTPException(status_code=400, detail="domain ve en az bir company_names gereklidir")
+    profile = await asyncio.to_thread(
+        brand_registry.upsert, domain, company_names,
+        request_data.get('variants', []), request_data.get('competitors', [])
+    )
+    return {"status": "success", "data": profile.to_dict()}
+
+
+@app.delete("/brand-profiles/{domain}")
+async def delete_brand_profile(domain: str):
+    if not await asyncio.to_thread(brand_registry.delete, domain):
+        raise HTTPException(status_code=404, detail="Marka profili bulunamadı")
+    return {"status": "success", "message": "Marka profili silindi"}
+
+
+@app.post("/rescore")
+async def rescore_responses(request_data: dict):
+    """Saklanan yanıtları yeniden puanlamayı kuyruğa al (wait=true ise istek içinde çalıştır)"""
+    if rescore_store is None:
+        raise HTTPException(status_code=503, detail=RESCORE_UNAVAILABLE)
+    table = request_data.get('table', 'visibility_test_results')
+    if table not in RESCORE_TABLES:
+        raise HTTPException(status_code=400, detail=f"Tablo şunlardan biri olmalı: {', '.join(RESCORE_TABLES)}")
+    payload = {'table': table, 'website': (request_data.get('website') or '').strip() or None}
+    if request_data.get('wait'):
+        return await execute_rescore(payload)
+    return enqueue_job_response('rescore', payload)
+
+
+@app.get("/tenants/usage")
+async def get_tenant_usage(days: int = 7, tenant: str = None):
+    """Tenant başına LLM çağrısı/süresi, fetch ve iş kullanımı (tüm process'ler, son 'days' gün)"""
+    await asyncio.to_thread(usage_ledger.flush)
+    usage = await asyncio.to_thread(usage_ledger.store.summary, max(days, 1), tenant)
+    return {
+        "status": "success",
+        "data": {
+            "days": max(days, 1),
+            "tenants": usage,
+            "running_llm_calls": llm_gateway.stats()['running_by_tenant']
+        }
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """İş durumu: ilerleme, ara sonuçlar, süreler ve (bittiyse) sonuç"""
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="İş bulunamadı")
+    return {"status": "success", "data": job}
+
+
+@app.get("/jobs")
+async def list_jobs(status: str = None, limit: int = 20):
+    """Son işleri listele (opsiyonel durum filtresi)"""
+    jobs = await asyncio.to_thread(job_queue.list_jobs, limit, status)
+    for job in jobs:
+        # Liste görünümünde büyük alanları gönderme
+        job.pop('result', None)
+        job.pop('partial_results', None)
+    return {"status": "success", "data": jobs}
+
+
+# job_worker.py bu tabloyu kullanır: job_type -> handler(payload, progress)
+async def execute_rescore(payload: Dict, progress=None) -> Dict[str, Any]:
+    """Saklanan yanıtları güncel marka profilleri ve skor kurallarıyla yeniden puanla (LLM çağrısı yok)"""
+    if rescore_store is None:
+        raise RuntimeError(RESCORE_UNAVAILABLE)
+    loop = asyncio.get_running_loop()
+    
+    def on_batch(state: Dict):
+        if progress:
+            asyncio.run_coroutine_threadsafe(progress(
+                state['scanned'] / max(state['total'], 1) * 100,
+                f"{state['scanned']}/{state['total']} satır tarandı, {state['updated']} güncellendi "
+                f"({state['rows_per_second']} satır/sn)"
+            ), loop)
+    
+    result = await asyncio.to_thread(
+        rescore_table, rescore_store, payload.get('table', 'visibility_test_results'), payload.get('website'),
+        rescorer=BulkRescorer(brand_registry), on_batch=on_batch
+    )
+    print(f"✅ Yeniden puanlama tamamlandı: {result}")
+    return {"status": "success", "message": "Yeniden puanlama tamamlandı", "data": result}
+
+JOB_HANDLERS = {
+    'llm_mention_analysis': lambda payload, progress: execute_llm_mention_analysis(
+        progress, payload.get('brands'), payload.get('models')
+    ),
+    'pair_reanalysis': execute_pair_reanalysis,
+    'visibility_test': lambda payload, progress: execute_visibility_test(
+        payload['website'], payload.get('prompts', []), progress
+    ),
+    'real_visibility_test': lambda payload, progress: execute_real_visibility_test(
+        payload['website'], payload.get('prompts', []), progress, payload.get('workspace_id')
+    ),
+    'competitive_visibility_test': lambda payload, progress: execute_competitive_visibility_test(
+        payload['websites'], payload.get('prompts', []), progress, payload.get('workspace_id')
+    ),
+    'rescore': execute_rescore,
+}
+
+# Zamanlanmış çalışmalar - vadesi gelen schedule'lar job_queue'ya aktarılır
+schedule_store = create_schedule_store('ai_visibility.db', use_postgres=USE_SUPABASE)
+schedule_frontier = create_frontier('ai_visibility.db', use_postgres=USE_SUPABASE)
+
+def canonical_website(website: str) -> str:
+    website = website.strip()
+    if '://' not in website:
+        website = f"https://{website}"
+    return canonicalize_url(website)
+
+def website_test_inputs(payload: Dict) -> str:
+    """Visibility testi girdileri: website, promptlar ve sitenin son taranan içeriği"""
+    website = canonical_website(payload['website'])
+    page_hash = schedule_frontier.last_content_hash(website) if schedule_frontier else None
+    return content_hash(json.dumps(
+        {'website': website, 'prompts': payload.get('prompts') or [], 'page': page_hash}, sort_keys=True
+    ))
+
+def competitive_test_inputs(payload: Dict) -> str:
+    """Rekabet testi girdileri: siteler, promptlar ve sitelerin son taranan içerikleri"""
+    websites = [canonical_website(website) for website in payload['websites']]
+    pages = [schedule_frontier.last_content_hash(website) if schedule_frontier else None for website in websites]
+    return content_hash(json.dumps(
+        {'websites': websites, 'prompts': payload.get('prompts') or [], 'pages': pages}, sort_keys=True
+    ))
+
+def mention_analysis_inputs(payload: Dict) -> Optional[str]:
+    """Vadesi gelen URL yoksa zamanlanmış analize gerek yok (None)"""
+    if not schedule_frontier:
+        # Frontier yoksa hangi URL'lerin değiştiği bilinemez - her turda çalışır
+        return datetime.now().isoformat()
+    schedule_frontier.sync()
+    due = schedule_frontier.due(FRONTIER_BATCH_SIZE)
+    if not due:
+        return None
+    return content_hash('\n'.join(f"{row['id']}:{row['next_due_at']}" for row in due))
+
+def rescore_inputs(payload: Dict) -> str:
+    """Yeni satırlar kaydedilirken puanlanır - yeniden puanlama sadece marka profilleri değişince gerekir"""
+    return content_hash(json.dumps(
+        {'payload': payload, 'profiles': brand_registry.list_profiles()}, sort_keys=True, default=str
+    ))
+
+# LLM yanıtı aynı girdide de değişir - bu testlerin amacı modeldeki kaymayı izlemek,
+# bu yüzden varsayılan olarak girdiler aynı diye tur atlanmaz (skip_unchanged=false)
+ANSWER_TRACKING_JOB_TYPES = ('visibility_test', 'real_visibility_test', 'competitive_visibility_test')
+
+SCHEDULE_INPUTS = {
+    'llm_mention_analysis': mention_analysis_inputs,
+    'visibility_test': website_test_inputs,
+    'real_visibility_test': website_test_inputs,
+    'competitive_visibility_test': competitive_test_inputs,
+    'rescore': rescore_inputs,
+}
+
+job_scheduler = JobScheduler(schedule_store, job_queue, SCHEDULE_INPUTS)
+
+@app.on_event("startup")
+async def start_job_scheduler():
+    if SCHEDULER_ENABLED:
+        job_scheduler.start()
+
+@app.on_event("startup")
+async def start_usage_flusher():
+    asyncio.get_running_loop().create_task(usage_ledger.run())
+
+
+def build_schedule_payload(job_type: str, request_data: dict) -> Dict[str, Any]:
+    """İş türüne göre payload ve çakışma kontrolü için hedef"""
+    if job_type == 'llm_mention_analysis':
+        return {'payload': analysis_matrix(request_data), 'target': 'all_urls'}
+    if job_type == 'pair_reanalysis':
+        if pair_store is None:
+            raise HTTPException(status_code=503, detail=PAIR_STORE_UNAVAILABLE)
+        return {'payload': {**analysis_matrix(request_data), 'url_ids': request_data.get('url_ids') or None},
+                'target': 'pair_reanalysis'}
+    if job_type == 'rescore':
+        if rescore_store is None:
+            raise HTTPException(status_code=503, detail=RESCORE_UNAVAILABLE)
+        table = request_data.get('table', 'visibility_test_results')
+        if table not in RESCORE_TABLES:
+            raise HTTPException(status_code=400, detail=f"Tablo şunlardan biri olmalı: {', '.join(RESCORE_TABLES)}")
+        website = (request_data.get('website') or '').strip() or None
+        return {'payload': {'table': table, 'website': website}, 'target': f"rescore:{table}:{website or '*'}"}
+    if job_type == 'competitive_visibility_test':
+        websites = competitive_websites(request_data)
+        return {
+            'payload': {'websites': websites, 'prompts': competitive_prompts(request_data),
+                        'workspace_id': request_data.get('workspace_id')},
+            'target': 'competitive:' + ','.join(sorted(canonical_website(website) for website in websites))
+        }
+    website = (request_data.get('website') or '').strip()
+    if not website:
+        raise HTTPException(status_code=400, detail="Website URL gereklidir")
+    return {
+        'payload': {'website': website, 'prompts': request_data.get('prompts', []),
+                    'workspace_id': request_data.get('workspace_id')},
+        'target': canonical_website(website)
+    }
+
+@app.post("/schedules")
+async def create_schedule(request_data: dict):
+    """Tekrarlayan test/analiz tanımla - schedule: 'every 6h', '30m' veya cron '0 */6 * * *'"""
+    job_type = request_data.get('job_type', 'real_visibility_test')
+    spec = (request_data.get('schedule') or '').strip()
+    if job_type not in JOB_HANDLERS:
+        raise HTTPException(status_code=400, detail=f"Bilinmeyen iş türü: {job_type}")
+    try:
+        parse_schedule(spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Geçersiz zamanlama: {str(e)}")
+    
+    built = build_schedule_payload(job_type, request_data)
+    skip_unchanged = request_data.get('skip_unchanged', job_type not in ANSWER_TRACKING_JOB_TYPES)
+    schedule = await asyncio.to_thread(
+        schedule_store.create, request_data.get('name') or f"{job_type} - {built['target']}",
+        job_type, built['target'], built['payload'], spec,
+        bool(request_data.get('enabled', True)), bool(skip_unchanged)
+    )
+    return {"status": "success", "data": schedule}
+
+@app.get("/schedules")
+async def list_schedules():
+    schedules = await asyncio.to_thread(schedule_store.list_schedules)
+    return {"status": "success", "data": schedules}
+
+@app.get("/schedules/{schedule_id}")
+async def get_schedule(schedule_id: int):
+    schedule = await asyncio.to_thread(schedule_store.get, schedule_id)
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule bulunamadı")
+    return {"status": "success", "data": schedule}
+
+@app.put("/schedules/{schedule_id}")
+async def update_schedule(schedule_id: int, request_data: dict):
+    """name, schedule, prompts, enabled, skip_unchanged güncellenebilir"""
+    schedule = await asyncio.to_thread(schedule_store.get, schedule_id)
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule bulunamadı")
+    
+    fields = {key: request_data[key] for key in ('name', 'schedule', 'enabled', 'skip_unchanged') if key in request_data}
+    if 'schedule' in fields:
+        try:
+            parse_schedule(fields['schedule'])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Geçersiz zamanlama: {str(e)}")
+    if 'prompts' in request_data and 'website' in schedule['payload']:
+        fields['payload'] = {**schedule['payload'], 'prompts': request_data['prompts']}
+    
+    schedule = await asyncio.to_thread(schedule_store.update, schedule_id, fields)
+    return {"status": "success", "data": schedule}
+
+@app.delete("/schedules/{schedule_id}")
+async def delete_schedule(schedule_id: int):
+    if not await asyncio.to_thread(schedule_store.delete, schedule_id):
+        raise HTTPException(status_code=404, detail="Schedule bulunamadı")
+    return {"status": "success", "message": "Schedule silindi"}
+
+@app.post("/schedules/{schedule_id}/run")
+async def run_schedule_now(schedule_id: int):
+    """Vadeyi şimdiye çek - sonraki turda çakışma ve kapasite kurallarıyla çalışır"""
+    schedule = await asyncio.to_thread(schedule_store.update, schedule_id, {'next_run_at': time.time()})
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule bulunamadı")
+    return {"status": "success", "data": schedule}
+
+
 @app.post("/run-quick-ai-test")
 async def run_quick_ai_test(request_data: dict):
     """Tek prompt için hızlı Gemini test"""
@@ -1717,7 +2709,7 @@ async def run_quick_ai_test(request_data: dict):
             raise HTTPException(status_code=400, detail="Website URL ve prompt gereklidir")
         
         from simple_ai_tester import SimpleAITester
-        tester = SimpleAITester()
+        tester = SimpleAITester(lane=LANE_INTERACTIVE, workspace_id=request_data.get('workspace_id'))
         
         # Tek prompt test et
         results = await tester.test_website_visibility(website, [prompt])
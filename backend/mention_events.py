@@ -0,0 +1,188 @@
+# backend/mention_events.py
+import os
+import json
+import asyncio
+import sqlite3
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ⚙️ Canlı bildirim ayarları (.env üzerinden değiştirilebilir)
+MENTION_EVENTS_POLL_SECONDS = float(os.getenv("MENTION_EVENTS_POLL_SECONDS", "1"))
+MENTION_EVENTS_BATCH = int(os.getenv("MENTION_EVENTS_BATCH", "500"))
+MENTION_EVENTS_CLIENT_QUEUE = int(os.getenv("MENTION_EVENTS_CLIENT_QUEUE", "256"))  # Yavaş istemci için tampon
+
+# Bildirimlerde taşınan mention alanları - response gibi büyük metinler gönderilmez
+COMPACT_MENTION_FIELDS = ('id', 'brand', 'model', 'mentioned', 'score', 'summary', 'source_url', 'created_at')
+
+SQLITE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS mention_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_type TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def compact_mention(row: Dict) -> Dict:
+    """Mention satırının dashboard için yeterli küçük hali"""
+    return {field: row.get(field) for field in COMPACT_MENTION_FIELDS}
+
+
+def mention_created(row: Dict) -> Tuple[str, Dict]:
+    return 'mention_created', compact_mention(row)
+
+
+def mentions_deleted(source_url: str) -> Tuple[str, Dict]:
+    return 'mentions_deleted', {'source_url': source_url}
+
+
+def history_changed(history_id: int, status: str, **fields) -> Tuple[str, Dict]:
+    return 'analysis_history_changed', {'id': history_id, 'status': status, **fields}
+
+
+def _encode(payload: Dict) -> str:
+    return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def ensure_sqlite_schema(conn: sqlite3.Connection):
+    conn.execute(SQLITE_SCHEMA)
+
+
+def append_events_sqlite(conn: sqlite3.Connection, events: List[Tuple[str, Dict]]):
+    """Olayları yazan transaction içinde outbox'a ekle (commit çağıranda)"""
+    if events:
+        conn.executemany(
+            'INSERT INTO mention_events (event_type, payload) VALUES (?, ?)',
+            [(event_type, _encode(payload)) for event_type, payload in events]
+        )
+
+
+def append_events_supabase(client, events: List[Tuple[str, Dict]]):
+    """Supabase'de aynı transaction yok - bildirim yazılamazsa asıl kayıt etkilenmez"""
+    if not events or client is None:
+        return
+    try:
+        client.table('mention_events').insert([
+            {'event_type': event_type, 'payload': json.loads(_encode(payload))}
+            for event_type, payload in events
+        ]).execute()
+    except Exception as e:
+        logger.error(f"mention_events yazılamadı: {str(e)}")
+
+
+class SQLiteMentionEventLog:
+    """mention_events tablosunu id sırasıyla okur"""
+
+    def __init__(self, db_path: str = 'ai_visibility.db'):
+        self.db_path = db_path
+        conn = sqlite3.connect(self.db_path)
+        try:
+            ensure_sqlite_schema(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def read_since(self, last_id: int, limit: int = MENTION_EVENTS_BATCH) -> List[Dict]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            rows = conn.execute('''
+                SELECT id, event_type, payload, created_at FROM mention_events
+                WHERE id > ? ORDER BY id LIMIT ?
+            ''', (last_id, limit)).fetchall()
+        finally:
+            conn.close()
+        return [
+            {'id': row[0], 'event_type': row[1], 'payload': json.loads(row[2]), 'created_at': row[3]}
+            for row in rows
+        ]
+
+    def latest_id(self) -> int:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            return conn.execute('SELECT COALESCE(MAX(id), 0) FROM mention_events').fetchone()[0]
+        finally:
+            conn.close()
+
+
+class SupabaseMentionEventLog:
+    """Supabase üzerindeki mention_events tablosu (payload JSONB)"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def read_since(self, last_id: int, limit: int = MENTION_EVENTS_BATCH) -> List[Dict]:
+        response = self.client.table('mention_events').select('*') \
+            .gt('id', last_id).order('id').limit(limit).execute()
+        return response.data or []
+
+    def latest_id(self) -> int:
+        response = self.client.table('mention_events').select('id') \
+            .order('id', desc=True).limit(1).execute()
+        return response.data[0]['id'] if response.data else 0
+
+
+class MentionEventHub:
+    """Outbox'ı tek bir poller ile takip edip açık bağlantılara dağıtır
+
+    Veritabanı okuma yükü bağlı dashboard sayısından bağımsızdır: kaç istemci olursa
+    olsun her turda tek 'id > son_id' sorgusu yapılır.
+    """
+
+    def __init__(self, event_log, poll_interval: float = MENTION_EVENTS_POLL_SECONDS):
+        self.event_log = event_log
+        self.poll_interval = poll_interval
+        self.last_id = 0
+        self._subscribers = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def subscribe(self) -> asyncio.Queue:
+        """Yeni abone - bu çağrıdan sonra yazılan tüm olaylar kuyruğa düşer"""
+        queue = asyncio.Queue(maxsize=MENTION_EVENTS_CLIENT_QUEUE)
+        if self._task is None or self._task.done():
+            latest_id = await asyncio.to_thread(self.event_log.latest_id)
+            # Beklerken başka abone poller'ı başlatmış olabilir
+            if self._task is None or self._task.done():
+                self.last_id = latest_id
+                self._task = asyncio.get_running_loop().create_task(self.run())
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def replay(self, last_event_id: int) -> List[Dict]:
+        """Yeniden bağlanan istemcinin kaçırdığı olaylardan bir sayfa (en fazla MENTION_EVENTS_BATCH)"""
+        return self.event_log.read_since(last_event_id)
+
+    def _publish(self, event: Dict):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # İstemci yetişemiyor - tamponu boşalt, /get-mentions?since_id ile yeniden çekmesini iste
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({'id': event['id'], 'event_type': 'resync', 'payload': {}})
+
+    async def run(self):
+        """Abone varken outbox'ı takip et, abone kalmayınca dur"""
+        logger.info(f"Mention bildirimleri başladı (son id={self.last_id})")
+        while self._subscribers:
+            try:
+                events = await asyncio.to_thread(self.event_log.read_since, self.last_id)
+            except Exception as e:
+                logger.error(f"mention_events okunamadı: {str(e)}")
+                events = []
+            for event in events:
+                self._publish(event)
+                self.last_id = event['id']
+            if len(events) < MENTION_EVENTS_BATCH:
+                await asyncio.sleep(self.poll_interval)
+        logger.info("Mention bildirimleri durdu (abone yok)")
@@ -0,0 +1,172 @@
+# backend/mention_spans.py
+import os
+import sqlite3
+import logging
+from typing import Dict, List
+
+from response_analyzer import merge_windows
+
+logger = logging.getLogger(__name__)
+
+# ⚙️ Geçiş konumu ayarları (.env üzerinden değiştirilebilir)
+SNIPPET_WINDOW = int(os.getenv("SNIPPET_WINDOW", "80"))  # Geçişin iki yanında gösterilen karakter
+
+# Geçişleri saklanan tablolar - konumlar bu tabloların response kolonundaki metne göredir
+SPAN_SOURCES = ('llm_mentions', 'visibility_test_results')
+
+SQLITE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS mention_spans (
+        source TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        start_offset INTEGER NOT NULL,
+        end_offset INTEGER NOT NULL,
+        alias TEXT,
+        match_type TEXT,
+        score REAL
+    )
+'''
+SQLITE_INDEX = 'CREATE INDEX IF NOT EXISTS idx_mention_spans_row ON mention_spans(source, row_id)'
+
+
+def make_span(start: int, end: int, alias: str, match_type: str, score: float = 100) -> Dict:
+    return {'start': start, 'end': end, 'alias': alias, 'match_type': match_type, 'score': score}
+
+
+def window_spans(hits, brand: str, model: str, offset: int, length: int) -> List[Dict]:
+    """Taranmış sayfadaki geçişlerden saklanan parçaya ([offset, offset + length)) düşenler, parçaya göre"""
+    spans = [
+        make_span(start - offset, end - offset, name, kind)
+        for kind, name in (('brand', brand), ('model', model))
+        for start, end in hits.spans(kind, name) if offset <= start and end <= offset + length
+    ]
+    return sorted(spans, key=lambda span: span['start'])
+
+
+def context_spans(local: Dict, brand: str, model: str, start: int, end: int, offset: int) -> List[Dict]:
+    """local_mention_analysis geçişlerinden [start, end) bağlamına düşenler, bağlamın yazıldığı konuma (offset) göre"""
+    spans = [
+        make_span(span_start - start + offset, span_end - start + offset, name, kind)
+        for kind, name in (('brand', brand), ('model', model))
+        for span_start, span_end in local[f'{kind}_spans'] if start <= span_start and span_end <= end
+    ]
+    return sorted(spans, key=lambda span: span['start'])
+
+
+def shift_spans(spans: List[Dict], offset: int) -> List[Dict]:
+    return [{**span, 'start': span['start'] + offset, 'end': span['end'] + offset} for span in spans]
+
+
+def analysis_spans(analysis: Dict) -> List[Dict]:
+    """ResponseAnalyzer sonucundaki ad geçişleri ve bulanık eşleşmeler (katlanmış metin orijinalle aynı uzunlukta)
+
+    Ad geçişiyle aynı aralıktaki bulanık eşleşmeler tekrar yazılmaz.
+    """
+    spans = [make_span(start, end, alias, 'alias') for start, end, alias in analysis.get('mention_spans', [])]
+    exact = {(span['start'], span['end']) for span in spans}
+    for match in analysis.get('fuzzy_matches', []):
+        if (match['start'], match['end']) not in exact:
+            exact.add((match['start'], match['end']))
+            spans.append(make_span(match['start'], match['end'], match['name'], match['kind'], match['score']))
+    return sorted(spans, key=lambda span: span['start'])
+
+
+def snippets(text: str, spans: List[Dict], window: int = SNIPPET_WINDOW) -> List[Dict]:
+    """Geçişlerin çevresindeki metin parçaları - sadece konumdan kesilir, eşleşme tekrar aranmaz
+
+    Çakışan pencereler birleşir; highlights parçaya göre göreli konumlardır.
+    """
+    text = text or ''
+    windows = merge_windows([(span['start'], span['end'], span['alias']) for span in spans], window, len(text))
+    return [
+        {
+            'start': start,
+            'end': end,
+            'text': text[start:end],
+            'highlights': [
+                {**span, 'start': span['start'] - start, 'end': span['end'] - start}
+                for span in spans if start <= span['start'] and span['end'] <= end
+            ]
+        }
+        for start, end in windows
+    ]
+
+
+def _rows(source: str, spans_by_row: Dict[int, List[Dict]]) -> List[tuple]:
+    return [
+        (source, row_id, span['start'], span['end'], span['alias'], span['match_type'], span.get('score'))
+        for row_id, spans in spans_by_row.items() for span in spans
+    ]
+
+
+def ensure_sqlite_schema(conn: sqlite3.Connection):
+    conn.execute(SQLITE_SCHEMA)
+    conn.execute(SQLITE_INDEX)
+
+
+def append_spans_sqlite(conn: sqlite3.Connection, source: str, spans_by_row: Dict[int, List[Dict]]):
+    """Geçişleri satırları yazan transaction içinde ekle (commit çağıranda)"""
+    rows = _rows(source, spans_by_row)
+    if rows:
+        conn.executemany('''
+            INSERT INTO mention_spans (source, row_id, start_offset, end_offset, alias, match_type, score)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+
+
+def append_spans_supabase(client, source: str, spans_by_row: Dict[int, List[Dict]]):
+    """Supabase'de aynı transaction yok - geçişler yazılamazsa asıl kayıt etkilenmez"""
+    rows = _rows(source, spans_by_row)
+    if not rows or client is None:
+        return
+    columns = ('source', 'row_id', 'start_offset', 'end_offset', 'alias', 'match_type', 'score')
+    try:
+        client.table('mention_spans').insert([dict(zip(columns, row)) for row in rows]).execute()
+    except Exception as e:
+        logger.error(f"mention_spans yazılamadı: {str(e)}")
+
+
+def delete_spans_supabase(client, source: str, row_ids: List[int]):
+    """Silinen satırların geçişleri"""
+    if row_ids and client is not None:
+        client.table('mention_spans').delete().eq('source', source).in_('row_id', row_ids).execute()
+
+
+def _span(row: Dict) -> Dict:
+    return make_span(row['start_offset'], row['end_offset'], row['alias'], row['match_type'], row['score'])
+
+
+class SQLiteSpanIndex:
+    """mention_spans tablosundan satır başına geçişler"""
+
+    def __init__(self, db_path: str = 'ai_visibility.db'):
+        self.db_path = db_path
+        conn = sqlite3.connect(self.db_path)
+        try:
+            ensure_sqlite_schema(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, source: str, row_id: int) -> List[Dict]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute('''
+                SELECT start_offset, end_offset, alias, match_type, score FROM mention_spans
+                WHERE source = ? AND row_id = ? ORDER BY start_offset
+            ''', (source, row_id)).fetchall()
+        finally:
+            conn.close()
+        return [_span(dict(row)) for row in rows]
+
+
+class SupabaseSpanIndex:
+    """Supabase üzerindeki mention_spans tablosu"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, source: str, row_id: int) -> List[Dict]:
+        response = self.client.table('mention_spans').select('*') \
+            .eq('source', source).eq('row_id', row_id).order('start_offset').execute()
+        return [_span(row) for row in response.data or []]
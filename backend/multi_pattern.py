@@ -0,0 +1,278 @@
+# backend/multi_pattern.py
+import re
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+# Crawler'ın bağlam duygu sözlüğü (eşleşme alt dize olarak yapılır, kelime sınırı aranmaz)
+POSITIVE_WORDS = ('best', 'great', 'excellent', 'recommended', 'good', 'useful')
+NEGATIVE_WORDS = ('bad', 'terrible', 'awful', 'poor', 'worst', 'useless')
+
+CONTEXT_WINDOW = 100  # Brand/model çevresinde duygu aranan karakter
+NEAR_DISTANCE = 100  # Bu mesafeden yakın brand/model yakın bahsetme sayılır
+
+
+def lower_text(text: str) -> str:
+    """Uzunluğu koruyan lower() - 'İ'.lower() iki karakter olur, geçiş konumları kayardı"""
+    return (text or '').replace('İ', 'i').lower()
+
+
+class AhoCorasick:
+    """Çok desenli alt dize arama - metin bir kez taranır, süre desen sayısından bağımsızdır
+
+    Desenler add() ile eklenir, build() sonrası iter_matches() çakışanlar dahil tüm
+    eşleşmeleri (başlangıç, bitiş, anahtar) olarak verir - 'desen in metin' ile aynı sonuç.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[int, Hashable]]] = [[]]
+        self._delta: List[Dict[str, int]] = []
+        self._built = False
+
+    def add(self, pattern: str, key: Hashable):
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append((len(pattern), key))
+        self._built = False
+
+    def build(self) -> 'AhoCorasick':
+        """Failure link'leri BFS ile kur ve tam geçiş tablosuna (DFA) aç
+
+        Her durum, failure zincirindeki geçişleri de içerir; tarama sırasında geri dönüş
+        döngüsü olmaz, karakter başına tek sözlük okuması yapılır.
+        """
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        order = []
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+        # BFS sırasıyla: failure durumu her zaman daha sığdır, tablosu önceden hazırdır
+        self._delta = [dict(self._goto[0])] + [None] * (len(self._goto) - 1)
+        for state in order:
+            self._delta[state] = {**self._delta[self._fail[state]], **self._goto[state]}
+        self._built = True
+        return self
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Hashable]]:
+        if not self._built:
+            self.build()
+        delta, outputs = self._delta, self._outputs
+        state = 0
+        for index, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                for length, key in outputs[state]:
+                    yield index - length + 1, index + 1, key
+
+
+class PageHits:
+    """Bir sayfadaki tüm eşleşmeler - brand x model çiftleri buradan hesaplanır"""
+
+    def __init__(self, text_length: int, first: Dict[Hashable, int], starts: Dict[str, List[int]],
+                 lengths: Dict[str, int], spans: Optional[Dict[Hashable, List[Tuple[int, int]]]] = None):
+        self.text_length = text_length
+        self._first = first
+        self._spans = spans or {}  # ('brand'|'model', ad) -> tüm geçişler (başlangıç, bitiş)
+        self._starts = starts  # Duygu kelimesi -> sıralı başlangıçlar
+        self._lengths = lengths
+
+    def first(self, kind: str, name: str) -> int:
+        """str.find gibi: ilk geçiş konumu, yoksa -1"""
+        return self._first.get((kind, name), -1)
+
+    def mentioned(self, kind: str, name: str) -> bool:
+        return (kind, name) in self._first
+
+    def spans(self, kind: str, name: str) -> List[Tuple[int, int]]:
+        """Brand/model'in metin sırasıyla tüm geçişleri"""
+        return self._spans.get((kind, name), [])
+
+    def _words_in(self, words: Iterable[str], start: int, end: int) -> int:
+        """[start, end) aralığında tamamen kalan farklı kelime sayısı ('kelime in metin[start:end]')"""
+        count = 0
+        for word in words:
+            starts = self._starts.get(word)
+            if not starts:
+                continue
+            index = bisect_left(starts, start)
+            if index < len(starts) and starts[index] + self._lengths[word] <= end:
+                count += 1
+        return count
+
+    def pair(self, brand: str, model: str, context_window: int = CONTEXT_WINDOW,
+             positive_words: Iterable[str] = POSITIVE_WORDS,
+             negative_words: Iterable[str] = NEGATIVE_WORDS) -> Dict:
+        """Brand/model çifti: bahsedilme, ilk geçişler arası mesafe ve bağlamdaki duygu kelimeleri"""
+        brand_pos = self.first('brand', brand)
+        model_pos = self.first('model', model)
+        result = {
+            'brand_mentioned': brand_pos != -1,
+            'model_mentioned': model_pos != -1,
+            'distance': None,
+            'positive_count': 0,
+            'negative_count': 0
+        }
+        if brand_pos != -1 and model_pos != -1:
+            context_start = max(0, min(brand_pos, model_pos) - context_window)
+            context_end = min(self.text_length, max(brand_pos, model_pos) + context_window)
+            result['distance'] = abs(brand_pos - model_pos)
+            result['positive_count'] = self._words_in(positive_words, context_start, context_end)
+            result['negative_count'] = self._words_in(negative_words, context_start, context_end)
+        return result
+
+
+class MentionScanner:
+    """Brand, model ve duygu sözlüğünden derlenmiş tek otomat
+
+    Sayfa bir kez taranır; brand x model matrisi ne kadar büyük olursa olsun
+    metin üzerindeki iş sayfa uzunluğu ile doğrusaldır.
+    """
+
+    def __init__(self, brands: Iterable[str], models: Iterable[str],
+                 positive_words: Iterable[str] = POSITIVE_WORDS,
+                 negative_words: Iterable[str] = NEGATIVE_WORDS):
+        self.brands = list(brands)
+        self.models = list(models)
+        self.positive_words = [lower_text(word) for word in positive_words]
+        self.negative_words = [lower_text(word) for word in negative_words]
+        self.automaton = AhoCorasick()
+        for brand in self.brands:
+            self.automaton.add(lower_text(brand), ('brand', brand))
+        for model in self.models:
+            self.automaton.add(lower_text(model), ('model', model))
+        for word in set(self.positive_words + self.negative_words):
+            self.automaton.add(word, ('word', word))
+        self.automaton.build()
+
+    def scan(self, text: str) -> PageHits:
+        """Küçük harfe çevrilmiş metni tara (çağıran lower_text() yapar - konumlar orijinal metne denk gelir)"""
+        first: Dict[Hashable, int] = {}
+        starts: Dict[str, List[int]] = {}
+        lengths: Dict[str, int] = {}
+        spans: Dict[Hashable, List[Tuple[int, int]]] = {}
+        for start, end, key in self.automaton.iter_matches(text):
+            kind, name = key
+            if kind == 'word':
+                # Başlangıçlar metin sırasıyla gelir - liste zaten sıralı
+                starts.setdefault(name, []).append(start)
+                lengths[name] = end - start
+            else:
+                first.setdefault(key, start)
+                spans.setdefault(key, []).append((start, end))
+        return PageHits(len(text), first, starts, lengths, spans)
+
+    def pairs(self, text: str, context_window: int = CONTEXT_WINDOW) -> Iterator[Tuple[str, str, Dict]]:
+        """Tüm brand x model çiftlerinin sonuçları (brand sırası, sonra model sırası)"""
+        return self.pairs_in(self.scan(text), context_window)
+
+    def pairs_in(self, hits: PageHits, context_window: int = CONTEXT_WINDOW) -> Iterator[Tuple[str, str, Dict]]:
+        """Taranmış sayfadan çiftler - geçiş konumları da gerekiyorsa scan() bir kez çağrılır"""
+        for brand in self.brands:
+            for model in self.models:
+                yield brand, model, hits.pair(
+                    brand, model, context_window, self.positive_words, self.negative_words
+                )
+
+
+@lru_cache(maxsize=32)
+def compile_mention_scanner(brands: Tuple[str, ...], models: Tuple[str, ...]) -> MentionScanner:
+    """Aynı brand/model listesi için otomat process başına bir kez kurulur"""
+    return MentionScanner(brands, models)
+
+
+def mention_score(pair: Dict, near_distance: int = NEAR_DISTANCE) -> int:
+    """Crawler mention skoru (rastgele varyasyon hariç)"""
+    if pair['brand_mentioned'] and pair['model_mentioned']:
+        score = 80
+        if pair['distance'] is not None and pair['distance'] < near_distance:
+            score += 10
+        if pair['positive_count'] > pair['negative_count']:
+            score += 5
+        elif pair['negative_count'] > pair['positive_count']:
+            score -= 5
+        return score
+    if pair['brand_mentioned'] or pair['model_mentioned']:
+        return 45
+    return 10
+
+
+def clean_page_content(content: str, limit: int = 5000) -> str:
+    """HTML tag'lerini ve fazla boşlukları temizle, çok uzunsa kısalt"""
+    clean_content = re.sub(r'<[^>]+>', '', content or '')
+    clean_content = re.sub(r'\s+', ' ', clean_content).strip()
+    if len(clean_content) > limit:
+        clean_content = clean_content[:limit] + "..."
+    return clean_content
+
+
+def sentence_windows(text: str, spans: List[Tuple[int, int]], limit: int = 200) -> List[Tuple[int, int]]:
+    """Geçişlerin bulunduğu cümlelerin ('.' sınırları) text içindeki (başlangıç, bitiş) aralıkları
+
+    Metin bölünmez, konumdan sola/sağa bakılır; baş/son boşluk atılır, en fazla limit karakter.
+    """
+    windows, seen = [], set()
+    for start, end in spans:
+        left = text.rfind('.', 0, start) + 1
+        if left in seen:
+            continue
+        seen.add(left)
+        right = text.find('.', end)
+        right = right if right != -1 else len(text)
+        sentence = text[left:right]
+        left += len(sentence) - len(sentence.lstrip())
+        windows.append((left, min(left + len(sentence.strip()), left + limit)))
+    return windows
+
+
+def sentence_contexts(text: str, spans: List[Tuple[int, int]], limit: int = 200) -> List[str]:
+    """Geçişlerin bulunduğu cümleler"""
+    return [text[start:end] for start, end in sentence_windows(text, spans, limit)]
+
+
+def local_mention_analysis(content: str, brand: str, model: str) -> Dict:
+    """LLM'siz brand/model analizi: bahsedilme, geçişler, geçtiği cümleler ve crawler skoru (rastgelesiz)
+
+    brand_spans/model_spans ve brand_windows/model_windows (bağlam cümleleri) clean_content üzerindeki
+    (başlangıç, bitiş) konumlarıdır.
+    """
+    clean_content = clean_page_content(content)
+    hits = compile_mention_scanner((brand,), (model,)).scan(lower_text(clean_content))
+    pair = hits.pair(brand, model)
+    brand_spans, model_spans = hits.spans('brand', brand), hits.spans('model', model)
+    brand_windows, model_windows = sentence_windows(clean_content, brand_spans), sentence_windows(clean_content, model_spans)
+    return {
+        **pair,
+        'mentioned': pair['brand_mentioned'] or pair['model_mentioned'],
+        'score': mention_score(pair),
+        'clean_content': clean_content,
+        'brand_spans': brand_spans,
+        'model_spans': model_spans,
+        'brand_windows': brand_windows,
+        'model_windows': model_windows,
+        'brand_contexts': [clean_content[start:end] for start, end in brand_windows],
+        'model_contexts': [clean_content[start:end] for start, end in model_windows],
+    }
@@ -0,0 +1,263 @@
+# backend/pair_results.py
+import os
+import json
+import time
+import sqlite3
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+
+def name_list(value: Optional[str], default: List[str]) -> List[str]:
+    """Virgülle ayrılmış ad listesi - boşsa varsayılan"""
+    names = [name.strip() for name in (value or '').split(',') if name.strip()]
+    return list(dict.fromkeys(names)) or list(default)
+
+
+# ⚙️ Analiz matrisi ayarları (.env üzerinden değiştirilebilir)
+ANALYSIS_BRANDS = name_list(os.getenv("ANALYSIS_BRANDS"), ['Workexe', 'Ahrefs', 'Semrush', 'Surfer SEO'])
+ANALYSIS_MODELS = name_list(os.getenv("ANALYSIS_MODELS"), ['ChatGPT', 'Claude', 'Gemini', 'Copilot'])
+PAIR_VERSION_BATCH = int(os.getenv("PAIR_VERSION_BATCH", "50"))  # Yeniden analizde tur başına içerik sürümü
+
+# URL silinince sürümleri ve çift sonuçları da gider - yoksa yeniden analiz silinmiş URL'leri işler
+DELETE_URL_QUERIES = (
+    'DELETE FROM pair_results WHERE content_version_id IN (SELECT id FROM content_versions WHERE url_id = ?)',
+    'DELETE FROM content_versions WHERE url_id = ?',
+)
+
+
+def delete_url_sqlite(cursor, url_id: int):
+    """URL'yi silen transaction içinde sürümlerini ve çift sonuçlarını sil (commit çağıranda)"""
+    for query in DELETE_URL_QUERIES:
+        cursor.execute(query, (url_id,))
+
+
+class _BasePairStore:
+    """Sayfa içerik sürümleri ve (sürüm, marka, model, analizör sürümü) anahtarlı sonuçlar
+
+    Çıkarılmış metin sürümle birlikte saklanır; marka/model listesi değişince eksik
+    çiftler sayfa yeniden getirilmeden bu metinden hesaplanır.
+    """
+
+    placeholder = '?'
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def _sql(self, query: str) -> str:
+        return query if self.placeholder == '?' else query.replace('?', self.placeholder)
+
+    def save_version(self, url_id: int, url: str, title: str, content: str, page_hash: str) -> int:
+        """İçerik sürümünü kaydet (aynı URL + hash zaten varsa onu kullan) - sürüm id'si"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql('''
+                INSERT INTO content_versions (url_id, url, content_hash, title, content, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url_id, content_hash) DO NOTHING
+            '''), (url_id, url, page_hash, title, content, time.time()))
+            cursor.execute(self._sql(
+                'SELECT id FROM content_versions WHERE url_id = ? AND content_hash = ?'
+            ), (url_id, page_hash))
+            version_id = cursor.fetchone()[0]
+            conn.commit()
+            return version_id
+        finally:
+            conn.close()
+
+    def latest_versions(self, after_url_id: int, limit: int, url_ids: Optional[List[int]] = None) -> List[Dict]:
+        """URL başına en son sürüm (url_id sırasıyla, keyset sayfalama)"""
+        clauses, params = ['url_id > ?'], [after_url_id]
+        if url_ids:
+            clauses.append(f"url_id IN ({', '.join('?' for _ in url_ids)})")
+            params.extend(url_ids)
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(f'''
+                SELECT id, url_id, url, title, content FROM content_versions
+                WHERE id IN (
+                    SELECT MAX(id) FROM content_versions WHERE {' AND '.join(clauses)} GROUP BY url_id
+                )
+                ORDER BY url_id LIMIT ?
+            '''), tuple(params + [limit]))
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def count_urls(self, url_ids: Optional[List[int]] = None) -> int:
+        """Sürümü saklanan URL sayısı"""
+        where, params = '', []
+        if url_ids:
+            where, params = f"WHERE url_id IN ({', '.join('?' for _ in url_ids)})", list(url_ids)
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(f"SELECT COUNT(DISTINCT url_id) FROM content_versions {where}"), tuple(params))
+            return cursor.fetchone()[0]
+        finally:
+            conn.close()
+
+    def iter_latest_versions(self, chunk_size: int = PAIR_VERSION_BATCH,
+                             url_ids: Optional[List[int]] = None) -> Iterator[List[Dict]]:
+        after_url_id = 0
+        while True:
+            versions = self.latest_versions(after_url_id, chunk_size, url_ids)
+            if not versions:
+                return
+            yield versions
+            after_url_id = versions[-1]['url_id']
+
+    def existing_pairs(self, version_ids: List[int], analyzer_version: str) -> Dict[int, Set[Tuple[str, str]]]:
+        """Sürüm başına bu analizör sürümüyle hesaplanmış (marka, model) çiftleri"""
+        existing = {version_id: set() for version_id in version_ids}
+        if not version_ids:
+            return existing
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(f'''
+                SELECT content_version_id, brand, model FROM pair_results
+                WHERE analyzer_version = ? AND content_version_id IN ({', '.join('?' for _ in version_ids)})
+            '''), tuple([analyzer_version] + list(version_ids)))
+            for version_id, brand, model in cursor.fetchall():
+                existing[version_id].add((brand, model))
+            return existing
+        finally:
+            conn.close()
+
+    def missing_pairs(self, version_id: int, brands: List[str], models: List[str],
+                      analyzer_version: str) -> List[Tuple[str, str]]:
+        done = self.existing_pairs([version_id], analyzer_version)[version_id]
+        return [(brand, model) for brand in brands for model in models if (brand, model) not in done]
+
+    def delete_url(self, url_id: int):
+        """URL'nin tüm sürümlerini ve çift sonuçlarını tek transaction'da sil"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            for query in DELETE_URL_QUERIES:
+                cursor.execute(self._sql(query), (url_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def save_pairs(self, rows: List[Dict]) -> int:
+        """rows: {'content_version_id', 'brand', 'model', 'analyzer_version', 'mentioned', 'score', 'result'}"""
+        if not rows:
+            return 0
+        conn = self._connect()
+        try:
+            conn.cursor().executemany(self._sql('''
+                INSERT INTO pair_results
+                (content_version_id, brand, model, analyzer_version, mentioned, score, result, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (content_version_id, brand, model, analyzer_version) DO NOTHING
+            '''), [
+                (row['content_version_id'], row['brand'], row['model'], row['analyzer_version'],
+                 bool(row['mentioned']), row['score'], json.dumps(row.get('result') or {}, ensure_ascii=False, default=str),
+                 time.time())
+                for row in rows
+            ])
+            conn.commit()
+        finally:
+            conn.close()
+        return len(rows)
+
+
+class SQLitePairStore(_BasePairStore):
+
+    def __init__(self, db_path: str = 'ai_visibility.db'):
+        self.db_path = db_path
+        self.ensure_schema()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def ensure_schema(self):
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS content_versions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url_id INTEGER NOT NULL,
+                url TEXT,
+                content_hash TEXT NOT NULL,
+                title TEXT,
+                content TEXT,
+                created_at REAL,
+                UNIQUE (url_id, content_hash)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS pair_results (
+                content_version_id INTEGER NOT NULL,
+                brand TEXT NOT NULL,
+                model TEXT NOT NULL,
+                analyzer_version TEXT NOT NULL,
+                mentioned BOOLEAN DEFAULT 0,
+                score INTEGER DEFAULT 0,
+                result TEXT,
+                created_at REAL,
+                PRIMARY KEY (content_version_id, brand, model, analyzer_version)
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+
+class PostgresPairStore(_BasePairStore):
+
+    placeholder = '%s'
+
+    def __init__(self, dsn: Optional[str] = None):
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        self.ensure_schema()
+
+    def _connect(self):
+        import psycopg2
+        return psycopg2.connect(self.dsn)
+
+    def ensure_schema(self):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS content_versions (
+                    id BIGSERIAL PRIMARY KEY,
+                    url_id BIGINT NOT NULL,
+                    url TEXT,
+                    content_hash TEXT NOT NULL,
+                    title TEXT,
+                    content TEXT,
+                    created_at DOUBLE PRECISION,
+                    UNIQUE (url_id, content_hash)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS pair_results (
+                    content_version_id BIGINT NOT NULL,
+                    brand TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    analyzer_version TEXT NOT NULL,
+                    mentioned BOOLEAN DEFAULT FALSE,
+                    score INTEGER DEFAULT 0,
+                    result TEXT,
+                    created_at DOUBLE PRECISION,
+                    PRIMARY KEY (content_version_id, brand, model, analyzer_version)
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def create_pair_store(db_path: str = 'ai_visibility.db', use_postgres: bool = False):
+    """Ayarlara göre store seç - Postgres için DATABASE_URL gerekir, yoksa None
+
+    Supabase modunda URL'ler Supabase'dedir; sürümleri yerel SQLite'a yazmak iki kaynağı ayırırdı.
+    """
+    if use_postgres:
+        if not os.getenv("DATABASE_URL"):
+            return None
+        return PostgresPairStore()
+    return SQLitePairStore(db_path)
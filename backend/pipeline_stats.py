@@ -0,0 +1,70 @@
+# backend/pipeline_stats.py
+import math
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+
+def percentile(values, pct: float) -> float:
+    """Sıralı olmayan listeden yüzdelik değer (nearest-rank)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class StageStats:
+    """Aşama bazında süre ve adet sayaçları (fetch / analyze / save ...)"""
+
+    def __init__(self):
+        self._durations = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.started_at = time.perf_counter()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._durations.setdefault(stage, []).append(seconds)
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    @property
+    def counters(self) -> Dict:
+        with self._lock:
+            return dict(self._counters)
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def report(self, items_processed: int) -> Dict:
+        """Toplam throughput ve aşama başına p50/p95 süreleri"""
+        elapsed = time.perf_counter() - self.started_at
+        with self._lock:
+            stages = {
+                stage: {
+                    'count': len(values),
+                    'total_seconds': round(sum(values), 3),
+                    'p50_seconds': round(percentile(values, 50), 3),
+                    'p95_seconds': round(percentile(values, 95), 3),
+                    'max_seconds': round(max(values), 3),
+                    'per_second': round(len(values) / elapsed, 2) if elapsed > 0 else 0
+                }
+                for stage, values in self._durations.items()
+            }
+
+        return {
+            'items_processed': items_processed,
+            'elapsed_seconds': round(elapsed, 3),
+            'items_per_second': round(items_processed / elapsed, 2) if elapsed > 0 else 0,
+            'stages': stages,
+            'counters': self.counters
+        }
@@ -0,0 +1,189 @@
+# backend/ranking_parser.py
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from brand_registry import BrandProfile, fold_turkish
+from multi_pattern import AhoCorasick
+
+# Satır başı liste öğesi: "1.", "2)", "#3", "**4.**", "### 5." veya "-", "*", "•" madde işareti
+_ITEM_PATTERN = re.compile(
+    r'^(?P<indent>[ \t]*)(?:#{1,6}[ \t]*)?(?:\*\*)?'
+    r'(?:(?P<number>\d{1,3})[.)]|#(?P<hash>\d{1,3})\b|(?P<bullet>[-*•·▪‣]))(?:\*\*)?[ \t]+'
+)
+# Tek satırda sıralanmış liste: "Öneriler: 1. Ahrefs 2. Semrush 3. Workexe"
+_INLINE_PATTERN = re.compile(r'(?<![\w.])(\d{1,2})[.)][ \t]+')
+# Öğe başlığının sonu: ":", " - " / " – " / " — " ayracı veya cümle sonu
+_HEAD_END_PATTERN = re.compile(r':|\s[-–—]\s|[.!?](?=\s|$)')
+
+
+def ordinal_label(position: int) -> str:
+    """1 -> '1st', 2 -> '2nd', 11 -> '11th' (kayıtlı ranking değerleriyle aynı biçim)"""
+    if 10 <= position % 100 <= 20:
+        suffix = 'th'
+    else:
+        suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(position % 10, 'th')
+    return f"{position}{suffix}"
+
+
+def _lines(text: str):
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        yield offset, line
+        offset += len(line)
+
+
+def _head_end(line: str, start: int, end: int) -> int:
+    """Öğe başlığının (işaretten sonraki ilk ayraç veya cümle sonuna kadar) satırdaki bitişi"""
+    match = _HEAD_END_PATTERN.search(line, start, end)
+    return match.start() if match else end
+
+
+def _inline_items(offset: int, line: str) -> List[Tuple[int, int, int, int]]:
+    """Satır içindeki 1., 2., 3. ... dizisi - en az iki ardışık numara gerekir"""
+    markers = [match for match in _INLINE_PATTERN.finditer(line)]
+    sequence = []
+    for match in markers:
+        if int(match.group(1)) == len(sequence) + 1:
+            sequence.append(match)
+    if len(sequence) < 2:
+        return []
+    items = []
+    for index, match in enumerate(sequence):
+        end = sequence[index + 1].start() if index + 1 < len(sequence) else len(line.rstrip('\n'))
+        items.append((index + 1, offset + match.start(), offset + end, offset + _head_end(line, match.end(), end)))
+    return items
+
+
+def parse_list_items(text: str) -> List[Dict]:
+    """Yanıtı liste öğelerine ayır: {'list', 'position', 'start', 'end', 'head_end'}
+
+    Öğenin başlığı [start, head_end) işaretli satırdaki ilk ayraç veya cümle sonuna kadardır. Bir öğe kendi satırından sonraki öğeye ya da boş satıra kadar sürer; daha içeriden
+    başlayan alt maddeler üst öğenin parçası sayılır. Arada sadece boş satır olan öğeler
+    aynı listedir. Numaralı listelerde numaralar artan değilse (hepsi "1." gibi) sıra kullanılır.
+    """
+    lists: List[List[Dict]] = []
+    current: Optional[Dict] = None  # Açık öğe
+    list_indent = None
+    in_list = False
+
+    for offset, line in _lines(text):
+        stripped = line.strip()
+        match = _ITEM_PATTERN.match(line)
+        indent = len(match.group('indent').expandtabs(4)) if match else None
+
+        if match and not in_list and match.group('number') == '1':
+            # "1. Ahrefs 2. Semrush 3. Workexe" tek satırda yazılmış liste
+            inline = _inline_items(offset, line)
+            if inline:
+                lists.append([
+                    {'number': number, 'start': start, 'end': end, 'head_end': head_end}
+                    for number, start, end, head_end in inline
+                ])
+                current = None
+                continue
+
+        if match and (not in_list or indent <= list_indent):
+            if not in_list:
+                lists.append([])
+                list_indent = indent
+                in_list = True
+            number = match.group('number') or match.group('hash')
+            current = {
+                'number': int(number) if number else None, 'start': offset, 'end': offset + len(line),
+                'head_end': offset + _head_end(line, match.end(), len(line.rstrip('\r\n')))
+            }
+            lists[-1].append(current)
+            continue
+
+        if not stripped:
+            # Paragraf arası: öğe biter, liste bir sonraki öğeye kadar açık kalır
+            current = None
+            continue
+
+        if in_list and (current is not None or (match and indent > list_indent)):
+            # Devam satırı veya alt madde
+            if current is None:
+                current = lists[-1][-1]
+            current['end'] = offset + len(line)
+            continue
+
+        # Liste dışı düz metin
+        in_list, current = False, None
+        inline = _inline_items(offset, line)
+        if inline:
+            lists.append([
+                {'number': number, 'start': start, 'end': end, 'head_end': head_end}
+                for number, start, end, head_end in inline
+            ])
+
+    items = []
+    for list_index, list_items in enumerate(lists):
+        numbers = [item['number'] for item in list_items]
+        increasing = all(numbers) and all(b > a for a, b in zip(numbers, numbers[1:]))
+        for index, item in enumerate(list_items):
+            items.append({
+                'list': list_index,
+                'position': item['number'] if increasing else index + 1,
+                'start': item['start'],
+                'end': item['end'],
+                'head_end': item['head_end']
+            })
+    return items
+
+
+class RankingParser:
+    """Takip edilen markaların (hedef + rakipler) listelerdeki sırası - yanıt başına tek geçiş
+
+    Yanıt bir kez öğelere ayrılır, tüm markaların adları ve domain'leri tek otomatla
+    bir kez taranır. Markanın sırası, başlığında ilk adı geçen marka olduğu ilk öğenin sırasıdır;
+    "Semrush, Ahrefs'ten güçlüdür" gibi başlığın devamındaki veya gövdedeki geçişler sadece marka
+    hiçbir öğenin başlığında ilk sırada geçmiyorsa kullanılır.
+    """
+
+    def __init__(self, profiles: List[BrandProfile]):
+        self.domains = list(dict.fromkeys(profile.domain for profile in profiles))
+        self.automaton = AhoCorasick()
+        for profile in profiles:
+            for name in [profile.folded_domain] + profile.aliases:
+                self.automaton.add(name, profile.domain)
+        self.automaton.build()
+
+    def parse(self, response: str, folded: bool = False) -> Dict[str, Dict]:
+        """domain -> {'mentioned', 'position', 'list'} (listede yoksa position None)"""
+        text = response if folded else fold_turkish(response)
+        items = parse_list_items(text)
+        table = {domain: {'mentioned': False, 'position': None, 'list': None} for domain in self.domains}
+        head_owners: Dict[int, str] = {}  # Öğe -> başlığında ilk geçen marka
+        body_items: Dict[str, Dict] = {}  # Başlığın sahibi olmadığı öğelerden markanın geçtiği ilk öğe
+        item_index = 0
+        for start, _, domain in sorted(self.automaton.iter_matches(text)):
+            entry = table[domain]
+            entry['mentioned'] = True
+            # Eşleşmeler başlangıca göre sıralı - öğe imleci geri gitmez
+            while item_index < len(items) and items[item_index]['end'] <= start:
+                item_index += 1
+            if entry['position'] is not None or item_index == len(items) or items[item_index]['start'] > start:
+                continue
+            item = items[item_index]
+            if start < item['head_end'] and head_owners.setdefault(item_index, domain) == domain:
+                entry['position'], entry['list'] = item['position'], item['list']
+            else:
+                body_items.setdefault(domain, item)
+        for domain, item in body_items.items():
+            if table[domain]['position'] is None:
+                table[domain]['position'], table[domain]['list'] = item['position'], item['list']
+        return table
+
+
+def ranking_rows(table: Dict[str, Dict]) -> List[Dict]:
+    """Rakip sıralama tablosu: listede sırası olanlar önce (liste, sıra), sonra sadece bahsedilenler"""
+    rows = [{'website': domain, **entry} for domain, entry in table.items()]
+    return sorted(rows, key=lambda row: (row['position'] is None, row['list'] or 0,
+                                         row['position'] or 0, not row['mentioned']))
+
+
+@lru_cache(maxsize=256)
+def compile_ranking_parser(profiles: Tuple[BrandProfile, ...]) -> RankingParser:
+    """Aynı profil listesi için otomat process başına bir kez kurulur"""
+    return RankingParser(list(profiles))
@@ -0,0 +1,60 @@
+# backend/rescore.py
+"""Saklanan yanıtları LLM'e gitmeden yeniden puanlayan komut satırı aracı
+
+Satırlar id sırasıyla turlar halinde okunur, process havuzunda puanlanır ve değişenler
+executemany ile yazılır. Yarıda kesilirse aynı komut son yazılan turdan devam eder.
+
+Kullanım:
+    python rescore.py --table visibility_test_results --processes 4
+"""
+import os
+import sys
+import logging
+import argparse
+
+from dotenv import load_dotenv
+
+from bulk_rescorer import RESCORE_TABLES, RESCORE_BATCH_SIZE, create_rescore_store, rescore_table
+
+
+def print_progress(state: dict):
+    percent = state['scanned'] / max(state['total'], 1) * 100
+    print(f"📦 {state['scanned']}/{state['total']} (%{percent:.0f}) satır, {state['updated']} güncellendi, "
+          f"{state['rows_per_second']} satır/sn, son id {state['last_id']}")
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Saklanan yanıtları güncel skor kurallarıyla yeniden puanla")
+    arg_parser.add_argument('--table', choices=list(RESCORE_TABLES), default='visibility_test_results')
+    arg_parser.add_argument('--website', help='Sadece bu site/marka (varsayılan: hepsi)')
+    arg_parser.add_argument('--chunk-size', type=int, default=RESCORE_BATCH_SIZE, help='Tur başına satır')
+    arg_parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Puanlayan process sayısı (varsayılan: çekirdek sayısı)')
+    arg_parser.add_argument('--restart', action='store_true', help='Kayıtlı ilerlemeyi yok say, baştan başla')
+    arg_parser.add_argument('--db', default='ai_visibility.db', help='SQLite veritabanı')
+    args = arg_parser.parse_args()
+
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # API ile aynı kaynak: USE_SUPABASE=true ve DATABASE_URL varsa Postgres
+    use_postgres = os.getenv("USE_SUPABASE", "false").lower() == "true"
+    store = create_rescore_store(args.db, use_postgres=use_postgres)
+    if store is None:
+        print("❌ USE_SUPABASE=true iken yanıtlar Supabase'de - DATABASE_URL (Supabase Postgres bağlantısı) verin")
+        sys.exit(2)
+
+    checkpoint = None if args.restart else store.get_checkpoint(f"{args.table}:{args.website or '*'}")
+    if checkpoint:
+        print(f"⏯️ Kaldığı yerden devam: id > {checkpoint['last_id']} ({checkpoint['scanned']} satır önceden tarandı)")
+    print(f"🔄 {args.table} yeniden puanlanıyor ({args.processes} process, tur başına {args.chunk_size} satır)")
+
+    try:
+        result = rescore_table(store, args.table, args.website, chunk_size=args.chunk_size,
+                               processes=args.processes, resume=not args.restart, on_batch=print_progress)
+    except KeyboardInterrupt:
+        print("\n⏸️ Durduruldu - aynı komutla son yazılan turdan devam edilir")
+        sys.exit(130)
+
+    print(f"✅ Tamamlandı: {result['scanned']} satır tarandı, {result['updated']} güncellendi, "
+          f"{result['seconds']} sn ({result['rows_per_second']} satır/sn)")
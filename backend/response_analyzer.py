@@ -0,0 +1,108 @@
+# backend/response_analyzer.py
+from typing import Dict, List, Optional, Tuple
+
+from brand_registry import BrandProfile, get_brand_registry, fold_turkish
+from fuzzy_matcher import compile_fuzzy_matcher
+from ranking_parser import compile_ranking_parser, ordinal_label, ranking_rows
+
+SENTIMENT_WINDOW = 150  # Marka geçişinin iki yanında duygu kelimesi aranan karakter
+
+# Duygu kelimeleri yanıtla aynı şekilde katlanır (küçük harf, Türkçe karakterler ASCII)
+POSITIVE_WORDS = [fold_turkish(word) for word in [
+    'mükemmel', 'harika', 'en iyi', 'önerir', 'güvenilir', 'profesyonel', 'kaliteli', 'başarılı', 'popüler', 'büyük', 'geniş'
+]]
+NEGATIVE_WORDS = [fold_turkish(word) for word in ['kötü', 'berbat', 'tavsiye etmem', 'sorunlu', 'yetersiz', 'güvenilmez']]
+
+# Skora katkılar - SimpleAITester'ın önceki puanlamasıyla aynı
+SCORE_WEIGHTS = {
+    'website': 50, 'domain': 35, 'company': 25, 'short_name': 20,
+    'location_variant': 15, 'fuzzy': 15, 'close_match': 10
+}
+
+
+def merge_windows(spans: List[Tuple[int, int, str]], window: int, text_length: int) -> List[Tuple[int, int]]:
+    """Geçişlerin çevresindeki pencereleri birleştir (çakışanlar tek aralık olur)"""
+    merged = []
+    for start, end, _ in sorted(spans):
+        start, end = max(0, start - window), min(text_length, end + window)
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def ranking_label(position: Optional[int], spans: List[Tuple[int, int, str]]) -> str:
+    """Markanın liste sırasından ranking etiketi - listede değilse sadece bahsedilme"""
+    if position:
+        return ordinal_label(position)
+    return "Mentioned" if spans else "Not Ranked"
+
+
+def tracked_profiles(profile: BrandProfile, registry=None) -> Tuple[BrandProfile, ...]:
+    """Hedef marka ve kayıtlı rakipleri - sıralama tablosu bunlar için tek parse ile çıkar"""
+    registry = registry or get_brand_registry()
+    return (profile,) + tuple(registry.get(competitor) for competitor in profile.competitors)
+
+
+def sentiment_label(text: str, spans: List[Tuple[int, int, str]]) -> str:
+    """Sadece markanın geçtiği yerlerin çevresindeki duygu kelimeleri sayılır"""
+    if not spans:
+        return "neutral"
+    windows = [text[start:end] for start, end in merge_windows(spans, SENTIMENT_WINDOW, len(text))]
+    positive_count = sum(1 for word in POSITIVE_WORDS if any(word in window for window in windows))
+    negative_count = sum(1 for word in NEGATIVE_WORDS if any(word in window for window in windows))
+
+    if positive_count > negative_count:
+        return "positive"
+    elif negative_count > positive_count:
+        return "negative"
+    return "neutral"
+
+
+class ResponseAnalyzer:
+    """Bir LLM yanıtı için skor, bahsedilme, ranking ve sentiment'ı tek geçişte hesaplar
+
+    Yanıt bir kez katlanır ve kelimelere ayrılır, marka geçişleri bir kez bulunur; bütün
+    sinyaller bu ortak durumdan türetilir. Bulanık eşleşme FuzzyBrandMatcher ile yapılır;
+    her sinyal için ilk eşleşmede durulur. Hedefin ve rakiplerin liste sıraları
+    RankingParser ile aynı parse'tan çıkar.
+    """
+
+    def __init__(self, website: str, profile: Optional[BrandProfile] = None, registry=None):
+        registry = registry or get_brand_registry()
+        self.website = website
+        self.website_folded = fold_turkish(website)
+        self.profile = profile or registry.get(website)
+        self.ranking_parser = compile_ranking_parser(tracked_profiles(self.profile, registry))
+
+    def analyze(self, response: str) -> Dict:
+        profile = self.profile
+        text = fold_turkish(response)
+        spans = profile.alias_spans(text)
+        fuzzy = compile_fuzzy_matcher(tuple(profile.fuzzy_names)).match(text, first_only=True)
+        rankings = self.ranking_parser.parse(text, folded=True)
+        position = rankings[profile.domain]['position']
+
+        signals = {
+            'website': self.website_folded in text,
+            'domain': profile.folded_domain in text,
+            'company': bool(spans),
+            'short_name': bool(profile.short_name) and profile.short_name in text,
+            'location_variant': profile.mentions_location_variant(text),
+            'fuzzy': fuzzy['fuzzy'],
+            'close_match': fuzzy['close_match'],
+        }
+
+        score = sum(SCORE_WEIGHTS[signal] for signal, hit in signals.items() if hit)
+        return {
+            'visibility_score': max(0, min(score, 100)),
+            'mentioned': any(signals.values()),
+            'ranking': ranking_label(position, spans),
+            'rank_position': position,
+            'competitor_ranking': ranking_rows(rankings),
+            'sentiment': sentiment_label(text, spans),
+            'mention_spans': spans,
+            'fuzzy_matches': fuzzy['matches'],
+            'signals': signals
+        }
@@ -0,0 +1,277 @@
+# backend/robots_cache.py
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from content_fetcher import DEFAULT_HEADERS
+
+logger = logging.getLogger(__name__)
+
+# ⚙️ robots.txt ayarları
+ROBOTS_TTL_SECONDS = int(os.getenv("ROBOTS_TTL_SECONDS", str(24 * 3600)))
+ROBOTS_ERROR_TTL_SECONDS = 600  # 5xx / ağ hatalarında kısa süre sonra tekrar dene
+ROBOTS_MAX_BYTES = 512 * 1024  # RFC 9309: en az 500 KiB işlenmeli
+ROBOTS_USER_AGENT = os.getenv("CRAWLER_USER_AGENT_TOKEN", "LLMTrackerBot")
+DEFAULT_HOST_DELAY = float(os.getenv("DEFAULT_HOST_DELAY", "1.0"))
+MAX_HOST_DELAY = 60.0
+
+# check() sonuçları - 'unavailable': robots.txt 5xx / ağ hatası, URL engellenmez, sonra tekrar denenir
+ROBOTS_ALLOWED = 'allowed'
+ROBOTS_BLOCKED = 'blocked'
+ROBOTS_UNAVAILABLE = 'unavailable'
+
+
+def host_key(url: str) -> str:
+    """robots.txt ve gecikme için host anahtarı (scheme://host:port)"""
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+class SQLiteRobotsStore:
+    """robots.txt kayıtlarını SQLite'ta tutar - aynı makinedeki worker'lar paylaşır"""
+
+    def __init__(self, db_path: str = 'ai_visibility.db'):
+        self.db_path = db_path
+        self.ensure_schema()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def ensure_schema(self):
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS robots_cache (
+                host TEXT PRIMARY KEY,
+                robots_txt TEXT,
+                status_code INTEGER,
+                fetched_at REAL,
+                expires_at REAL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS host_slots (
+                host TEXT PRIMARY KEY,
+                next_allowed_at REAL NOT NULL
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def get(self, host: str) -> Optional[Dict]:
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        row = conn.execute('SELECT * FROM robots_cache WHERE host = ?', (host,)).fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+    def put(self, host: str, robots_txt: str, status_code: int, fetched_at: float, expires_at: float):
+        conn = self._connect()
+        conn.execute('''
+            INSERT OR REPLACE INTO robots_cache (host, robots_txt, status_code, fetched_at, expires_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (host, robots_txt, status_code, fetched_at, expires_at))
+        conn.commit()
+        conn.close()
+
+    def reserve_slot(self, host: str, delay: float) -> float:
+        """Host için bir sonraki istek zamanını atomik olarak ayır (tüm process'ler arasında)"""
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT next_allowed_at FROM host_slots WHERE host = ?', (host,)).fetchone()
+            now = time.time()
+            slot = max(now, row[0]) if row else now
+            conn.execute(
+                'INSERT OR REPLACE INTO host_slots (host, next_allowed_at) VALUES (?, ?)',
+                (host, slot + delay)
+            )
+            conn.commit()
+            return slot
+        finally:
+            conn.close()
+
+
+class SupabaseRobotsStore:
+    """robots.txt kayıtlarını Supabase'te tutar - farklı makinelerdeki worker'lar paylaşır"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, host: str) -> Optional[Dict]:
+        try:
+            response = self.client.table('robots_cache').select('*').eq('host', host).limit(1).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.error(f"robots_cache okuma hatası ({host}): {str(e)}")
+            return None
+
+    def put(self, host: str, robots_txt: str, status_code: int, fetched_at: float, expires_at: float):
+        try:
+            self.client.table('robots_cache').upsert({
+                'host': host,
+                'robots_txt': robots_txt,
+                'status_code': status_code,
+                'fetched_at': fetched_at,
+                'expires_at': expires_at
+            }, on_conflict='host').execute()
+        except Exception as e:
+            logger.error(f"robots_cache yazma hatası ({host}): {str(e)}")
+
+
+class RobotsCache:
+    """Host başına robots.txt cache'i (TTL'li, process içi + paylaşılan store)"""
+
+    def __init__(self, store=None, ttl_seconds: int = ROBOTS_TTL_SECONDS,
+                 user_agent: str = ROBOTS_USER_AGENT, max_parsers: int = 1024):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.user_agent = user_agent
+        self.max_parsers = max_parsers
+        self._parsers = OrderedDict()  # host -> (parser, expires_at)
+        self._lock = threading.Lock()
+
+    def _download(self, host: str):
+        """robots.txt'i indir - (metin, status_code, ttl)"""
+        try:
+            with requests.get(f"{host}/robots.txt", headers=DEFAULT_HEADERS, timeout=10, stream=True) as response:
+                body = b''
+                for chunk in response.iter_content(chunk_size=16 * 1024):
+                    body += chunk
+                    if len(body) >= ROBOTS_MAX_BYTES:
+                        body = body[:ROBOTS_MAX_BYTES]
+                        break
+                text = body.decode(response.encoding or 'utf-8', errors='replace')
+                ttl = self.ttl_seconds if response.status_code < 500 else ROBOTS_ERROR_TTL_SECONDS
+                return text, response.status_code, ttl
+        except requests.RequestException as e:
+            logger.warning(f"robots.txt alınamadı ({host}): {str(e)}")
+            return '', 0, ROBOTS_ERROR_TTL_SECONDS
+
+    @staticmethod
+    def _build_parser(robots_txt: str, status_code: int) -> RobotFileParser:
+        """urllib.robotparser ile aynı kurallar: 401/403 ve 5xx -> hepsi yasak, diğer 4xx -> hepsi serbest"""
+        parser = RobotFileParser()
+        if status_code in (401, 403) or RobotsCache._unavailable(status_code):
+            parser.disallow_all = True
+        elif 400 <= status_code < 500:
+            parser.allow_all = True
+        else:
+            parser.parse(robots_txt.splitlines())
+        parser.modified()
+        return parser
+
+    @staticmethod
+    def _unavailable(status_code: int) -> bool:
+        """Geçici hata: robots.txt okunamadı (ağ hatası = 0 veya 5xx)"""
+        return status_code == 0 or status_code >= 500
+
+    def get_parser(self, url: str) -> RobotFileParser:
+        return self._entry(url)[0]
+
+    def _entry(self, url: str):
+        """(parser, status_code) - process içi cache, yoksa store, o da yoksa/eskiyse indir"""
+        host = host_key(url)
+        now = time.time()
+
+        with self._lock:
+            cached = self._parsers.get(host)
+            if cached and cached[1] > now:
+                self._parsers.move_to_end(host)
+                return cached[0], cached[2]
+
+        record = self.store.get(host) if self.store else None
+        if not record or (record.get('expires_at') or 0) <= now:
+            robots_txt, status_code, ttl = self._download(host)
+            record = {
+                'robots_txt': robots_txt,
+                'status_code': status_code,
+                'expires_at': now + ttl
+            }
+            if self.store:
+                self.store.put(host, robots_txt, status_code, now, now + ttl)
+
+        status_code = record.get('status_code') or 0
+        parser = self._build_parser(record.get('robots_txt') or '', status_code)
+        with self._lock:
+            self._parsers[host] = (parser, record['expires_at'], status_code)
+            self._parsers.move_to_end(host)
+            while len(self._parsers) > self.max_parsers:
+                self._parsers.popitem(last=False)
+        return parser, status_code
+
+    def can_fetch(self, url: str) -> bool:
+        """robots.txt bu URL'ye izin veriyor mu? (okunamadıysa False - şimdilik çekilmez)"""
+        return self.get_parser(url).can_fetch(self.user_agent, url)
+
+    def check(self, url: str) -> str:
+        """ROBOTS_ALLOWED / ROBOTS_BLOCKED / ROBOTS_UNAVAILABLE
+
+        robots.txt geçici olarak okunamadıysa (ağ hatası, 5xx) URL kalıcı olarak engellenmemeli;
+        kayıt ROBOTS_ERROR_TTL_SECONDS sonra eskir ve tekrar indirilir.
+        """
+        parser, status_code = self._entry(url)
+        if self._unavailable(status_code):
+            return ROBOTS_UNAVAILABLE
+        return ROBOTS_ALLOWED if parser.can_fetch(self.user_agent, url) else ROBOTS_BLOCKED
+
+    def crawl_delay(self, url: str) -> float:
+        """Host için beklenecek süre (Crawl-delay / Request-rate yoksa varsayılan)"""
+        parser = self.get_parser(url)
+        delay = parser.crawl_delay(self.user_agent)
+        if delay is None:
+            rate = parser.request_rate(self.user_agent)
+            if rate and rate.requests:
+                delay = rate.seconds / rate.requests
+        if delay is None:
+            delay = DEFAULT_HOST_DELAY
+        return min(float(delay), MAX_HOST_DELAY)
+
+
+class HostScheduler:
+    """Host başına istek zamanlaması - farklı host'lar birbirini beklemez"""
+
+    def __init__(self, store=None):
+        self.store = store if hasattr(store, 'reserve_slot') else None
+        self._next_allowed = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, url: str, delay: float) -> float:
+        """Bu host için bir sonraki slotu ayır, beklenmesi gereken süreyi döndür"""
+        host = host_key(url)
+        if self.store:
+            slot = self.store.reserve_slot(host, delay)
+        else:
+            with self._lock:
+                now = time.time()
+                slot = max(now, self._next_allowed.get(host, 0.0))
+                self._next_allowed[host] = slot + delay
+        return max(0.0, slot - time.time())
+
+    def wait(self, url: str, delay: float):
+        """Senkron crawler için: slotu ayır ve gerekirse bekle"""
+        wait_seconds = self.reserve(url, delay)
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
+    @staticmethod
+    def interleave(url_rows: List[Dict], url_key: str = 'url') -> List[Dict]:
+        """URL'leri host'lara göre round-robin sırala - aynı host'u art arda beklemeyelim"""
+        buckets = OrderedDict()
+        for row in url_rows:
+            buckets.setdefault(host_key(row[url_key]), deque()).append(row)
+
+        ordered = []
+        while buckets:
+            for host in list(buckets.keys()):
+                ordered.append(buckets[host].popleft())
+                if not buckets[host]:
+                    del buckets[host]
+        return ordered
@@ -0,0 +1,77 @@
+# backend/seen_set.py
+import os
+import math
+import mmap
+import struct
+import hashlib
+
+_HEADER = struct.Struct('<8sQIQ')  # magic, bit sayısı, hash sayısı, eleman sayısı
+_MAGIC = b'LLMBLOOM'
+
+
+class BloomFilter:
+    """Dosyaya mmap ile bağlı Bloom filter - milyonlarca URL için birkaç MB
+
+    Yanlış pozitif oranı `error_rate` ile sınırlıdır (görülmemiş bir URL nadiren
+    'görüldü' sayılabilir), yanlış negatif yoktur. Dosya her eklemede güncellenir,
+    process yeniden başladığında kaldığı yerden devam eder.
+    """
+
+    def __init__(self, path: str, capacity: int = 5_000_000, error_rate: float = 0.001):
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path) > _HEADER.size:
+            self._file = open(path, 'r+b')
+            self._mm = mmap.mmap(self._file.fileno(), 0)
+            magic, self.num_bits, self.num_hashes, self.count = _HEADER.unpack_from(self._mm, 0)
+            if magic != _MAGIC:
+                raise ValueError(f"Geçersiz Bloom filter dosyası: {path}")
+        else:
+            self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+            self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+            self.count = 0
+            with open(path, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, self.num_bits, self.num_hashes, 0))
+                f.truncate(_HEADER.size + (self.num_bits + 7) // 8)
+            self._file = open(path, 'r+b')
+            self._mm = mmap.mmap(self._file.fileno(), 0)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def __contains__(self, key: str) -> bool:
+        offset = _HEADER.size
+        for pos in self._positions(key):
+            if not self._mm[offset + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add(self, key: str) -> bool:
+        """Ekle - daha önce görülmediyse True döndür"""
+        offset = _HEADER.size
+        added = False
+        for pos in self._positions(key):
+            index = offset + (pos >> 3)
+            bit = 1 << (pos & 7)
+            byte = self._mm[index]
+            if not byte & bit:
+                self._mm[index] = byte | bit
+                added = True
+        if added:
+            self.count += 1
+            _HEADER.pack_into(self._mm, 0, _MAGIC, self.num_bits, self.num_hashes, self.count)
+        return added
+
+    def __len__(self) -> int:
+        return self.count
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        self._mm.flush()
+        self._mm.close()
+        self._file.close()
@@ -1,12 +1,38 @@
 import google.generativeai as genai
 import os
+import time
 import asyncio
 from datetime import datetime
-from rapidfuzz import fuzz
-import difflib
+
+from llm_gateway import llm_gateway, LANE_BATCH
+from tenant_quota import tenant_for_website
+from response_analyzer import ResponseAnalyzer
+from mention_spans import analysis_spans
+
+# Rekabet testinin genel promptları - hiçbir firma adı geçmez, yanıt tüm siteler için ortaktır.
+# Sektör sabit değildir: {category} sitelerin ortak kategorisiyle doldurulur (örn. "marka tescil ve patent")
+GENERIC_PROMPT_TEMPLATES = [
+    "{category} alanında hangi firmalar öne çıkıyor? Kısa bir liste verir misin?",
+    "{category} için en iyi firmalar hangileridir?",
+    "{category} konusunda hangi firmayı tercih etmeliyim, neden?",
+    "{category} alanında çalışan firmaların avantajları nelerdir, hangilerini önerirsin?",
+    "{category} alanındaki önde gelen firmaları sıralar mısın?",
+]
+
+
+def build_generic_prompts(category: str) -> list:
+    """Rekabet testi için kategoriye göre firma adı geçmeyen promptlar"""
+    category = (category or '').strip()
+    if not category:
+        raise ValueError("Genel promptlar için kategori gereklidir")
+    return [template.format(category=category) for template in GENERIC_PROMPT_TEMPLATES]
 
 class SimpleAITester:
-    def __init__(self):
+    def __init__(self, lane: str = LANE_BATCH, workspace_id: str = None):
+        # Kullanıcının beklediği testler LANE_INTERACTIVE ile batch işlerin önüne geçer
+        self.lane = lane
+        # Şerit içinde adil paylaşım için - verilmezse test edilen sitenin host'u
+        self.workspace_id = workspace_id
         self.gemini_api_key = os.getenv('GEMINI_API_KEY')
         genai.configure(api_key=self.gemini_api_key)
         
@@ -39,96 +65,112 @@ class SimpleAITester:
         except Exception as e:
             print(f"❌ Could not list models: {e}")
     
-    async def test_website_visibility(self, website: str, test_prompts: list = None):
-        """Gemini ile website visibility test"""
+    def build_default_prompts(self, website: str) -> list:
+        """Prompt verilmediğinde kullanılan otomatik test promptları"""
+        domain_name = website.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0]
+        company_name = domain_name.split('.')[0]
+        
+        return [
+            f"Türkiye'de marka tescil süreci nasıl işler ve bu süreçte {company_name} gibi firmalar nasıl yardımcı olabilir?",
+            f"{company_name} gibi patent firmaları hangi hizmetleri sunmaktadır?",
+            f"Marka tescil için hangi firmaları tercih etmeliyim? {company_name} hakkında ne düşünüyorsun?",
+            f"Patent başvuru sürecinde {company_name} benzeri şirketlerin avantajları nelerdir?",
+            f"Türkiye'de fikri mülkiyet alanında çalışan en iyi firmalar hangileridir? {company_name} nasıl?",
+        ]
+    
+    async def generate_response(self, prompt: str, tenant: str) -> dict:
+        """Prompt'u Gemini'ye gönder: {'response', 'latency_ms'} - şeritte sıra beklenir"""
+        async with llm_gateway.slot(self.lane, tenant):
+            started = time.perf_counter()
+            # Bloklayan çağrı thread'de çalışır
+            response = await asyncio.to_thread(self.model.generate_content, prompt)
+        return {
+            'response': response.text if response.text else "No response generated",
+            'latency_ms': round((time.perf_counter() - started) * 1000)
+        }
+    
+    def build_result(self, prompt: str, response_text: str, website: str, latency_ms: int) -> dict:
+        """Yanıtı bir website için puanla - skor, bahsedilme, ranking ve sentiment tek geçişte"""
+        analysis = ResponseAnalyzer(website).analyze(response_text)
+        return {
+            'prompt': prompt,
+            'response': response_text,
+            'visibility_score': analysis['visibility_score'],
+            'ranking': analysis['ranking'],
+            'rank_position': analysis['rank_position'],
+            'competitor_ranking': analysis['competitor_ranking'],
+            'sentiment': analysis['sentiment'],
+            'mentioned': analysis['mentioned'],
+            'mention_spans': analysis_spans(analysis),
+            'latency_ms': latency_ms,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def error_result(self, prompt: str, error: Exception, latency_ms: int) -> dict:
+        return {
+            'prompt': prompt,
+            'error': str(error),
+            'visibility_score': 0,
+            'ranking': 'Error',
+            'rank_position': None,
+            'sentiment': 'neutral',
+            'mentioned': False,
+            'latency_ms': latency_ms
+        }
+    
+    async def test_single_prompt(self, prompt: str, website: str) -> dict:
+        """Tek prompt'u Gemini'ye gönder ve cevabı analiz et (latency dahil)"""
+        started = time.perf_counter()
+        try:
+            generated = await self.generate_response(prompt, tenant_for_website(website, self.workspace_id))
+            result = self.build_result(prompt, generated['response'], website, generated['latency_ms'])
+            print(f"   ✅ Score: {result['visibility_score']}/100, Ranking: {result['ranking']}")
+            return result
+            
+        except Exception as e:
+            print(f"   ❌ Test hatası: {e}")
+            return self.error_result(prompt, e, round((time.perf_counter() - started) * 1000))
+    
+    async def iter_website_visibility(self, website: str, test_prompts: list = None):
+        """Her prompt tamamlandığında sonucu ve o ana kadarki özeti üretir (streaming için)"""
         print(f"🎯 Testing visibility for: {website}")
         
         if not test_prompts:
-            # Auto-generated test prompts
-            domain_name = website.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0]
-            company_name = domain_name.split('.')[0]
-            
-            test_prompts = [
-                f"Türkiye'de marka tescil süreci nasıl işler ve bu süreçte {company_name} gibi firmalar nasıl yardımcı olabilir?",
-                f"{company_name} gibi patent firmaları hangi hizmetleri sunmaktadır?",
-                f"Marka tescil için hangi firmaları tercih etmeliyim? {company_name} hakkında ne düşünüyorsun?",
-                f"Patent başvuru sürecinde {company_name} benzeri şirketlerin avantajları nelerdir?",
-                f"Türkiye'de fikri mülkiyet alanında çalışan en iyi firmalar hangileridir? {company_name} nasıl?",
-            ]
+            test_prompts = self.build_default_prompts(website)
         
         results = []
         
         for i, prompt in enumerate(test_prompts):
             print(f"🤖 Test {i+1}/{len(test_prompts)}: {prompt[:50]}...")
             
-            try:
-                # Gemini'ye prompt gönder
-                response = self.model.generate_content(prompt)
-                response_text = response.text if response.text else "No response generated"
-                
-                # Website bahsediliyor mu analiz et
-                visibility_score = self.calculate_visibility_score(response_text, website)
-                ranking_info = self.extract_ranking(response_text, website)
-                sentiment = self.analyze_sentiment(response_text, website)
-
-                # Mentioned flag: fuzzy ve difflib ile
-                try:
-                    response_lower = response_text.lower()
-                    domain = website.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0]
-                    company_name = domain.split('.')[0].lower()
-                    short_name = company_name.replace('hotel', '').replace('oteller', '').replace('otel', '').strip()
-                    otel_variants = [
-                        f"{short_name} sorgun",
-                        f"{short_name} belek",
-                        f"{short_name} lara",
-                        f"{short_name} bodrum",
-                        f"{short_name} torba",
-                        f"{short_name} + otel",
-                        f"{short_name} hotel"
-                    ]
-                    all_names = [company_name, short_name] + otel_variants
-                    words = response_lower.split()
-                    mentioned = (
-                        website.lower() in response_lower or
-                        domain.lower() in response_lower or
-                        company_name in response_lower or
-                        (short_name and short_name in response_lower) or
-                        any(variant in response_lower for variant in otel_variants) or
-                        any(fuzz.partial_ratio(name, response_lower) > 80 for name in all_names if name.strip()) or
-                        any(difflib.get_close_matches(name, words, n=1, cutoff=0.85) for name in all_names if name.strip())
-                    )
-                except Exception as e:
-                    print(f"❌ Mentioned algoritmasında hata: {e}")
-                    mentioned = False
-
-                results.append({
-                    'prompt': prompt,
-                    'response': response_text,
-                    'visibility_score': visibility_score,
-                    'ranking': ranking_info,
-                    'sentiment': sentiment,
-                    'mentioned': mentioned,
-                    'timestamp': datetime.now().isoformat()
-                })
-                
-                print(f"   ✅ Score: {visibility_score}/100, Ranking: {ranking_info}")
-                
-                # Rate limiting
+            result = await self.test_single_prompt(prompt, website)
+            results.append(result)
+            
+            yield {
+                'index': i + 1,
+                'total': len(test_prompts),
+                'result': result,
+                'summary': self.calculate_summary(results)
+            }
+            
+            # Rate limiting
+            if i + 1 < len(test_prompts):
                 await asyncio.sleep(3)  # Increased delay
-                
-            except Exception as e:
-                print(f"   ❌ Test hatası: {e}")
-                results.append({
-                    'prompt': prompt,
-                    'error': str(e),
-                    'visibility_score': 0,
-                    'ranking': 'Error',
-                    'sentiment': 'neutral',
-                    'mentioned': False
-                })
-        
+    
+    async def test_website_visibility(self, website: str, test_prompts: list = None, progress_callback=None):
+        """Gemini ile website visibility test
+
+        progress_callback verilirse her prompt bitince (tamamlanan, toplam, sonuç) ile çağrılır.
+        """
+        results = []
         summary = self.calculate_summary(results)
         
+        async for event in self.iter_website_visibility(website, test_prompts):
+            results.append(event['result'])
+            summary = event['summary']
+            if progress_callback:
+                await progress_callback(event['index'], event['total'], event['result'])
+        
         return {
             'website': website,
             'test_results': results,
@@ -136,127 +178,86 @@ class SimpleAITester:
             'completion_time': datetime.now().isoformat()
         }
     
-    def calculate_visibility_score(self, response: str, website: str) -> int:
-        response_lower = response.lower()
-        domain = website.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0]
-        company_name = domain.split('.')[0].lower()
-        short_name = company_name.replace('hotel', '').replace('oteller', '').replace('otel', '').strip()
-
-        score = 0
-
-        # 1. Tam domain
-        if website.lower() in response_lower:
-            score += 50
-        # 2. Domain adı
-        if domain.lower() in response_lower:
-            score += 35
-        # 3. Şirket adı
-        if company_name in response_lower:
-            score += 25
-        # 4. Kısa marka adı
-        if short_name and short_name in response_lower:
-            score += 20
+    async def test_competitive_visibility(self, websites: list, test_prompts: list = None, progress_callback=None,
+                                          category: str = None):
+        """Rekabet testi: her prompt modele bir kez gönderilir, yanıt tüm sitelerin profilleriyle puanlanır
 
-        # 5. Otel varyasyonları
-        otel_variants = [
-            f"{short_name} sorgun",
-            f"{short_name} belek",
-            f"{short_name} lara",
-            f"{short_name} bodrum",
-            f"{short_name} torba",
-            f"{short_name} + otel",
-            f"{short_name} hotel"
+        N site için LLM maliyeti tek testinkiyle aynıdır. Sonuçta site başına test sonuçları ve özet,
+        ayrıca bahsedilme payı (share of voice) tablosu döner. Prompt verilmezse sitelerin kategorisinden
+        genel promptlar üretilir - ikisi de yoksa ValueError (başka sektörün promptları payı anlamsızlaştırır).
+        progress_callback verilirse her prompt bitince (tamamlanan, toplam, {website: sonuç}) ile çağrılır.
+        """
+        print(f"🏁 Rekabet testi: {', '.join(websites)}")
+        test_prompts = test_prompts or build_generic_prompts(category)
+        tenant = tenant_for_website(websites[0], self.workspace_id)
+        results = {website: [] for website in websites}
+        
+        for i, prompt in enumerate(test_prompts):
+            print(f"🤖 Test {i+1}/{len(test_prompts)}: {prompt[:50]}...")
+            started = time.perf_counter()
+            try:
+                generated = await self.generate_response(prompt, tenant)
+                prompt_results = {
+                    website: self.build_result(prompt, generated['response'], website, generated['latency_ms'])
+                    for website in websites
+                }
+                print("   ✅ " + ", ".join(f"{website}: {result['visibility_score']}"
+                                         for website, result in prompt_results.items()))
+            except Exception as e:
+                print(f"   ❌ Test hatası: {e}")
+                error = self.error_result(prompt, e, round((time.perf_counter() - started) * 1000))
+                prompt_results = {website: dict(error) for website in websites}
+            
+            for website, result in prompt_results.items():
+                results[website].append(result)
+            if progress_callback:
+                await progress_callback(i + 1, len(test_prompts), prompt_results)
+            
+            # Rate limiting
+            if i + 1 < len(test_prompts):
+                await asyncio.sleep(3)
+        
+        summaries = {website: self.calculate_summary(website_results) for website, website_results in results.items()}
+        return {
+            'websites': websites,
+            'prompts': test_prompts,
+            'results': results,
+            'summaries': summaries,
+            'share_of_voice': self.calculate_share_of_voice(summaries),
+            'completion_time': datetime.now().isoformat()
+        }
+    
+    def calculate_share_of_voice(self, summaries: dict) -> list:
+        """Sitelerin toplam bahsedilmeler içindeki payı (%) - en çok bahsedilen, eşitlikte daha üst sıradaki önce"""
+        total_mentions = sum(summary['mentioned_count'] for summary in summaries.values())
+        rows = [
+            {
+                'website': website,
+                'mentioned_count': summary['mentioned_count'],
+                'share_of_voice': round(summary['mentioned_count'] / total_mentions * 100, 1) if total_mentions else 0,
+                'mention_rate': summary['mention_rate'],
+                'average_visibility_score': summary['average_visibility_score'],
+                'average_rank': summary['average_rank']
+            }
+            for website, summary in summaries.items()
         ]
-        for variant in otel_variants:
-            if variant in response_lower:
-                score += 15
-                break
-
-        # 6. Fuzzy matching (rapidfuzz)
-        all_names = [company_name, short_name] + otel_variants
-        for name in all_names:
-            if not name.strip():
-                continue
-            fuzz_ratio = fuzz.partial_ratio(name, response_lower)
-            if fuzz_ratio > 80:
-                score += 15
-                break
-
-        # 7. difflib ile yakın eşleşme
-        words = response_lower.split()
-        for name in all_names:
-            if not name.strip():
-                continue
-            matches = difflib.get_close_matches(name, words, n=1, cutoff=0.85)
-            if matches:
-                score += 10
-                break
-
-        return max(0, min(score, 100))
+        return sorted(rows, key=lambda row: (-row['share_of_voice'], row['average_rank'] or float('inf'),
+                                             -row['average_visibility_score']))
+    
+    # Tek sinyal gereken çağıranlar için - hepsi aynı ResponseAnalyzer'ı kullanır
+    def is_mentioned(self, response: str, website: str) -> bool:
+        return ResponseAnalyzer(website).analyze(response)['mentioned']
+    
+    def calculate_visibility_score(self, response: str, website: str) -> int:
+        return ResponseAnalyzer(website).analyze(response)['visibility_score']
     
     def extract_ranking(self, response: str, website: str) -> str:
         """Ranking bilgisini çıkar"""
-        response_lower = response.lower()
-        domain = website.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0]
-        company_name = domain.split('.')[0].lower()
-        
-        # Special handling for Turkish companies
-        company_variations = [company_name]
-        if company_name == "kahvedunyasi":
-            company_variations.extend(["kahve dünyası", "kahve dünyasi", "kahvedünyası", "kahvedünyasi"])
-        elif company_name == "workexe":
-            company_variations.extend(["work exe", "workex"])
-        elif company_name == "ahrefs":
-            company_variations.extend(["ah refs", "ahref"])
-        
-        company_found = any(variation in response_lower for variation in company_variations)
-        
-        if company_found:
-            if any(word in response_lower for word in ['birinci', 'first', '1.', 'en iyi']):
-                return "1st"
-            elif any(word in response_lower for word in ['ikinci', 'second', '2.']):
-                return "2nd"
-            elif any(word in response_lower for word in ['üçüncü', 'third', '3.']):
-                return "3rd"
-            elif any(word in response_lower for word in ['önde gelen', 'lider', 'top', 'büyük']):
-                return "Top 10"
-            else:
-                return "Mentioned"
-        
-        return "Not Ranked"
+        return ResponseAnalyzer(website).analyze(response)['ranking']
     
     def analyze_sentiment(self, response: str, website: str) -> str:
-        """Sentiment analizi"""
-        response_lower = response.lower()
-        domain = website.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0]
-        company_name = domain.split('.')[0].lower()
-        
-        # Special handling for Turkish companies
-        company_variations = [company_name]
-        if company_name == "kahvedunyasi":
-            company_variations.extend(["kahve dünyası", "kahve dünyasi", "kahvedünyası", "kahvedünyasi"])
-        elif company_name == "workexe":
-            company_variations.extend(["work exe", "workex"])
-        elif company_name == "ahrefs":
-            company_variations.extend(["ah refs", "ahref"])
-        
-        company_found = any(variation in response_lower for variation in company_variations)
-        
-        if not company_found:
-            return "neutral"
-        
-        positive_words = ['mükemmel', 'harika', 'en iyi', 'önerir', 'güvenilir', 'profesyonel', 'kaliteli', 'başarılı', 'popüler', 'büyük', 'geniş']
-        negative_words = ['kötü', 'berbat', 'tavsiye etmem', 'sorunlu', 'yetersiz', 'güvenilmez']
-        
-        positive_count = sum(1 for word in positive_words if word in response_lower)
-        negative_count = sum(1 for word in negative_words if word in response_lower)
-        
-        if positive_count > negative_count:
-            return "positive"
-        elif negative_count > positive_count:
-            return "negative"
-        else:
-            return "neutral"
+        """Sentiment analizi (markanın geçtiği yerlerin çevresinde)"""
+        return ResponseAnalyzer(website).analyze(response)['sentiment']
     
     def calculate_summary(self, results: list) -> dict:
         """Test sonuçlarının özetini çıkar"""
@@ -269,6 +270,10 @@ class SimpleAITester:
         else:
             avg_score = 0
         
+        # Ortalama sıra sadece yanıtta listelenen testlerden (hiç sıralanmadıysa 0)
+        positions = [r['rank_position'] for r in results if r.get('rank_position')]
+        avg_rank = sum(positions) / len(positions) if positions else 0
+        
         # Sentiment breakdown
         sentiments = [r.get('sentiment', 'neutral') for r in results if r.get('mentioned', False)]
         sentiment_breakdown = {
@@ -289,6 +294,8 @@ class SimpleAITester:
             'mentioned_count': mentioned_count,
             'mention_rate': round((mentioned_count / successful_tests) * 100, 1) if successful_tests > 0 else 0,
             'average_visibility_score': round(avg_score, 1),
+            'average_rank': round(avg_rank, 2),
+            'ranked_count': len(positions),
             'sentiment_breakdown': sentiment_breakdown,
             'best_performing_prompt': best_prompt,
             'recommendation': self.get_recommendation(avg_score, mentioned_count, successful_tests)
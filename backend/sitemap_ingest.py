@@ -0,0 +1,286 @@
+# backend/sitemap_ingest.py
+import os
+import zlib
+import heapq
+import sqlite3
+import logging
+import argparse
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit, urljoin
+from urllib.robotparser import RobotFileParser
+import xml.etree.ElementTree as ET
+
+import requests
+from dotenv import load_dotenv
+
+from content_fetcher import DEFAULT_HEADERS, FETCH_CHUNK_SIZE
+from url_canonicalizer import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+# ⚙️ Sitemap ayarları
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024  # sitemaps.org: sıkıştırılmamış en fazla 50 MB
+SITEMAP_MAX_DEPTH = 3  # sitemap index içinde index
+SITEMAP_BATCH_SIZE = int(os.getenv("SITEMAP_BATCH_SIZE", "500"))
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def _local_name(tag: str) -> str:
+    """'{namespace}url' -> 'url'"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def normalize_lastmod(value: Optional[str]) -> Optional[str]:
+    """W3C datetime lastmod değerini sıralanabilir ISO formatına çevir"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed.isoformat()
+
+
+def iter_sitemap_entries(sitemap_url: str, timeout: int = 30) -> Iterator[Tuple[str, str, Optional[str]]]:
+    """Sitemap'i stream ederek oku: ('url' | 'sitemap', loc, lastmod) üretir
+
+    Gzip'li sitemap'ler parça parça açılır, XML artımlı parser ile işlenir ve
+    işlenen elementler silinir - bellek kullanımı dosya boyutundan bağımsızdır.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    state = {'root': None, 'loc': None, 'lastmod': None}
+
+    def drain():
+        for event, elem in parser.read_events():
+            if event == 'start':
+                if state['root'] is None:
+                    state['root'] = elem
+                continue
+            name = _local_name(elem.tag)
+            if name == 'loc':
+                state['loc'] = (elem.text or '').strip()
+            elif name == 'lastmod':
+                state['lastmod'] = normalize_lastmod(elem.text)
+            elif name in ('url', 'sitemap'):
+                if state['loc']:
+                    yield name, state['loc'], state['lastmod']
+                state['loc'] = None
+                state['lastmod'] = None
+                # İşlenen elementleri bırak - sabit bellek
+                state['root'].clear()
+
+    decompressor = None
+    bytes_read = 0
+    first_chunk = True
+
+    with requests.get(sitemap_url, headers=DEFAULT_HEADERS, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+
+        for chunk in response.iter_content(chunk_size=FETCH_CHUNK_SIZE):
+            if not chunk:
+                continue
+            if first_chunk:
+                # .xml.gz dosyaları Content-Encoding olmadan gzip olarak gelir
+                if chunk.startswith(GZIP_MAGIC):
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                first_chunk = False
+            if decompressor:
+                chunk = decompressor.decompress(chunk)
+
+            bytes_read += len(chunk)
+            if bytes_read > SITEMAP_MAX_BYTES:
+                logger.warning(f"Sitemap boyut limiti aşıldı, kalan kısım atlandı: {sitemap_url}")
+                return
+            parser.feed(chunk)
+            yield from drain()
+
+        if decompressor:
+            parser.feed(decompressor.flush())
+            yield from drain()
+
+
+def discover_sitemaps(site_url: str) -> List[str]:
+    """Site kökü verildiyse robots.txt'deki Sitemap: satırlarını kullan"""
+    parts = urlsplit(site_url)
+    if parts.path.endswith(('.xml', '.gz')):
+        return [site_url]
+
+    base = f"{parts.scheme}://{parts.netloc}"
+    try:
+        response = requests.get(f"{base}/robots.txt", headers=DEFAULT_HEADERS, timeout=10)
+        if response.status_code == 200:
+            robots = RobotFileParser()
+            robots.parse(response.text.splitlines())
+            sitemaps = robots.site_maps()
+            if sitemaps:
+                return sitemaps
+    except requests.RequestException as e:
+        logger.warning(f"robots.txt okunamadı ({base}): {str(e)}")
+    return [urljoin(base, '/sitemap.xml')]
+
+
+class SitemapIngestor:
+    """Sitemap'lerdeki URL'leri sayfa çekmeden toplu olarak urls tablosuna ekler"""
+
+    def __init__(self, db_path: str = 'ai_visibility.db', batch_size: int = SITEMAP_BATCH_SIZE,
+                 max_urls: Optional[int] = None, supabase_client=None):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.max_urls = max_urls
+        self.supabase_client = supabase_client
+        if not supabase_client:
+            self.ensure_schema()
+
+    def ensure_schema(self):
+        """urls tablosunda lastmod/source kolonlarını garanti et"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(urls)")
+        columns = [column[1] for column in cursor.fetchall()]
+        if columns and 'lastmod' not in columns:
+            cursor.execute('ALTER TABLE urls ADD COLUMN lastmod TEXT')
+        if columns and 'source' not in columns:
+            cursor.execute("ALTER TABLE urls ADD COLUMN source TEXT DEFAULT 'manual'")
+        conn.commit()
+        conn.close()
+
+    def _insert_batch(self, batch: List[Dict]) -> int:
+        """Bir batch'i tek transaction'da ekle, eklenen satır sayısını döndür"""
+        if not batch:
+            return 0
+        now = datetime.now()
+
+        if self.supabase_client:
+            response = self.supabase_client.table('urls').upsert([
+                {
+                    'url': row['url'],
+                    'canonical_url': row['canonical_url'],
+                    'status': 'active',
+                    'lastmod': row['lastmod'],
+                    'source': 'sitemap',
+                    'created_at': now.isoformat(),
+                    'updated_at': now.isoformat()
+                }
+                for row in batch
+            ], on_conflict='canonical_url', ignore_duplicates=True).execute()
+            return len(response.data or [])
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            before = conn.total_changes
+            with conn:
+                conn.executemany('''
+                    INSERT OR IGNORE INTO urls (url, canonical_url, status, lastmod, source, created_at, updated_at)
+                    VALUES (?, ?, 'active', ?, 'sitemap', ?, ?)
+                ''', [(row['url'], row['canonical_url'], row['lastmod'], now, now) for row in batch])
+            return conn.total_changes - before
+        finally:
+            conn.close()
+
+    def ingest(self, sitemap_url: str) -> Dict:
+        """Sitemap (veya sitemap index) içindeki tüm URL'leri ekle"""
+        start_time = datetime.now()
+        stats = {
+            'sitemaps_processed': 0,
+            'urls_seen': 0,
+            'urls_inserted': 0,
+            'duplicates': 0,
+            'errors': []
+        }
+
+        # Öncelik kuyruğu: lastmod'u en yeni olan sitemap önce işlenir
+        queue = []
+        counter = 0
+        for url in discover_sitemaps(sitemap_url):
+            heapq.heappush(queue, ('', counter, url, 0))
+            counter += 1
+        visited = set()
+
+        batch = []
+        batch_keys = set()
+
+        while queue and not self._budget_exhausted(stats, batch):
+            _, _, current, depth = heapq.heappop(queue)
+            if current in visited:
+                continue
+            visited.add(current)
+            logger.info(f"Sitemap işleniyor: {current}")
+
+            try:
+                for kind, loc, lastmod in iter_sitemap_entries(current):
+                    if kind == 'sitemap':
+                        if depth < SITEMAP_MAX_DEPTH:
+                            # lastmod azalan sıralama için ters anahtar
+                            heapq.heappush(queue, (_reverse_key(lastmod), counter, loc, depth + 1))
+                            counter += 1
+                        continue
+
+                    if urlsplit(loc).scheme not in ('http', 'https'):
+                        continue
+                    stats['urls_seen'] += 1
+                    canonical = canonicalize_url(loc)
+                    if canonical in batch_keys:
+                        stats['duplicates'] += 1
+                        continue
+                    batch_keys.add(canonical)
+                    batch.append({'url': loc, 'canonical_url': canonical, 'lastmod': lastmod})
+
+                    if len(batch) >= self.batch_size:
+                        inserted = self._insert_batch(batch)
+                        stats['urls_inserted'] += inserted
+                        stats['duplicates'] += len(batch) - inserted
+                        batch = []
+                        batch_keys = set()
+
+                    if self._budget_exhausted(stats, batch):
+                        break
+
+                stats['sitemaps_processed'] += 1
+
+            except Exception as e:
+                logger.error(f"Sitemap okunamadı ({current}): {str(e)}")
+                stats['errors'].append({'sitemap': current, 'error': str(e)})
+
+        inserted = self._insert_batch(batch)
+        stats['urls_inserted'] += inserted
+        stats['duplicates'] += len(batch) - inserted
+
+        stats['duration'] = str(datetime.now() - start_time)
+        logger.info(f"Sitemap ingest tamamlandı: {stats['urls_inserted']} yeni URL, {stats['duplicates']} tekrar")
+        return stats
+
+    def _budget_exhausted(self, stats: Dict, batch: List) -> bool:
+        if not self.max_urls:
+            return False
+        return stats['urls_inserted'] + len(batch) >= self.max_urls
+
+
+def _reverse_key(lastmod: Optional[str]) -> str:
+    """heapq min-heap olduğu için lastmod'u ters çevir (yeni olan önce, lastmod'suz en son)"""
+    if not lastmod:
+        return '\uffff'
+    return ''.join(chr(0xFFFF - ord(ch)) for ch in lastmod)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Sitemap'ten urls tablosuna toplu URL ekle")
+    arg_parser.add_argument('sitemap_url', help="Sitemap / sitemap index URL'si veya site kökü")
+    arg_parser.add_argument('--max-urls', type=int, default=None, help='En fazla eklenecek URL sayısı')
+    arg_parser.add_argument('--batch-size', type=int, default=SITEMAP_BATCH_SIZE, help='Transaction başına satır')
+    arg_parser.add_argument('--db-path', default='ai_visibility.db')
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+
+    client = None
+    if os.getenv("USE_SUPABASE", "false").lower() == "true":
+        from supabase import create_client
+        client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+
+    ingestor = SitemapIngestor(db_path=args.db_path, batch_size=args.batch_size,
+                               max_urls=args.max_urls, supabase_client=client)
+    result = ingestor.ingest(args.sitemap_url)
+    print(f"Sonuç: {result}")
@@ -0,0 +1,303 @@
+# backend/tenant_quota.py
+import os
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = 'default'
+
+
+def parse_tenant_weights(raw: str) -> Dict[str, float]:
+    """'acme=3,beta=1' -> {'acme': 3.0, 'beta': 1.0} (hatalı parçalar atlanır)"""
+    weights = {}
+    for part in (raw or '').split(','):
+        name, _, value = part.partition('=')
+        name = name.strip().lower()
+        if not name or not value.strip():
+            continue
+        try:
+            weight = float(value)
+        except ValueError:
+            logger.warning(f"Geçersiz tenant ağırlığı atlandı: {part.strip()}")
+            continue
+        if weight > 0:
+            weights[name] = weight
+    return weights
+
+
+# ⚙️ Tenant kota ayarları (.env üzerinden değiştirilebilir)
+TENANT_WEIGHTS = parse_tenant_weights(os.getenv("TENANT_WEIGHTS", ""))  # Belirtilmeyen tenant'ın ağırlığı 1
+TENANT_MAX_LLM_CONCURRENCY = int(os.getenv("TENANT_MAX_LLM_CONCURRENCY", "0"))  # Process başına, tenant'ın aynı anda LLM çağrısı, 0 = sınırsız
+TENANT_MAX_RUNNING_JOBS = int(os.getenv("TENANT_MAX_RUNNING_JOBS", "0"))  # Tüm worker'larda tenant başına çalışan iş (jobs tablosundan), 0 = sınırsız
+TENANT_MAX_CLAIM = int(os.getenv("TENANT_MAX_CLAIM", "0"))  # Tek claim turunda tenant başına URL (worker başına), 0 = sınırsız
+TENANT_USAGE_FLUSH_SECONDS = float(os.getenv("TENANT_USAGE_FLUSH_SECONDS", "30"))
+
+# tenant_usage tablosunda gün bazında toplanan sayaçlar
+USAGE_FIELDS = ('llm_calls', 'llm_errors', 'llm_seconds', 'llm_wait_seconds',
+                'fetches', 'fetch_errors', 'jobs', 'job_seconds')
+
+
+def tenant_for_website(website: Optional[str], workspace_id: Optional[str] = None) -> str:
+    """Workspace verilmişse o, yoksa sitenin host'u (www'siz) - ikisi de yoksa DEFAULT_TENANT"""
+    if workspace_id and str(workspace_id).strip():
+        return str(workspace_id).strip().lower()
+    website = (website or '').strip()
+    if not website:
+        return DEFAULT_TENANT
+    if '://' not in website:
+        website = f"https://{website}"
+    host = (urlsplit(website).hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return host or DEFAULT_TENANT
+
+
+def tenant_for_payload(payload: Optional[Dict]) -> str:
+    payload = payload or {}
+    return tenant_for_website(payload.get('website'), payload.get('workspace_id'))
+
+
+def tenant_weight(tenant: str, weights: Optional[Dict[str, float]] = None) -> float:
+    return (TENANT_WEIGHTS if weights is None else weights).get(tenant, 1.0)
+
+
+class FairQueue:
+    """Tenant'lar arası ağırlıklı adil sıra (start-time fair queuing), tenant içinde FIFO
+
+    Her öğeye sanal bir bitiş zamanı verilir: başlangıç = max(sanal saat, tenant'ın son bitişi),
+    bitiş = başlangıç + 1/ağırlık. En küçük bitişli öğe önce çıkar; yoğun tenant'ın öğeleri
+    ileriye itilir, boşta kalıp yeni gelen küçük tenant sıranın başına yakın girer.
+    Sıra bellektedir: adalet sadece aynı process'teki bekleyenler arasında sağlanır.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights = weights
+        self._queues: Dict[str, deque] = {}
+        self._last_finish: Dict[str, float] = {}
+        self._virtual_time = 0.0
+
+    def push(self, tenant: str, item: Any):
+        start = max(self._virtual_time, self._last_finish.get(tenant, 0.0))
+        finish = start + 1.0 / tenant_weight(tenant, self.weights)
+        self._last_finish[tenant] = finish
+        self._queues.setdefault(tenant, deque()).append((start, finish, item))
+
+    def pop(self, eligible: Optional[Callable[[str], bool]] = None) -> Optional[Tuple[str, Any]]:
+        """eligible(tenant) True olan tenant'lar arasından sıradaki öğe - yoksa None"""
+        best = None
+        for tenant, queue in self._queues.items():
+            if eligible and not eligible(tenant):
+                continue
+            if best is None or queue[0][1] < self._queues[best][0][1]:
+                best = tenant
+        if best is None:
+            return None
+
+        start, _, item = self._queues[best].popleft()
+        if not self._queues[best]:
+            del self._queues[best]
+        self._virtual_time = max(self._virtual_time, start)
+        # Boştaki tenant'ların geçmişi birikmesin - zaten sanal saatin gerisindeler
+        for tenant in [t for t, finish in self._last_finish.items()
+                       if t not in self._queues and finish <= self._virtual_time]:
+            del self._last_finish[tenant]
+        return best, item
+
+    def remove(self, tenant: str, item: Any) -> bool:
+        queue = self._queues.get(tenant)
+        if not queue:
+            return False
+        for entry in queue:
+            if entry[2] is item:
+                queue.remove(entry)
+                if not queue:
+                    del self._queues[tenant]
+                return True
+        return False
+
+    def depths(self) -> Dict[str, int]:
+        return {tenant: len(queue) for tenant, queue in self._queues.items()}
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+
+class _BaseUsageStore:
+    """tenant_usage tablosu - (gün, tenant) başına sayaçlar artırılarak yazılır"""
+
+    placeholder = '?'
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def _sql(self, query: str) -> str:
+        return query if self.placeholder == '?' else query.replace('?', self.placeholder)
+
+    def add(self, rows: List[Tuple[str, str, Dict[str, float]]]):
+        """(gün, tenant, sayaçlar) satırlarını mevcut değerlerin üzerine ekle"""
+        if not rows:
+            return
+        columns = ', '.join(USAGE_FIELDS)
+        values = ', '.join('?' for _ in USAGE_FIELDS)
+        updates = ', '.join(f"{field} = tenant_usage.{field} + excluded.{field}" for field in USAGE_FIELDS)
+        conn = self._connect()
+        try:
+            conn.cursor().executemany(self._sql(f'''
+                INSERT INTO tenant_usage (day, tenant, {columns}) VALUES (?, ?, {values})
+                ON CONFLICT (day, tenant) DO UPDATE SET {updates}
+            '''), [
+                (day, tenant, *(amounts.get(field, 0) for field in USAGE_FIELDS))
+                for day, tenant, amounts in rows
+            ])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def summary(self, days: int = 7, tenant: Optional[str] = None) -> List[Dict]:
+        """Son 'days' gün için tenant başına toplam kullanım (LLM süresine göre sıralı)"""
+        since = time.strftime('%Y-%m-%d', time.gmtime(time.time() - max(days - 1, 0) * 86400))
+        sums = ', '.join(f"SUM({field}) AS {field}" for field in USAGE_FIELDS)
+        query = f"SELECT tenant, {sums} FROM tenant_usage WHERE day >= ?"
+        params = [since]
+        if tenant:
+            query += " AND tenant = ?"
+            params.append(tenant)
+        query += " GROUP BY tenant ORDER BY SUM(llm_seconds) DESC"
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(query), tuple(params))
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+
+class SQLiteUsageStore(_BaseUsageStore):
+
+    def __init__(self, db_path: str = 'ai_visibility.db'):
+        self.db_path = db_path
+        self.ensure_schema()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def ensure_schema(self):
+        counters = ',\n'.join(f"{field} REAL DEFAULT 0" for field in USAGE_FIELDS)
+        conn = self._connect()
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS tenant_usage (
+                day TEXT NOT NULL,
+                tenant TEXT NOT NULL,
+                {counters},
+                PRIMARY KEY (day, tenant)
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+
+class PostgresUsageStore(_BaseUsageStore):
+
+    placeholder = '%s'
+
+    def __init__(self, dsn: Optional[str] = None):
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        self.ensure_schema()
+
+    def _connect(self):
+        import psycopg2
+        return psycopg2.connect(self.dsn)
+
+    def ensure_schema(self):
+        counters = ',\n'.join(f"{field} DOUBLE PRECISION DEFAULT 0" for field in USAGE_FIELDS)
+        conn = self._connect()
+        try:
+            conn.cursor().execute(f'''
+                CREATE TABLE IF NOT EXISTS tenant_usage (
+                    day TEXT NOT NULL,
+                    tenant TEXT NOT NULL,
+                    {counters},
+                    PRIMARY KEY (day, tenant)
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def create_usage_store(db_path: str = 'ai_visibility.db', use_postgres: bool = False):
+    """Postgres için DATABASE_URL gerekir - yoksa yerel SQLite kullanılır"""
+    if use_postgres and os.getenv("DATABASE_URL"):
+        return PostgresUsageStore()
+    return SQLiteUsageStore(db_path)
+
+
+class UsageLedger:
+    """Tenant kullanımını bellekte biriktirir, periyodik olarak tenant_usage'a ekler
+
+    Her çağrıda veritabanına yazılmaz; flush() bekleyen farkları tek executemany ile yazar.
+    Yazma başarısız olursa farklar kaybolmaz, sonraki flush'a kalır.
+    """
+
+    def __init__(self, store=None):
+        self.store = store
+        self._pending: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, store):
+        self.store = store
+
+    def record(self, tenant: Optional[str], **amounts: float):
+        tenant = tenant or DEFAULT_TENANT
+        key = (time.strftime('%Y-%m-%d', time.gmtime()), tenant)
+        with self._lock:
+            pending = self._pending.setdefault(key, {})
+            totals = self._totals.setdefault(tenant, {field: 0 for field in USAGE_FIELDS})
+            for field, amount in amounts.items():
+                pending[field] = pending.get(field, 0) + amount
+                totals[field] = totals.get(field, 0) + amount
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Bu process başladığından beri tenant başına kullanım"""
+        with self._lock:
+            return {tenant: {field: round(value, 3) for field, value in totals.items()}
+                    for tenant, totals in self._totals.items()}
+
+    def flush(self) -> int:
+        """Bekleyen farkları yaz, yazılan satır sayısını döndür"""
+        if self.store is None:
+            return 0
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            self.store.add([(day, tenant, amounts) for (day, tenant), amounts in pending.items()])
+        except Exception as e:
+            logger.error(f"Tenant kullanımı yazılamadı: {str(e)}")
+            with self._lock:
+                for key, amounts in pending.items():
+                    merged = self._pending.setdefault(key, {})
+                    for field, amount in amounts.items():
+                        merged[field] = merged.get(field, 0) + amount
+            return 0
+        return len(pending)
+
+    async def run(self, interval: float = TENANT_USAGE_FLUSH_SECONDS):
+        """API process'inde arka planda periyodik flush"""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.flush)
+
+
+# Process içindeki tüm LLM/fetch/iş sayaçları bu örneğe yazılır
+usage_ledger = UsageLedger()
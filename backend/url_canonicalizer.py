@@ -0,0 +1,71 @@
+# backend/url_canonicalizer.py
+import re
+import posixpath
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 🧹 Takip parametreleri - içerik değiştirmeyen, sadece kampanya/analitik için eklenen alanlar
+TRACKING_PARAMS = {
+    'gclid', 'dclid', 'gbraid', 'wbraid', 'fbclid', 'msclkid', 'yclid', 'twclid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi', 'ref', 'ref_src', 'srsltid'
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'mtm_')
+
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def is_tracking_param(name: str) -> bool:
+    """Query parametresi takip amaçlı mı?"""
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize_url(url: str) -> str:
+    """URL'yi tekilleştirme anahtarı olarak kullanılacak kanonik forma getir
+
+    - http/https aynı kabul edilir (https'e çevrilir)
+    - host küçük harfe çevrilir, 'www.' ve varsayılan port atılır
+    - fragment ve takip parametreleri (utm_*, gclid, fbclid...) atılır
+    - kalan query parametreleri sıralanır
+    - sondaki '/' kaldırılır (kök dahil)
+    """
+    parts = urlsplit(url.strip())
+    original_scheme = parts.scheme.lower()
+    scheme = original_scheme
+    if scheme == 'http':
+        scheme = 'https'
+
+    host = (parts.hostname or '').rstrip('.')
+    try:
+        host = host.encode('idna').decode('ascii')
+    except UnicodeError:
+        pass
+    host = host.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host
+    if port and str(port) != DEFAULT_PORTS.get(original_scheme):
+        netloc = f"{host}:{port}"
+
+    path = re.sub(r'/{2,}', '/', parts.path or '')
+    if path:
+        normalized = posixpath.normpath(path)
+        path = '' if normalized in ('.', '/') else normalized
+    path = path.rstrip('/')
+
+    query_items = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking_param(key)
+    ]
+    query = urlencode(sorted(query_items))
+
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def canonical_host(url: str) -> str:
+    """Kanonik host adı (www. olmadan, küçük harf)"""
+    return urlsplit(canonicalize_url(url)).netloc
@@ -0,0 +1,479 @@
+# backend/url_frontier.py
+import os
+import time
+import uuid
+import socket
+import random
+import sqlite3
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from tenant_quota import tenant_for_website, TENANT_WEIGHTS, TENANT_MAX_CLAIM
+
+logger = logging.getLogger(__name__)
+
+# ⚙️ Frontier ayarları (.env üzerinden değiştirilebilir)
+FRONTIER_BATCH_SIZE = int(os.getenv("FRONTIER_BATCH_SIZE", "10"))
+REVISIT_DEFAULT_SECONDS = float(os.getenv("REVISIT_DEFAULT_SECONDS", str(24 * 3600)))
+REVISIT_MIN_SECONDS = float(os.getenv("REVISIT_MIN_SECONDS", str(3600)))
+REVISIT_MAX_SECONDS = float(os.getenv("REVISIT_MAX_SECONDS", str(30 * 24 * 3600)))
+RETRY_BASE_SECONDS = 300  # İlk hatadan sonra 5 dk, sonra 2 katına çıkar
+RETRY_MAX_SECONDS = 24 * 3600
+MAX_ERROR_COUNT = int(os.getenv("FRONTIER_MAX_ERRORS", "8"))  # Bu kadar ardışık hatadan sonra URL 'error' olur
+LEASE_SECONDS = float(os.getenv("FRONTIER_LEASE_SECONDS", "600"))  # Worker çökerse URL bu süre sonra tekrar alınır
+
+# Sayfa değiştiğinde aralık kısalır, değişmediğinde uzar
+INTERVAL_SHRINK = 0.5
+INTERVAL_GROW = 1.5
+
+
+def make_worker_id() -> str:
+    """Lease sahibi kimliği: host:pid:rastgele"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def content_hash(text: str) -> str:
+    """Sayfa metninin özeti - değişiklik tespiti için"""
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+def retry_delay(error_count: int) -> float:
+    """Üstel geri çekilme (jitter'lı): 5dk, 10dk, 20dk ... en fazla 24 saat"""
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * (2 ** max(0, error_count - 1)))
+    return delay * random.uniform(0.9, 1.1)
+
+
+def adapt_interval(interval: float, changed: bool) -> float:
+    """Gözlenen değişikliğe göre tekrar ziyaret aralığını ayarla"""
+    interval = interval * (INTERVAL_SHRINK if changed else INTERVAL_GROW)
+    return max(REVISIT_MIN_SECONDS, min(REVISIT_MAX_SECONDS, interval))
+
+
+def change_priority(change_count: int, check_count: int) -> float:
+    """Sayfanın bir sonraki ziyarette değişmiş olma olasılığı (Laplace düzeltmeli)"""
+    return (change_count + 1) / (check_count + 2)
+
+
+class _BaseURLFrontier:
+    """SQLite ve Postgres frontier'larının ortak mantığı (sorgular '?' ile yazılır)"""
+
+    placeholder = '?'
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def _sql(self, query: str) -> str:
+        return query if self.placeholder == '?' else query.replace('?', self.placeholder)
+
+    def _fetch_dicts(self, cursor) -> List[Dict]:
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def sync(self):
+        """Frontier'da olmayan aktif URL'leri hemen vadesi gelmiş olarak ekle"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql('''
+                INSERT INTO url_frontier (url_id, next_due_at, priority, revisit_interval)
+                SELECT id, 0, 1.0, ? FROM urls
+                WHERE status = 'active'
+                ON CONFLICT (url_id) DO NOTHING
+            '''), (REVISIT_DEFAULT_SECONDS,))
+            # Workspace'i belirtilmemiş URL'ler (sitemap, keşif, eski kayıtlar) sitenin host'una düşer
+            cursor.execute('SELECT id, url FROM urls WHERE workspace_id IS NULL')
+            missing = cursor.fetchall()
+            if missing:
+                cursor.executemany(
+                    self._sql('UPDATE urls SET workspace_id = ? WHERE id = ?'),
+                    [(tenant_for_website(url), url_id) for url_id, url in missing]
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def due(self, limit: int = FRONTIER_BATCH_SIZE) -> List[Dict]:
+        """Vadesi gelmiş ve kiralanmamış URL'ler - değişme olasılığı yüksek olan önce (salt okunur)"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            now = time.time()
+            cursor.execute(self._sql(self.DUE_QUERY), (now, now, limit))
+            return self._fetch_dicts(cursor)
+        finally:
+            conn.close()
+
+    def last_content_hash(self, canonical_url: str) -> Optional[str]:
+        """URL'nin son ziyarette görülen içerik özeti (henüz ziyaret edilmediyse None)"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._sql('''
+                SELECT f.last_content_hash FROM url_frontier f
+                JOIN urls u ON u.id = f.url_id
+                WHERE u.canonical_url = ?
+            '''), (canonical_url,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    DUE_QUERY = '''
+        SELECT u.*, f.next_due_at, f.priority, f.error_count, f.revisit_interval,
+               f.last_content_hash, f.check_count, f.change_count
+        FROM url_frontier f
+        JOIN urls u ON u.id = f.url_id
+        WHERE u.status = 'active' AND f.next_due_at <= ?
+          AND (f.lease_expires_at IS NULL OR f.lease_expires_at <= ?)
+        ORDER BY f.priority DESC, f.next_due_at ASC, u.lastmod DESC NULLS LAST
+        LIMIT ?
+    '''
+
+    def _fair_due_query(self, per_tenant: int = TENANT_MAX_CLAIM) -> Tuple[str, tuple]:
+        """Vadesi gelen URL'leri workspace'ler arasında ağırlıklı sırayla dağıt
+
+        Her workspace kendi içinde DUE_QUERY sırasıyla numaralanır, sonra sıra/ağırlık ile
+        harmanlanır: çok URL'si olan workspace turu doldurmaz, küçük workspace'in URL'leri
+        her turda öne gelir. Parametreler: now, now, *dönen parametreler, limit
+        """
+        weight_sql, weight_params = '1.0', ()
+        if TENANT_WEIGHTS:
+            weight_sql = 'CASE workspace_id ' + ' '.join('WHEN ? THEN ?' for _ in TENANT_WEIGHTS) + ' ELSE 1.0 END'
+            weight_params = tuple(value for item in TENANT_WEIGHTS.items() for value in item)
+        tenant_limit, limit_params = '', ()
+        if per_tenant > 0:
+            tenant_limit, limit_params = 'WHERE tenant_rank <= ?', (per_tenant,)
+        query = f'''
+            SELECT * FROM (
+                SELECT u.*, f.next_due_at, f.priority, f.error_count, f.revisit_interval,
+                       f.last_content_hash, f.check_count, f.change_count,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY u.workspace_id
+                           ORDER BY f.priority DESC, f.next_due_at ASC, u.lastmod DESC NULLS LAST
+                       ) AS tenant_rank
+                FROM url_frontier f
+                JOIN urls u ON u.id = f.url_id
+                WHERE u.status = 'active' AND f.next_due_at <= ?
+                  AND (f.lease_expires_at IS NULL OR f.lease_expires_at <= ?)
+            ) ranked
+            {tenant_limit}
+            ORDER BY tenant_rank / {weight_sql} ASC, priority DESC, next_due_at ASC
+            LIMIT ?
+        '''
+        return query, limit_params + weight_params
+
+    def claim(self, worker_id: str, limit: int = FRONTIER_BATCH_SIZE,
+              lease_seconds: float = LEASE_SECONDS) -> List[Dict]:
+        """Vadesi gelmiş URL'leri atomik olarak bu worker'a kirala - başka worker aynı URL'yi alamaz"""
+        raise NotImplementedError
+
+    def release(self, url_id: int, worker_id: str):
+        """İşlenmeden bırakılan URL'nin kirasını kaldır"""
+        conn = self._connect()
+        try:
+            conn.cursor().execute(self._sql('''
+                UPDATE url_frontier SET lease_owner = NULL, lease_expires_at = NULL
+                WHERE url_id = ? AND lease_owner = ?
+            '''), (url_id, worker_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def defer(self, url_id: int, worker_id: str, seconds: float):
+        """URL'yi hata saymadan ertele (ör. robots.txt geçici olarak okunamadı) ve kirayı bırak"""
+        conn = self._connect()
+        try:
+            conn.cursor().execute(self._sql('''
+                UPDATE url_frontier SET next_due_at = ?, lease_owner = NULL, lease_expires_at = NULL
+                WHERE url_id = ? AND lease_owner = ?
+            '''), (time.time() + seconds, url_id, worker_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _get_state(self, cursor, url_id: int) -> Optional[Dict]:
+        cursor.execute(self._sql('''
+            SELECT revisit_interval, last_content_hash, check_count, change_count, error_count
+            FROM url_frontier WHERE url_id = ?
+        '''), (url_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        columns = [column[0] for column in cursor.description]
+        return dict(zip(columns, row))
+
+    def content_changed(self, url_id: int, page_hash: str) -> bool:
+        """Sayfa son kaydedilen ziyaretten beri değişmiş mi (salt okunur - hash'i record_success yazar)"""
+        conn = self._connect()
+        try:
+            state = self._get_state(conn.cursor(), url_id)
+            return not state or state['last_content_hash'] != page_hash
+        finally:
+            conn.close()
+
+    def record_success(self, url_id: int, page_hash: str, worker_id: str) -> bool:
+        """Ziyaret tamamlandı: hash'i, aralığı ve önceliği güncelle - içerik değiştiyse True
+
+        Değişen sayfada sonuçlar kaydedildikten sonra çağrılır; analiz yarıda kalırsa eski hash
+        kalır ve sayfa bir sonraki turda tekrar analiz edilir. Kira başka worker'a geçtiyse yazılmaz.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            state = self._get_state(cursor, url_id) or {
+                'revisit_interval': REVISIT_DEFAULT_SECONDS, 'last_content_hash': None,
+                'check_count': 0, 'change_count': 0, 'error_count': 0
+            }
+
+            first_check = state['last_content_hash'] is None
+            changed = first_check or state['last_content_hash'] != page_hash
+            interval = state['revisit_interval'] or REVISIT_DEFAULT_SECONDS
+            check_count = state['check_count'] or 0
+            change_count = state['change_count'] or 0
+
+            # İlk gözlem değişim istatistiğine katılmaz - karşılaştıracak önceki hash yok
+            if not first_check:
+                check_count += 1
+                change_count += 1 if changed else 0
+                interval = adapt_interval(interval, changed)
+
+            cursor.execute(self._sql('''
+                INSERT INTO url_frontier
+                    (url_id, next_due_at, priority, revisit_interval, error_count, last_error,
+                     last_content_hash, check_count, change_count, last_checked_at)
+                VALUES (?, ?, ?, ?, 0, NULL, ?, ?, ?, ?)
+                ON CONFLICT (url_id) DO UPDATE SET
+                    next_due_at = excluded.next_due_at,
+                    priority = excluded.priority,
+                    revisit_interval = excluded.revisit_interval,
+                    error_count = 0,
+                    last_error = NULL,
+                    last_content_hash = excluded.last_content_hash,
+                    check_count = excluded.check_count,
+                    change_count = excluded.change_count,
+                    last_checked_at = excluded.last_checked_at,
+                    lease_owner = NULL,
+                    lease_expires_at = NULL
+                WHERE url_frontier.lease_owner = ?
+            '''), (
+                url_id, now + interval, change_priority(change_count, check_count), interval,
+                page_hash, check_count, change_count, now, worker_id
+            ))
+            if not cursor.rowcount:
+                logger.warning(f"URL {url_id} kirası {worker_id} üzerinde değil - ziyaret sonucu yazılmadı")
+            conn.commit()
+            return changed
+        finally:
+            conn.close()
+
+    def record_failure(self, url_id: int, error: str, worker_id: str) -> bool:
+        """Hatalı fetch: üstel geri çekilme ile ertele - limit aşıldıysa URL'yi 'error' yap ve True döndür
+
+        Kira başka worker'a geçtiyse (süresi dolmuş kira) hiçbir şey yazılmaz.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            state = self._get_state(cursor, url_id)
+            error_count = ((state or {}).get('error_count') or 0) + 1
+            gave_up = error_count >= MAX_ERROR_COUNT
+
+            cursor.execute(self._sql('''
+                INSERT INTO url_frontier (url_id, next_due_at, priority, revisit_interval, error_count, last_error, last_checked_at)
+                VALUES (?, ?, 1.0, ?, ?, ?, ?)
+                ON CONFLICT (url_id) DO UPDATE SET
+                    next_due_at = excluded.next_due_at,
+                    error_count = excluded.error_count,
+                    last_error = excluded.last_error,
+                    last_checked_at = excluded.last_checked_at,
+                    lease_owner = NULL,
+                    lease_expires_at = NULL
+                WHERE url_frontier.lease_owner = ?
+            '''), (url_id, now + retry_delay(error_count), REVISIT_DEFAULT_SECONDS, error_count, error, now, worker_id))
+            if not cursor.rowcount:
+                logger.warning(f"URL {url_id} kirası {worker_id} üzerinde değil - hata yazılmadı")
+                conn.commit()
+                return False
+
+            if gave_up:
+                cursor.execute(self._sql('''
+                    UPDATE urls SET status = 'error', error_message = ? WHERE id = ?
+                '''), (f"{error_count} denemede başarısız: {error}", url_id))
+            conn.commit()
+
+            if gave_up:
+                logger.warning(f"URL {url_id} {error_count} ardışık hatadan sonra devre dışı bırakıldı")
+            return gave_up
+        finally:
+            conn.close()
+
+    def remove(self, url_id: int):
+        conn = self._connect()
+        try:
+            conn.cursor().execute(self._sql('DELETE FROM url_frontier WHERE url_id = ?'), (url_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class SQLiteURLFrontier(_BaseURLFrontier):
+    """urls tablosunun yanında url_frontier tablosu (SQLite)"""
+
+    def __init__(self, db_path: str = 'ai_visibility.db'):
+        self.db_path = db_path
+        self.ensure_schema()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def ensure_schema(self):
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS url_frontier (
+                url_id INTEGER PRIMARY KEY,
+                next_due_at REAL NOT NULL DEFAULT 0,
+                priority REAL DEFAULT 1.0,
+                revisit_interval REAL,
+                error_count INTEGER DEFAULT 0,
+                last_error TEXT,
+                last_content_hash TEXT,
+                check_count INTEGER DEFAULT 0,
+                change_count INTEGER DEFAULT 0,
+                last_checked_at REAL,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                FOREIGN KEY (url_id) REFERENCES urls (id)
+            )
+        ''')
+
+        # Eski tablolara lease kolonlarını ekle
+        columns = [column[1] for column in conn.execute("PRAGMA table_info(url_frontier)").fetchall()]
+        if 'lease_owner' not in columns:
+            conn.execute('ALTER TABLE url_frontier ADD COLUMN lease_owner TEXT')
+        if 'lease_expires_at' not in columns:
+            conn.execute('ALTER TABLE url_frontier ADD COLUMN lease_expires_at REAL')
+
+        # URL'nin ait olduğu workspace - claim adil paylaşımı bu kolona göre yapar
+        url_columns = [column[1] for column in conn.execute("PRAGMA table_info(urls)").fetchall()]
+        if url_columns and 'workspace_id' not in url_columns:
+            conn.execute('ALTER TABLE urls ADD COLUMN workspace_id TEXT')
+
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_url_frontier_due ON url_frontier(next_due_at)')
+        # WAL: birden fazla crawler process'i okurken yazabilsin
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.commit()
+        conn.close()
+
+    def claim(self, worker_id: str, limit: int = FRONTIER_BATCH_SIZE,
+              lease_seconds: float = LEASE_SECONDS) -> List[Dict]:
+        """BEGIN IMMEDIATE ile yazma kilidi alınır - seçim ve kiralama tek transaction'da"""
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            query, params = self._fair_due_query()
+            cursor.execute(query, (now, now, *params, limit))
+            rows = self._fetch_dicts(cursor)
+            cursor.executemany(
+                'UPDATE url_frontier SET lease_owner = ?, lease_expires_at = ? WHERE url_id = ?',
+                [(worker_id, now + lease_seconds, row['id']) for row in rows]
+            )
+            cursor.execute('COMMIT')
+            return rows
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+
+class PostgresURLFrontier(_BaseURLFrontier):
+    """Supabase/Postgres için frontier - DATABASE_URL ile doğrudan bağlantı"""
+
+    placeholder = '%s'
+
+    def __init__(self, dsn: Optional[str] = None):
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        self.ensure_schema()
+
+    def _connect(self):
+        import psycopg2
+        return psycopg2.connect(self.dsn)
+
+    def ensure_schema(self):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS url_frontier (
+                    url_id INTEGER PRIMARY KEY REFERENCES urls(id) ON DELETE CASCADE,
+                    next_due_at DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    priority DOUBLE PRECISION DEFAULT 1.0,
+                    revisit_interval DOUBLE PRECISION,
+                    error_count INTEGER DEFAULT 0,
+                    last_error TEXT,
+                    last_content_hash TEXT,
+                    check_count INTEGER DEFAULT 0,
+                    change_count INTEGER DEFAULT 0,
+                    last_checked_at DOUBLE PRECISION,
+                    lease_owner TEXT,
+                    lease_expires_at DOUBLE PRECISION
+                )
+            ''')
+            cursor.execute('ALTER TABLE url_frontier ADD COLUMN IF NOT EXISTS lease_owner TEXT')
+            cursor.execute('ALTER TABLE url_frontier ADD COLUMN IF NOT EXISTS lease_expires_at DOUBLE PRECISION')
+            cursor.execute('ALTER TABLE urls ADD COLUMN IF NOT EXISTS workspace_id TEXT')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_url_frontier_due ON url_frontier(next_due_at)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def claim(self, worker_id: str, limit: int = FRONTIER_BATCH_SIZE,
+              lease_seconds: float = LEASE_SECONDS) -> List[Dict]:
+        """FOR UPDATE SKIP LOCKED - farklı makinelerdeki worker'lar birbirini beklemeden farklı satırları alır"""
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            now = time.time()
+            # Pencere fonksiyonu FOR UPDATE ile kullanılamaz - önce adil sırayı seç, sonra kilitle
+            query, params = self._fair_due_query()
+            cursor.execute(self._sql(query), (now, now, *params, limit))
+            order = [row['id'] for row in self._fetch_dicts(cursor)]
+            cursor.execute(self._sql('''
+                SELECT u.*, f.next_due_at, f.priority, f.error_count, f.revisit_interval,
+                       f.last_content_hash, f.check_count, f.change_count
+                FROM url_frontier f
+                JOIN urls u ON u.id = f.url_id
+                WHERE f.url_id = ANY(?)
+                  AND (f.lease_expires_at IS NULL OR f.lease_expires_at <= ?)
+                FOR UPDATE OF f SKIP LOCKED
+            '''), (order, now))
+            locked = {row['id']: row for row in self._fetch_dicts(cursor)}
+            rows = [locked[url_id] for url_id in order if url_id in locked]
+            if rows:
+                cursor.execute(
+                    'UPDATE url_frontier SET lease_owner = %s, lease_expires_at = %s WHERE url_id = ANY(%s)',
+                    (worker_id, now + lease_seconds, [row['id'] for row in rows])
+                )
+            conn.commit()
+            return rows
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+def create_frontier(db_path: str = 'ai_visibility.db', use_postgres: bool = False):
+    """Ayarlara göre frontier seç - Postgres için DATABASE_URL gerekir, yoksa None"""
+    if use_postgres:
+        if not os.getenv("DATABASE_URL"):
+            return None
+        return PostgresURLFrontier()
+    return SQLiteURLFrontier(db_path)
@@ -10,8 +10,9 @@ export default function TriggerLLMAnalysis() {
     setStatusMessage("");
 
     try {
-      const res = await fetch("http://localhost:8000/run-llm-mention-analysis");
+      const res = await fetch("http://localhost:8000/run-llm-mention-analysis", { method: "POST" });
       const data = await res.json();
+      // Analiz arka planda çalışır - mesaj job durum adresini içerir
       setStatusMessage(data.message || "İşlem tamamlandı.");
     } catch (error) {
       console.error("Hata:", error);